@@ -0,0 +1,41 @@
+"""add check_rollups table
+
+Revision ID: 1d6f3a9c8e25
+Revises: e7b91d5c0a42
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "1d6f3a9c8e25"
+down_revision: Union[str, Sequence[str], None] = "e7b91d5c0a42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Per-check minute/hour/day aggregates maintained by the execution writer."""
+    op.create_table(
+        "check_rollups",
+        sa.Column("check_id", sa.Integer(), sa.ForeignKey("checks.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("granularity", sa.String(), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("pass_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("fail_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("latency_sum", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("latency_min", sa.Float(), nullable=True),
+        sa.Column("latency_max", sa.Float(), nullable=True),
+        sa.Column("latency_sketch", sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint("check_id", "granularity", "bucket_start"),
+    )
+
+
+def downgrade() -> None:
+    """Drop check_rollups."""
+    op.drop_table("check_rollups")
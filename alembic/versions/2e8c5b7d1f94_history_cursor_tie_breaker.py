@@ -0,0 +1,47 @@
+"""add id to the history indexes for the (executed_at, id) cursor
+
+Revision ID: 2e8c5b7d1f94
+Revises: c6e1a9d3f725
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2e8c5b7d1f94"
+down_revision: Union[str, Sequence[str], None] = "c6e1a9d3f725"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HISTORY_INDEX = "ix_check_executions_check_id_executed_at"
+TRANSITIONS_INDEX = "ix_check_executions_transitions"
+
+
+def _create_indexes(columns):
+    op.create_index(HISTORY_INDEX, "check_executions", columns)
+    op.create_index(
+        TRANSITIONS_INDEX,
+        "check_executions",
+        columns,
+        postgresql_where=sa.text("transition IS NOT NULL"),
+        sqlite_where=sa.text("transition IS NOT NULL"),
+    )
+
+
+def upgrade() -> None:
+    """Order history by (executed_at, id) so runs sharing a timestamp page without a sort."""
+    # CONCURRENTLY is not supported on the partitioned parent; the indexes are rebuilt in place
+    op.drop_index(TRANSITIONS_INDEX, table_name="check_executions")
+    op.drop_index(HISTORY_INDEX, table_name="check_executions")
+    _create_indexes(["check_id", sa.text("executed_at DESC"), sa.text("id DESC")])
+
+
+def downgrade() -> None:
+    """Back to (check_id, executed_at DESC)."""
+    op.drop_index(TRANSITIONS_INDEX, table_name="check_executions")
+    op.drop_index(HISTORY_INDEX, table_name="check_executions")
+    _create_indexes(["check_id", sa.text("executed_at DESC")])
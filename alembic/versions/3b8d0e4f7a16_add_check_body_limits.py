@@ -0,0 +1,35 @@
+"""add response body limits and streaming flag to checks
+
+Revision ID: 3b8d0e4f7a16
+Revises: 1d6f3a9c8e25
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3b8d0e4f7a16"
+down_revision: Union[str, Sequence[str], None] = "1d6f3a9c8e25"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Per-check body size / read time caps and incremental field parsing."""
+    op.add_column("checks", sa.Column("max_body_bytes", sa.Integer(), nullable=True))
+    op.add_column("checks", sa.Column("max_read_ms", sa.Integer(), nullable=True))
+    op.add_column(
+        "checks",
+        sa.Column("stream_fields", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+
+def downgrade() -> None:
+    """Drop the body limit columns."""
+    op.drop_column("checks", "stream_fields")
+    op.drop_column("checks", "max_read_ms")
+    op.drop_column("checks", "max_body_bytes")
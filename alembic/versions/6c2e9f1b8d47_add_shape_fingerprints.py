@@ -0,0 +1,37 @@
+"""add response shape fingerprints and schema drift
+
+Revision ID: 6c2e9f1b8d47
+Revises: 3b8d0e4f7a16
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6c2e9f1b8d47"
+down_revision: Union[str, Sequence[str], None] = "3b8d0e4f7a16"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Baseline shape per check and the fingerprint / drift diff of each execution.
+
+    On Postgres, columns added to the partitioned parent propagate to every partition.
+    """
+    op.add_column("checks", sa.Column("shape_fingerprint", sa.String(length=32), nullable=True))
+    op.add_column("checks", sa.Column("shape", sa.JSON(), nullable=True))
+    op.add_column("check_executions", sa.Column("shape_fingerprint", sa.String(length=32), nullable=True))
+    op.add_column("check_executions", sa.Column("schema_drift", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop the shape columns."""
+    op.drop_column("check_executions", "schema_drift")
+    op.drop_column("check_executions", "shape_fingerprint")
+    op.drop_column("checks", "shape")
+    op.drop_column("checks", "shape_fingerprint")
@@ -0,0 +1,35 @@
+"""add scheduler_replicas table
+
+Revision ID: 8f4a2d6e1c93
+Revises: 6c2e9f1b8d47
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8f4a2d6e1c93"
+down_revision: Union[str, Sequence[str], None] = "6c2e9f1b8d47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Scheduler replica heartbeats used to split check shards between replicas."""
+    op.create_table(
+        "scheduler_replicas",
+        sa.Column("replica_id", sa.String(), primary_key=True),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_scheduler_replicas_heartbeat_at", "scheduler_replicas", ["heartbeat_at"])
+
+
+def downgrade() -> None:
+    """Drop scheduler_replicas."""
+    op.drop_index("ix_scheduler_replicas_heartbeat_at", table_name="scheduler_replicas")
+    op.drop_table("scheduler_replicas")
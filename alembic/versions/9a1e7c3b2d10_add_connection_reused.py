@@ -0,0 +1,28 @@
+"""add connection_reused to check executions
+
+Revision ID: 9a1e7c3b2d10
+Revises: 5b3c2f1d4a90
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9a1e7c3b2d10"
+down_revision: Union[str, Sequence[str], None] = "5b3c2f1d4a90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Record whether each execution reused a pooled keep-alive connection."""
+    op.add_column("check_executions", sa.Column("connection_reused", sa.Boolean(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop connection_reused."""
+    op.drop_column("check_executions", "connection_reused")
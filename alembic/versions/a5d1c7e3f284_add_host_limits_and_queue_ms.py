@@ -0,0 +1,32 @@
+"""add per-check host limits and execution queue time
+
+Revision ID: a5d1c7e3f284
+Revises: 8f4a2d6e1c93
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a5d1c7e3f284"
+down_revision: Union[str, Sequence[str], None] = "8f4a2d6e1c93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Per-check overrides of the host limiter and the time each run waited on it."""
+    op.add_column("checks", sa.Column("host_max_concurrency", sa.Integer(), nullable=True))
+    op.add_column("checks", sa.Column("host_rate_per_second", sa.Float(), nullable=True))
+    op.add_column("check_executions", sa.Column("queue_ms", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop the host limit and queue time columns."""
+    op.drop_column("check_executions", "queue_ms")
+    op.drop_column("checks", "host_rate_per_second")
+    op.drop_column("checks", "host_max_concurrency")
@@ -0,0 +1,53 @@
+"""add check_states and execution transitions
+
+Revision ID: a8c4e2f6b913
+Revises: f3b7d9e2a418
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a8c4e2f6b913"
+down_revision: Union[str, Sequence[str], None] = "f3b7d9e2a418"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "ix_check_executions_transitions"
+
+
+def upgrade() -> None:
+    """Rolling per-check state plus the transition and failure streak of each execution."""
+    op.create_table(
+        "check_states",
+        sa.Column("check_id", sa.Integer(), sa.ForeignKey("checks.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("consecutive_failures", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("consecutive_passes", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_transition_at", sa.DateTime(), nullable=True),
+        sa.Column("last_executed_at", sa.DateTime(), nullable=True),
+        sa.Column("flap_score", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("flapping", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    op.add_column("check_executions", sa.Column("transition", sa.String(16), nullable=True))
+    op.add_column("check_executions", sa.Column("consecutive_failures", sa.Integer(), nullable=True))
+    # partial: only the rare rows that changed status are indexed
+    op.create_index(
+        INDEX_NAME,
+        "check_executions",
+        ["check_id", sa.text("executed_at DESC")],
+        postgresql_where=sa.text("transition IS NOT NULL"),
+        sqlite_where=sa.text("transition IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Drop check_states and the transition columns."""
+    op.drop_index(INDEX_NAME, table_name="check_executions")
+    op.drop_column("check_executions", "consecutive_failures")
+    op.drop_column("check_executions", "transition")
+    op.drop_table("check_states")
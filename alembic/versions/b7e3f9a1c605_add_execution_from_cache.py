@@ -0,0 +1,28 @@
+"""add from_cache to check_executions
+
+Revision ID: b7e3f9a1c605
+Revises: a5d1c7e3f284
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e3f9a1c605"
+down_revision: Union[str, Sequence[str], None] = "a5d1c7e3f284"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Whether a run was answered with 304 and reused the cached validation."""
+    op.add_column("check_executions", sa.Column("from_cache", sa.Boolean(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop from_cache."""
+    op.drop_column("check_executions", "from_cache")
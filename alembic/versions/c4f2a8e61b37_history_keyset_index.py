@@ -0,0 +1,45 @@
+"""add (check_id, executed_at desc) index for execution history
+
+Revision ID: c4f2a8e61b37
+Revises: 9a1e7c3b2d10
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4f2a8e61b37"
+down_revision: Union[str, Sequence[str], None] = "9a1e7c3b2d10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "ix_check_executions_check_id_executed_at"
+
+
+def upgrade() -> None:
+    """Create the composite history index without locking writes on large tables."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            INDEX_NAME,
+            "check_executions",
+            ["check_id", sa.text("executed_at DESC")],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Drop the composite history index."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            INDEX_NAME,
+            table_name="check_executions",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
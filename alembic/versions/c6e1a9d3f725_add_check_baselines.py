@@ -0,0 +1,40 @@
+"""add check_baselines and execution latency regression flags
+
+Revision ID: c6e1a9d3f725
+Revises: a8c4e2f6b913
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c6e1a9d3f725"
+down_revision: Union[str, Sequence[str], None] = "a8c4e2f6b913"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Checkpointed per-check latency baselines and the score of each execution against them."""
+    op.create_table(
+        "check_baselines",
+        sa.Column("check_id", sa.Integer(), sa.ForeignKey("checks.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("mean_ms", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("variance", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("samples", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("sketch", sa.JSON(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.add_column("check_executions", sa.Column("latency_zscore", sa.Float(), nullable=True))
+    op.add_column("check_executions", sa.Column("latency_regression", sa.Boolean(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop check_baselines and the regression columns."""
+    op.drop_column("check_executions", "latency_regression")
+    op.drop_column("check_executions", "latency_zscore")
+    op.drop_table("check_baselines")
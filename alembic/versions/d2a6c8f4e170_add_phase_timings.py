@@ -0,0 +1,34 @@
+"""add phase timings to check_executions and phase thresholds to checks
+
+Revision ID: d2a6c8f4e170
+Revises: b7e3f9a1c605
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d2a6c8f4e170"
+down_revision: Union[str, Sequence[str], None] = "b7e3f9a1c605"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PHASE_COLUMNS = ("connect_ms", "tls_ms", "ttfb_ms", "download_ms")
+
+
+def upgrade() -> None:
+    """Per-phase latency on executions and optional per-phase thresholds on checks."""
+    for name in PHASE_COLUMNS:
+        op.add_column("check_executions", sa.Column(name, sa.Integer(), nullable=True))
+    op.add_column("checks", sa.Column("phase_thresholds_ms", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop the phase columns."""
+    op.drop_column("checks", "phase_thresholds_ms")
+    for name in reversed(PHASE_COLUMNS):
+        op.drop_column("check_executions", name)
@@ -0,0 +1,128 @@
+"""range-partition check_executions by executed_at
+
+Revision ID: e7b91d5c0a42
+Revises: c4f2a8e61b37
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e7b91d5c0a42"
+down_revision: Union[str, Sequence[str], None] = "c4f2a8e61b37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PREMAKE_DAYS = 7
+
+
+def upgrade() -> None:
+    """Turn check_executions into a table partitioned by day on executed_at (Postgres only).
+
+    The existing heap is attached as-is as one partition covering everything up to tomorrow,
+    so no rows are copied; the retention job drops it once it ages out. Daily partitions are
+    created from tomorrow on, plus a DEFAULT partition so inserts never fail if the
+    maintenance job falls behind.
+    """
+    conn = op.get_bind()
+    if conn.dialect.name != "postgresql":
+        return
+
+    tomorrow = datetime.utcnow().date() + timedelta(days=1)
+
+    conn.execute(sa.text("UPDATE check_executions SET executed_at = now() AT TIME ZONE 'utc' WHERE executed_at IS NULL"))
+    conn.execute(sa.text("ALTER TABLE check_executions ALTER COLUMN executed_at SET NOT NULL"))
+    conn.execute(sa.text("ALTER TABLE check_executions RENAME TO check_executions_legacy"))
+    # free the index names for the partitioned parent; matching indexes are adopted on ATTACH
+    conn.execute(sa.text(
+        "ALTER TABLE check_executions_legacy RENAME CONSTRAINT check_executions_pkey TO check_executions_legacy_pkey"
+    ))
+    conn.execute(sa.text("ALTER INDEX IF EXISTS ix_check_executions_id RENAME TO ix_check_executions_legacy_id"))
+    conn.execute(sa.text(
+        "ALTER INDEX IF EXISTS ix_check_executions_check_id_executed_at "
+        "RENAME TO ix_check_executions_legacy_check_id_executed_at"
+    ))
+
+    conn.execute(sa.text(
+        """
+        CREATE TABLE check_executions (
+            id INTEGER NOT NULL DEFAULT nextval('check_executions_id_seq'),
+            check_id INTEGER NOT NULL REFERENCES checks(id),
+            status VARCHAR NOT NULL,
+            missing_fields JSON,
+            actual_status_code INTEGER,
+            latency_ms INTEGER,
+            error TEXT,
+            connection_reused BOOLEAN,
+            executed_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            PRIMARY KEY (id, executed_at)
+        ) PARTITION BY RANGE (executed_at);
+        """
+    ))
+    conn.execute(sa.text("ALTER SEQUENCE check_executions_id_seq OWNED BY check_executions.id"))
+    conn.execute(sa.text("ALTER TABLE check_executions_legacy ALTER COLUMN id DROP DEFAULT"))
+    conn.execute(sa.text("CREATE INDEX ix_check_executions_id ON check_executions (id)"))
+    conn.execute(sa.text(
+        "CREATE INDEX ix_check_executions_check_id_executed_at ON check_executions (check_id, executed_at DESC)"
+    ))
+
+    conn.execute(sa.text(
+        f"ALTER TABLE check_executions ATTACH PARTITION check_executions_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ('{tomorrow.isoformat()}')"
+    ))
+    for offset in range(PREMAKE_DAYS):
+        day = tomorrow + timedelta(days=offset)
+        conn.execute(sa.text(
+            f"CREATE TABLE check_executions_p{day:%Y%m%d} PARTITION OF check_executions "
+            f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+        ))
+    conn.execute(sa.text("CREATE TABLE check_executions_default PARTITION OF check_executions DEFAULT"))
+
+
+def downgrade() -> None:
+    """Copy rows back into a single unpartitioned table."""
+    conn = op.get_bind()
+    if conn.dialect.name != "postgresql":
+        return
+
+    conn.execute(sa.text("ALTER TABLE check_executions RENAME TO check_executions_partitioned"))
+    conn.execute(sa.text(
+        "ALTER TABLE check_executions_partitioned RENAME CONSTRAINT check_executions_pkey "
+        "TO check_executions_partitioned_pkey"
+    ))
+    conn.execute(sa.text("DROP INDEX IF EXISTS ix_check_executions_id"))
+    conn.execute(sa.text("DROP INDEX IF EXISTS ix_check_executions_check_id_executed_at"))
+    conn.execute(sa.text(
+        """
+        CREATE TABLE check_executions (
+            id INTEGER PRIMARY KEY DEFAULT nextval('check_executions_id_seq'),
+            check_id INTEGER NOT NULL REFERENCES checks(id),
+            status VARCHAR NOT NULL,
+            missing_fields JSON,
+            actual_status_code INTEGER,
+            latency_ms INTEGER,
+            error TEXT,
+            connection_reused BOOLEAN,
+            executed_at TIMESTAMP
+        );
+        """
+    ))
+    conn.execute(sa.text(
+        """
+        INSERT INTO check_executions
+            (id, check_id, status, missing_fields, actual_status_code, latency_ms, error, connection_reused, executed_at)
+        SELECT id, check_id, status, missing_fields, actual_status_code, latency_ms, error, connection_reused, executed_at
+        FROM check_executions_partitioned
+        """
+    ))
+    conn.execute(sa.text("ALTER SEQUENCE check_executions_id_seq OWNED BY check_executions.id"))
+    conn.execute(sa.text("DROP TABLE check_executions_partitioned CASCADE"))
+    conn.execute(sa.text("CREATE INDEX ix_check_executions_id ON check_executions (id)"))
+    conn.execute(sa.text(
+        "CREATE INDEX ix_check_executions_check_id_executed_at ON check_executions (check_id, executed_at DESC)"
+    ))
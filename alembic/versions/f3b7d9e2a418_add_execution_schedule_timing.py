@@ -0,0 +1,32 @@
+"""add scheduled_at, started_at and missed_runs to check_executions
+
+Revision ID: f3b7d9e2a418
+Revises: d2a6c8f4e170
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3b7d9e2a418"
+down_revision: Union[str, Sequence[str], None] = "d2a6c8f4e170"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Scheduled fire time, actual start and missed fire times of scheduled runs."""
+    op.add_column("check_executions", sa.Column("scheduled_at", sa.DateTime(), nullable=True))
+    op.add_column("check_executions", sa.Column("started_at", sa.DateTime(), nullable=True))
+    op.add_column("check_executions", sa.Column("missed_runs", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop the scheduling columns."""
+    op.drop_column("check_executions", "missed_runs")
+    op.drop_column("check_executions", "started_at")
+    op.drop_column("check_executions", "scheduled_at")
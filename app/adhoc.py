@@ -0,0 +1,63 @@
+import asyncio
+import logging
+import os
+from typing import AsyncIterator, List, Optional
+
+from app.checker import run_check
+from app.models import APICheck
+
+logger = logging.getLogger(__name__)
+
+# fan-out of POST /run-checks when the request does not ask for one, and the most it may ask for
+RUN_CHECKS_CONCURRENCY = int(os.getenv("RUN_CHECKS_CONCURRENCY", "20"))
+RUN_CHECKS_MAX_CONCURRENCY = int(os.getenv("RUN_CHECKS_MAX_CONCURRENCY", "100"))
+RUN_CHECKS_MAX_BATCH = int(os.getenv("RUN_CHECKS_MAX_BATCH", "1000"))
+
+
+async def run_checks(
+    checks: List[APICheck], concurrency: Optional[int] = None, fail_fast: bool = False
+) -> AsyncIterator[dict]:
+    """Run checks concurrently and yield each result as soon as it completes, then a summary.
+
+    At most `concurrency` checks run at once (capped at RUN_CHECKS_MAX_CONCURRENCY). With
+    fail_fast the first FAIL cancels every check still queued or running. Closing the
+    generator early (e.g. the client disconnected) cancels them as well.
+    """
+    concurrency = min(concurrency or RUN_CHECKS_CONCURRENCY, RUN_CHECKS_MAX_CONCURRENCY)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int, check: APICheck):
+        async with semaphore:
+            try:
+                result = await run_check(check)
+            except Exception:
+                logger.exception(f"Failed to execute ad-hoc check {index} ({check.url})")
+                result = {"status": "FAIL", "error": "Failed to execute check"}
+        return index, result
+
+    tasks = [asyncio.create_task(one(index, check)) for index, check in enumerate(checks)]
+    completed = passed = 0
+    stopped = False
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, result = await next_done
+            # the full shape is only kept for drift detection on stored checks
+            result.pop("shape", None)
+            completed += 1
+            passed += result["status"] == "PASS"
+            yield {"event": "result", "index": index, "url": str(checks[index].url), **result}
+            if fail_fast and result["status"] != "PASS":
+                stopped = True
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    yield {
+        "event": "summary",
+        "total": len(checks),
+        "passed": passed,
+        "failed": completed - passed,
+        "cancelled": len(checks) - completed,
+        "fail_fast_triggered": stopped,
+    }
@@ -0,0 +1,320 @@
+"""Alerting, off the execution hot path.
+
+The execution writer offers every persisted row to a bounded queue without waiting; when
+the queue is full the rows are dropped and counted, so checks never slow down for alerts.
+One evaluator task runs the rules incrementally per check and deduplicates their output:
+an alert is sent once when it starts firing and once when it resolves. Every destination
+has its own queue and sender task, which groups alerts into one webhook POST per batch,
+retries with backoff and is rate limited, so a slow or failing endpoint only delays its
+own notifications.
+"""
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from app.metrics import counter, gauge
+from app.ratelimit import TokenBucket, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+# comma-separated webhook URLs; alerting is off when empty
+ALERT_WEBHOOK_URLS = [url.strip() for url in os.getenv("ALERT_WEBHOOK_URLS", "").split(",") if url.strip()]
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", "10000"))
+ALERT_DESTINATION_QUEUE_SIZE = int(os.getenv("ALERT_DESTINATION_QUEUE_SIZE", "1000"))
+# rules
+ALERT_CONSECUTIVE_FAILURES = int(os.getenv("ALERT_CONSECUTIVE_FAILURES", "3"))
+ALERT_LATENCY_RUNS = int(os.getenv("ALERT_LATENCY_RUNS", "3"))
+# delivery: alerts per POST, how long a batch may wait to fill, POSTs per second per destination (0: unlimited)
+ALERT_BATCH_SIZE = int(os.getenv("ALERT_BATCH_SIZE", "50"))
+ALERT_BATCH_WAIT_SECONDS = float(os.getenv("ALERT_BATCH_WAIT_SECONDS", "2.0"))
+ALERT_RATE_PER_SECOND = float(os.getenv("ALERT_RATE_PER_SECOND", "1.0"))
+ALERT_MAX_RETRIES = int(os.getenv("ALERT_MAX_RETRIES", "5"))
+ALERT_RETRY_BACKOFF_SECONDS = float(os.getenv("ALERT_RETRY_BACKOFF_SECONDS", "1.0"))
+ALERT_TIMEOUT_SECONDS = float(os.getenv("ALERT_TIMEOUT_SECONDS", "10"))
+# how long shutdown waits for queued alerts to be delivered
+ALERT_DRAIN_SECONDS = float(os.getenv("ALERT_DRAIN_SECONDS", "5"))
+
+ALERTS = counter("alerts_total", "Alerts raised, by rule and state (firing/resolved)", ["rule", "state"])
+ALERTS_DROPPED = counter("alerts_dropped_total", "Executions or alerts dropped because a queue was full", ["stage"])
+ALERT_DELIVERIES = counter("alert_deliveries_total", "Webhook batches by outcome", ["outcome"])
+
+FIRING = "firing"
+RESOLVED = "resolved"
+
+
+@dataclass
+class Alert:
+    check_id: int
+    rule: str
+    state: str
+    summary: str
+    at: datetime
+    details: dict = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            "check_id": self.check_id,
+            "rule": self.rule,
+            "state": self.state,
+            "summary": self.summary,
+            "at": self.at.isoformat(),
+            "details": self.details,
+        }
+
+
+class ConsecutiveFailuresRule:
+    """Fires once a check has failed `threshold` runs in a row (streak from app.check_state)."""
+
+    name = "consecutive_failures"
+
+    def __init__(self, threshold: int = ALERT_CONSECUTIVE_FAILURES):
+        self.threshold = threshold
+
+    def evaluate(self, row: dict) -> Optional[Tuple[bool, str]]:
+        failures = row.get("consecutive_failures")
+        if failures is None:
+            return None
+        return failures >= self.threshold, f"{failures} consecutive failures"
+
+    def forget(self, check_id: int):
+        pass
+
+
+class LatencyRegressionRule:
+    """Fires after `runs` executions in a row flagged as latency regressions (app.baselines)."""
+
+    name = "latency_regression"
+
+    def __init__(self, runs: int = ALERT_LATENCY_RUNS):
+        self.runs = runs
+        # check_id -> flagged runs in a row
+        self._streaks: Dict[int, int] = {}
+
+    def evaluate(self, row: dict) -> Optional[Tuple[bool, str]]:
+        regression = row.get("latency_regression")
+        if regression is None:
+            return None
+        streak = self._streaks.get(row["check_id"], 0) + 1 if regression else 0
+        self._streaks[row["check_id"]] = streak
+        return streak >= self.runs, f"latency {row['latency_ms']:.0f}ms (z={row.get('latency_zscore') or 0:.1f})"
+
+    def forget(self, check_id: int):
+        self._streaks.pop(check_id, None)
+
+
+def default_rules() -> list:
+    return [ConsecutiveFailuresRule(), LatencyRegressionRule()]
+
+
+class Destination:
+    """One webhook: its own queue, batching, rate limit and retries."""
+
+    def __init__(
+        self,
+        url: str,
+        client: httpx.AsyncClient,
+        batch_size: int = ALERT_BATCH_SIZE,
+        batch_wait: float = ALERT_BATCH_WAIT_SECONDS,
+        rate_per_second: float = ALERT_RATE_PER_SECOND,
+        max_retries: int = ALERT_MAX_RETRIES,
+        retry_backoff: float = ALERT_RETRY_BACKOFF_SECONDS,
+        queue_size: int = ALERT_DESTINATION_QUEUE_SIZE,
+    ):
+        self.url = url
+        self.client = client
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self._bucket = TokenBucket(rate_per_second) if rate_per_second > 0 else None
+
+    def offer(self, alert: Alert):
+        try:
+            self.queue.put_nowait(alert)
+        except asyncio.QueueFull:
+            ALERTS_DROPPED.labels("destination").inc()
+            logger.warning(f"Alert queue for {self.url} is full; dropped {alert.rule} for check {alert.check_id}")
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.batch_size and (remaining := deadline - loop.time()) > 0:
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                if self._bucket is not None:
+                    await self._bucket.acquire()
+                await self.deliver(batch)
+            except Exception:
+                # e.g. an invalid URL: lose this batch, keep the sender alive for the next one
+                ALERT_DELIVERIES.labels("failed").inc()
+                logger.exception(f"Failed to deliver {len(batch)} alerts to {self.url}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def deliver(self, batch: List[Alert]) -> bool:
+        """POST one batch, retrying transport errors, 5xx and 429 with exponential backoff."""
+        payload = {"alerts": [alert.as_dict() for alert in batch]}
+        for attempt in range(self.max_retries + 1):
+            delay = self.retry_backoff * 2 ** attempt
+            try:
+                response = await self.client.post(self.url, json=payload)
+            except httpx.HTTPError as e:
+                reason = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code < 400:
+                    ALERT_DELIVERIES.labels("sent").inc()
+                    return True
+                reason = f"HTTP {response.status_code}"
+                if response.status_code == 429:
+                    delay = retry_after_seconds(response.headers.get("Retry-After")) or delay
+                elif response.status_code < 500 and response.status_code != 408:
+                    # the endpoint rejected the payload; resending it will not help
+                    break
+            if attempt < self.max_retries:
+                ALERT_DELIVERIES.labels("retried").inc()
+                await asyncio.sleep(delay)
+        ALERT_DELIVERIES.labels("failed").inc()
+        logger.error(f"Failed to deliver {len(batch)} alerts to {self.url}: {reason}")
+        return False
+
+
+class AlertPipeline:
+    """Bounded queue of executions -> rule evaluation and dedup -> per-destination delivery."""
+
+    def __init__(
+        self,
+        webhook_urls: Iterable[str] = ALERT_WEBHOOK_URLS,
+        rules: Optional[list] = None,
+        queue_size: int = ALERT_QUEUE_SIZE,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        **destination_options,
+    ):
+        self.webhook_urls = list(webhook_urls)
+        self.rules = rules if rules is not None else default_rules()
+        self.queue_size = queue_size
+        self.transport = transport
+        self.destination_options = destination_options
+        self.destinations: List[Destination] = []
+        self._active: Dict[Tuple[int, str], Alert] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def active(self) -> List[Alert]:
+        return list(self._active.values())
+
+    def start(self):
+        """Start the evaluator and one sender per destination; a no-op without webhooks."""
+        if self.running or not self.webhook_urls:
+            return
+        self._client = httpx.AsyncClient(timeout=ALERT_TIMEOUT_SECONDS, transport=self.transport)
+        self.destinations = [Destination(url, self._client, **self.destination_options) for url in self.webhook_urls]
+        self._queue = asyncio.Queue(self.queue_size)
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._evaluate_loop())]
+        self._tasks += [loop.create_task(destination.run()) for destination in self.destinations]
+        logger.info(f"Alert pipeline started with {len(self.destinations)} destinations")
+
+    async def stop(self, drain_seconds: float = ALERT_DRAIN_SECONDS):
+        """Give queued alerts drain_seconds to go out, then stop every task."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._drain(), timeout=drain_seconds)
+        except asyncio.TimeoutError:
+            logger.warning(f"Alert pipeline stopped with undelivered alerts after {drain_seconds}s")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._client.aclose()
+        self._client = None
+
+    async def _drain(self):
+        await self._queue.join()
+        for destination in self.destinations:
+            await destination.queue.join()
+
+    def offer(self, rows: Iterable[dict]):
+        """Queue persisted execution rows for evaluation; never waits."""
+        if not self.running:
+            return
+        for row in rows:
+            try:
+                self._queue.put_nowait(row)
+            except asyncio.QueueFull:
+                ALERTS_DROPPED.labels("executions").inc()
+
+    def forget(self, check_id: int):
+        """Drop a deleted check's rule state and active alerts."""
+        for rule in self.rules:
+            rule.forget(check_id)
+            self._active.pop((check_id, rule.name), None)
+
+    async def _evaluate_loop(self):
+        while True:
+            row = await self._queue.get()
+            try:
+                for alert in self.evaluate(row):
+                    for destination in self.destinations:
+                        destination.offer(alert)
+            except Exception:
+                logger.exception(f"Alert rules failed for check {row.get('check_id')}")
+            finally:
+                self._queue.task_done()
+
+    def evaluate(self, row: dict) -> List[Alert]:
+        """Run every rule on one execution; returns alerts that started firing or resolved."""
+        alerts = []
+        for rule in self.rules:
+            outcome = rule.evaluate(row)
+            if outcome is None:
+                continue
+            holds, summary = outcome
+            key = (row["check_id"], rule.name)
+            active = self._active.get(key)
+            if holds and active is None:
+                alert = Alert(row["check_id"], rule.name, FIRING, summary, row["executed_at"], self._details(row))
+                self._active[key] = alert
+            elif not holds and active is not None:
+                alert = Alert(row["check_id"], rule.name, RESOLVED, summary, row["executed_at"], self._details(row))
+                del self._active[key]
+            else:
+                continue
+            ALERTS.labels(rule.name, alert.state).inc()
+            alerts.append(alert)
+        return alerts
+
+    @staticmethod
+    def _details(row: dict) -> dict:
+        return {
+            "status": row.get("status"),
+            "status_code": row.get("actual_status_code"),
+            "latency_ms": row.get("latency_ms"),
+            "error": row.get("error"),
+        }
+
+
+alert_pipeline = AlertPipeline()
+
+gauge("alerts_pending", "Executions waiting for alert evaluation", fn=lambda: alert_pipeline.pending)
@@ -0,0 +1,180 @@
+"""Database operations on AsyncSession (used by the API, scheduler and writer)."""
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+from sqlalchemy import delete, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.metrics import counter, histogram
+from app.models import Check, CheckExecution
+from app.partitions import retention_cutoff
+
+DB_WRITE_SECONDS = histogram("db_write_seconds", "Execution inserts, including the commit", ("op",))
+EXECUTIONS_WRITTEN = counter("executions_written_total", "Execution rows committed")
+
+# ============ CHECK OPERATIONS ============
+
+async def create_check(
+    db: AsyncSession,
+    name: str,
+    url: str,
+    required_fields: List[str],
+    expected_status_code: int = 200,
+    latency_threshold_ms: int | None = None,
+    interval_minutes: int = 5,
+    max_body_bytes: int | None = None,
+    max_read_ms: int | None = None,
+    stream_fields: bool = False,
+    host_max_concurrency: int | None = None,
+    host_rate_per_second: float | None = None,
+    phase_thresholds_ms: dict | None = None,
+) -> Check:
+    """Create a new API check"""
+    db_check = Check(
+        name=name,
+        url=str(url),  # Convert HttpUrl to string
+        required_fields=required_fields,
+        expected_status_code=expected_status_code,
+        latency_threshold_ms=latency_threshold_ms,
+        interval_minutes=interval_minutes,
+        max_body_bytes=max_body_bytes,
+        max_read_ms=max_read_ms,
+        stream_fields=stream_fields,
+        host_max_concurrency=host_max_concurrency,
+        host_rate_per_second=host_rate_per_second,
+        phase_thresholds_ms=phase_thresholds_ms,
+    )
+    try:
+        db.add(db_check)
+        await db.commit()
+        await db.refresh(db_check)
+        return db_check
+    except Exception:
+        await db.rollback()
+        raise
+
+async def get_check(db: AsyncSession, check_id: int) -> Optional[Check]:
+    """Get a check by ID"""
+    return await db.get(Check, check_id)
+
+async def get_check_by_name(db: AsyncSession, name: str) -> Optional[Check]:
+    """Get a check by its unique name"""
+    result = await db.execute(select(Check).where(Check.name == name))
+    return result.scalars().first()
+
+async def get_checks(db: AsyncSession, skip: int = 0, limit: Optional[int] = 100) -> List[Check]:
+    """Get all checks with pagination (limit=None returns every check)"""
+    result = await db.execute(select(Check).order_by(Check.id).offset(skip).limit(limit))
+    return list(result.scalars().all())
+
+async def get_checks_in_shards(db: AsyncSession, shards: Iterable[int], shard_count: int) -> List[Check]:
+    """Checks whose id falls in the given shards (check_id % shard_count)"""
+    result = await db.execute(
+        select(Check).where((Check.id % shard_count).in_(list(shards))).order_by(Check.id)
+    )
+    return list(result.scalars().all())
+
+async def delete_check(db: AsyncSession, check_id: int) -> bool:
+    """Delete a check"""
+    try:
+        result = await db.execute(delete(Check).where(Check.id == check_id))
+        await db.commit()
+        return result.rowcount > 0
+    except Exception:
+        await db.rollback()
+        raise
+
+# ============ EXECUTION OPERATIONS ============
+
+async def create_executions(db: AsyncSession, rows: List[dict], returning: bool = False) -> List[CheckExecution]:
+    """Bulk insert execution rows in one statement; returns the persisted rows when asked"""
+    if not rows:
+        return []
+    try:
+        with DB_WRITE_SECONDS.labels("create_executions").time():
+            if returning:
+                stmt = insert(CheckExecution).returning(CheckExecution, sort_by_parameter_order=True)
+                executions = list(await db.scalars(stmt, rows))
+            else:
+                await db.execute(insert(CheckExecution), rows)
+                executions = []
+            await db.commit()
+        EXECUTIONS_WRITTEN.inc(len(rows))
+        return executions
+    except Exception:
+        await db.rollback()
+        raise
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # executed_at is stored as naive UTC; aware query params are converted to match
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def history_statement(
+    check_id: int,
+    limit: int = 50,
+    before: Optional[datetime] = None,
+    after: Optional[datetime] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    transitions_only: bool = False,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+):
+    """Keyset-paginated history query served by the (check_id, executed_at DESC, id DESC) index.
+
+    `before` / `after` are exclusive cursors (the executed_at of the last row on the current
+    page); with `before_id` / `after_id` (that row's id) the cursor is the (executed_at, id)
+    pair, so runs sharing a timestamp are never skipped or repeated across pages.
+    `start` / `end` bound the time range inclusively. Paging with `after` walks the
+    index forward, so callers must re-sort those rows newest first. `start` never reaches
+    past the retention window, which lets Postgres prune expired partitions.
+    """
+    before, after, start, end = (_naive_utc(v) for v in (before, after, start, end))
+    key = tuple_(CheckExecution.executed_at, CheckExecution.id)
+    start = max(start, retention_cutoff()) if start is not None else retention_cutoff()
+    stmt = select(CheckExecution).where(CheckExecution.check_id == check_id)
+    if transitions_only:
+        stmt = stmt.where(CheckExecution.transition.isnot(None))
+    if start is not None:
+        stmt = stmt.where(CheckExecution.executed_at >= start)
+    if end is not None:
+        stmt = stmt.where(CheckExecution.executed_at <= end)
+    if before is not None:
+        stmt = stmt.where(CheckExecution.executed_at < before if before_id is None else key < tuple_(before, before_id))
+    if after is not None:
+        stmt = stmt.where(CheckExecution.executed_at > after if after_id is None else key > tuple_(after, after_id))
+        return stmt.order_by(CheckExecution.executed_at.asc(), CheckExecution.id.asc()).limit(limit)
+    return stmt.order_by(CheckExecution.executed_at.desc(), CheckExecution.id.desc()).limit(limit)
+
+async def get_check_history(
+    db: AsyncSession,
+    check_id: int,
+    limit: int = 50,
+    before: Optional[datetime] = None,
+    after: Optional[datetime] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    transitions_only: bool = False,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+) -> List[CheckExecution]:
+    """Get execution history for a check, newest first (see history_statement)"""
+    result = await db.execute(
+        history_statement(check_id, limit, before, after, start, end, transitions_only, before_id, after_id)
+    )
+    rows = list(result.scalars().all())
+    if after is not None:
+        rows.reverse()
+    return rows
+
+async def get_latest_execution(db: AsyncSession, check_id: int) -> Optional[CheckExecution]:
+    """Get the most recent execution for a check"""
+    result = await db.execute(
+        select(CheckExecution)
+        .where(CheckExecution.check_id == check_id, CheckExecution.executed_at >= retention_cutoff())
+        .order_by(CheckExecution.executed_at.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
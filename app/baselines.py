@@ -0,0 +1,297 @@
+"""Per-check streaming latency baselines and regression flags.
+
+Each check keeps an exponentially weighted mean / variance of its latency plus a decaying
+LatencySketch. The execution writer scores every run against its check's baseline before
+folding it in (O(1) per execution), and stamps latency_zscore / latency_regression on the
+row. Baselines live in memory and are checkpointed to check_baselines at most every
+BASELINE_CHECKPOINT_SECONDS from the writer's transaction, and once more on shutdown. When
+a shard moves, the losing replica checkpoints its checks' baselines and the gaining one
+reloads them from check_baselines. A run of a check this replica does not own (an ad-hoc
+/checks/{id}/run) is scored against the owner's last checkpoint and leaves it untouched.
+"""
+import logging
+import math
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.models import CheckBaseline
+from app.sketch import LatencySketch
+
+logger = logging.getLogger(__name__)
+
+# weight of the newest run in the EWMA; ~2/alpha runs dominate the baseline
+BASELINE_ALPHA = float(os.getenv("BASELINE_ALPHA", "0.05"))
+# runs observed before a check can be flagged
+BASELINE_WARMUP = int(os.getenv("BASELINE_WARMUP", "30"))
+# a regression is at least this many standard deviations above the mean ...
+BASELINE_Z_THRESHOLD = float(os.getenv("BASELINE_Z_THRESHOLD", "4"))
+# ... above the baseline's BASELINE_QUANTILE, so heavy-tailed checks do not flag their usual outliers ...
+BASELINE_QUANTILE = float(os.getenv("BASELINE_QUANTILE", "0.99"))
+# ... and this many ms slower than the mean, so a 5ms -> 12ms blip on a fast check is not flagged
+BASELINE_MIN_DELTA_MS = float(os.getenv("BASELINE_MIN_DELTA_MS", "50"))
+# the sketch halves its counts whenever it holds twice this many runs
+BASELINE_SKETCH_WINDOW = int(os.getenv("BASELINE_SKETCH_WINDOW", "1000"))
+BASELINE_CHECKPOINT_SECONDS = float(os.getenv("BASELINE_CHECKPOINT_SECONDS", "60"))
+
+
+class LatencyBaseline:
+    """EWMA mean / variance and a decaying quantile sketch of one check's latency."""
+
+    def __init__(self, mean: float = 0.0, variance: float = 0.0, samples: int = 0, sketch: LatencySketch = None):
+        self.mean = mean
+        self.variance = variance
+        self.samples = samples
+        self.sketch = sketch or LatencySketch()
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def zscore(self, latency_ms: float) -> Optional[float]:
+        if self.samples < 2 or self.std == 0:
+            return None
+        return (latency_ms - self.mean) / self.std
+
+    def is_regression(self, latency_ms: float) -> bool:
+        if self.samples < BASELINE_WARMUP:
+            return False
+        z = self.zscore(latency_ms)
+        if z is None or z < BASELINE_Z_THRESHOLD or latency_ms - self.mean < BASELINE_MIN_DELTA_MS:
+            return False
+        return latency_ms > self.sketch.quantile(BASELINE_QUANTILE)
+
+    def update(self, latency_ms: float, alpha: float = BASELINE_ALPHA):
+        """Fold a run in; outliers are clipped to the z threshold so one spike cannot skew the baseline.
+
+        A lasting shift still moves the mean a little every run, so a new normal is adopted
+        after enough runs instead of being flagged forever.
+        """
+        if self.samples == 0:
+            self.mean = latency_ms
+        else:
+            if self.samples >= BASELINE_WARMUP and self.std:
+                latency_ms = min(latency_ms, self.mean + BASELINE_Z_THRESHOLD * self.std)
+            # West's incremental exponentially weighted variance
+            diff = latency_ms - self.mean
+            increment = alpha * diff
+            self.mean += increment
+            self.variance = (1 - alpha) * (self.variance + diff * increment)
+        self.samples += 1
+        self.sketch.add(latency_ms)
+        if self.sketch.count >= 2 * BASELINE_SKETCH_WINDOW:
+            self.sketch.decay()
+
+    def copy(self) -> "LatencyBaseline":
+        return LatencyBaseline(self.mean, self.variance, self.samples, LatencySketch.from_dict(self.sketch.to_dict()))
+
+    def values(self) -> dict:
+        return {
+            "mean_ms": self.mean,
+            "variance": self.variance,
+            "samples": self.samples,
+            "sketch": self.sketch.to_dict(),
+        }
+
+    def summary(self) -> dict:
+        return {
+            "samples": self.samples,
+            "mean_ms": self.mean if self.samples else None,
+            "std_ms": self.std if self.samples else None,
+            "p50_ms": self.sketch.quantile(0.50),
+            "p90_ms": self.sketch.quantile(0.90),
+            "p99_ms": self.sketch.quantile(0.99),
+        }
+
+    @classmethod
+    def from_row(cls, row: CheckBaseline) -> "LatencyBaseline":
+        return cls(row.mean_ms, row.variance, row.samples, LatencySketch.from_dict(row.sketch))
+
+
+class BaselineTracker:
+    """LatencyBaseline per check id, with the set changed since the last checkpoint.
+
+    Only checks for which `owns` is true are tracked; the scheduler points it at its shard
+    coordinator, and until then every check is owned.
+    """
+
+    def __init__(
+        self, checkpoint_seconds: float = BASELINE_CHECKPOINT_SECONDS, owns: Optional[Callable[[int], bool]] = None
+    ):
+        self.checkpoint_seconds = checkpoint_seconds
+        self.owns: Callable[[int], bool] = owns or (lambda check_id: True)
+        self._baselines: Dict[int, LatencyBaseline] = {}
+        self._dirty: Set[int] = set()
+        self._checkpointed = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._baselines)
+
+    def get(self, check_id: int) -> Optional[LatencyBaseline]:
+        return self._baselines.get(check_id)
+
+    def stage(
+        self, rows: Iterable[dict], checkpoints: Optional[Dict[int, Optional[LatencyBaseline]]] = None
+    ) -> Dict[int, LatencyBaseline]:
+        """Score each row against a copy of its check's baseline, then fold it into the copy.
+
+        The copies replace the tracked baselines only through install(), once the rows are committed.
+        Rows of checks in `checkpoints` (owned by another replica) are only scored, against their
+        entry there, if any.
+        """
+        staged: Dict[int, LatencyBaseline] = {}
+        for row in rows:
+            latency_ms = row.get("latency_ms")
+            if latency_ms is None:
+                row["latency_zscore"] = row["latency_regression"] = None
+                continue
+            if checkpoints and row["check_id"] in checkpoints:
+                checkpoint = checkpoints[row["check_id"]]
+                row["latency_zscore"] = checkpoint.zscore(latency_ms) if checkpoint is not None else None
+                row["latency_regression"] = checkpoint is not None and checkpoint.is_regression(latency_ms)
+                continue
+            baseline = staged.get(row["check_id"])
+            if baseline is None:
+                current = self._baselines.get(row["check_id"])
+                baseline = staged[row["check_id"]] = current.copy() if current is not None else LatencyBaseline()
+            row["latency_zscore"] = baseline.zscore(latency_ms)
+            row["latency_regression"] = baseline.is_regression(latency_ms)
+            baseline.update(latency_ms)
+        return staged
+
+    def install(self, staged: Dict[int, LatencyBaseline], checkpointed: Optional[Iterable[int]] = None):
+        """Make committed baselines current; `checkpointed` ids were written in the same transaction."""
+        self._baselines.update(staged)
+        self._dirty.update(staged)
+        if checkpointed is not None:
+            self._dirty.difference_update(checkpointed)
+            self._checkpointed = time.monotonic()
+
+    async def load(self, db: AsyncSession, check_ids: Iterable[int]):
+        """Load checkpointed baselines for checks not yet in memory."""
+        wanted = [check_id for check_id in set(check_ids) if check_id not in self._baselines]
+        for check_id, baseline in (await read_checkpoints(db, wanted)).items():
+            # a concurrent batch may have started this baseline while the row was loading
+            self._baselines.setdefault(check_id, baseline)
+
+    def checkpoint_due(self, staged: Dict[int, LatencyBaseline]) -> bool:
+        return bool(self._dirty or staged) and time.monotonic() - self._checkpointed >= self.checkpoint_seconds
+
+    async def checkpoint(
+        self,
+        db: AsyncSession,
+        staged: Optional[Dict[int, LatencyBaseline]] = None,
+        check_ids: Optional[Iterable[int]] = None,
+    ) -> List[int]:
+        """Upsert every baseline changed since the last checkpoint, staged ones included (caller commits).
+
+        `check_ids` restricts the checkpoint to those checks. Returns the checkpointed ids, to
+        pass to install() once the transaction committed; a failed commit leaves them dirty
+        for the next checkpoint.
+        """
+        dirty = self._dirty if check_ids is None else self._dirty.intersection(check_ids)
+        current = {check_id: self._baselines[check_id] for check_id in dirty if check_id in self._baselines}
+        current.update(staged or {})
+        now = datetime.utcnow()
+        rows = [{"check_id": check_id, **current[check_id].values(), "updated_at": now} for check_id in sorted(current)]
+        if rows:
+            await _upsert(db, rows)
+        return sorted(current)
+
+    def forget(self, check_id: int):
+        self._baselines.pop(check_id, None)
+        self._dirty.discard(check_id)
+
+    def clear(self):
+        self._baselines.clear()
+        self._dirty.clear()
+
+
+latency_baselines = BaselineTracker()
+
+
+def _upsert(db: AsyncSession, rows: List[dict]):
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(CheckBaseline)
+    columns = {name: stmt.excluded[name] for name in rows[0] if name != "check_id"}
+    return db.execute(stmt.on_conflict_do_update(index_elements=["check_id"], set_=columns), rows)
+
+
+async def read_checkpoints(db: AsyncSession, check_ids: Iterable[int]) -> Dict[int, LatencyBaseline]:
+    """Last checkpointed baseline of each of `check_ids` that has one."""
+    check_ids = list(check_ids)
+    if not check_ids:
+        return {}
+    rows = (await db.scalars(select(CheckBaseline).where(CheckBaseline.check_id.in_(check_ids)))).all()
+    return {row.check_id: LatencyBaseline.from_row(row) for row in rows}
+
+
+async def record_baselines(db: AsyncSession, rows: List[dict]) -> Callable[[], None]:
+    """Flag and fold in a batch of execution rows; checkpoints when one is due (caller commits).
+
+    Returns the callback that makes the new baselines current; call it only after the
+    transaction committed. Checks owned by another replica are scored against their last
+    checkpoint and neither tracked nor checkpointed here.
+    """
+    check_ids = {row["check_id"] for row in rows}
+    owned = {check_id for check_id in check_ids if latency_baselines.owns(check_id)}
+    await latency_baselines.load(db, owned)
+    read = await read_checkpoints(db, check_ids - owned)
+    staged = latency_baselines.stage(rows, {check_id: read.get(check_id) for check_id in check_ids - owned})
+    for row in rows:
+        if row["latency_regression"]:
+            logger.info(f"Latency regression on check {row['check_id']}: {row['latency_ms']:.0f}ms "
+                        f"(z={row['latency_zscore']:.1f})")
+    checkpointed = None
+    if latency_baselines.checkpoint_due(staged):
+        checkpointed = await latency_baselines.checkpoint(db, staged)
+    return lambda: latency_baselines.install(staged, checkpointed)
+
+
+async def checkpoint_baselines():
+    """Shutdown: persist baselines changed since the last checkpoint."""
+    try:
+        async with AsyncSessionLocal() as db:
+            checkpointed = await latency_baselines.checkpoint(db)
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Failed to checkpoint latency baselines: {e}")
+        return
+    latency_baselines.install({}, checkpointed)
+    logger.info(f"Checkpointed {len(checkpointed)} latency baselines")
+
+
+async def release_baselines(check_ids: Iterable[int]):
+    """Shards moved to another replica: checkpoint these checks' baselines for it, then stop tracking them.
+
+    The new owner loads them from check_baselines on its next batch; if the checkpoint fails
+    it resumes from the previous one.
+    """
+    check_ids = [check_id for check_id in check_ids if latency_baselines.get(check_id) is not None]
+    if not check_ids:
+        return
+    try:
+        async with AsyncSessionLocal() as db:
+            await latency_baselines.checkpoint(db, check_ids=check_ids)
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Failed to checkpoint {len(check_ids)} released latency baselines: {e}")
+    for check_id in check_ids:
+        latency_baselines.forget(check_id)
+
+
+async def get_baseline(db: AsyncSession, check_id: int) -> Optional[LatencyBaseline]:
+    """In-memory baseline when this replica tracks the check, else the last checkpoint."""
+    baseline = latency_baselines.get(check_id)
+    if baseline is not None:
+        return baseline
+    row = await db.get(CheckBaseline, check_id)
+    return LatencyBaseline.from_row(row) if row is not None else None
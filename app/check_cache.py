@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.async_crud import get_check
+from app.database import AsyncSessionLocal, async_engine
+from app.http_client import forget_check_host_limits, set_check_host_limits
+from app.models import APICheck, Check
+
+logger = logging.getLogger(__name__)
+
+CHECK_CHANGES_CHANNEL = os.getenv("CHECK_CHANGES_CHANNEL", "check_changes")
+# safety net if a notification is ever lost; 0 keeps entries until invalidated
+CHECK_CACHE_TTL_SECONDS = float(os.getenv("CHECK_CACHE_TTL_SECONDS", "600"))
+CHECK_LISTENER_RETRY_SECONDS = float(os.getenv("CHECK_LISTENER_RETRY_SECONDS", "5"))
+
+ChangeHandler = Callable[[int, str], Awaitable[None]]
+
+
+@dataclass(frozen=True)
+class CheckDefinition:
+    """What a scheduled run needs, prebuilt from the checks row"""
+    id: int
+    name: str
+    interval_minutes: int
+    payload: APICheck
+    loaded_at: float
+
+
+class CheckDefinitionCache:
+    """Validated APICheck payloads keyed by check id.
+
+    Scheduled runs read from here, so a warm entry costs no database access. Entries are
+    dropped by the create/delete endpoints on this replica and by check_changes
+    notifications from other replicas (Postgres LISTEN/NOTIFY).
+
+    The host overrides of the cached checks are what the shared host limiters apply, so an
+    edited or deleted check stops throttling its host once its entry is dropped.
+    """
+
+    def __init__(self, ttl_seconds: float = CHECK_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[int, CheckDefinition] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, db_check: Check) -> CheckDefinition:
+        definition = CheckDefinition(
+            id=db_check.id,
+            name=db_check.name,
+            interval_minutes=db_check.interval_minutes,
+            payload=APICheck.from_check(db_check),
+            loaded_at=time.monotonic(),
+        )
+        self._entries[db_check.id] = definition
+        set_check_host_limits(db_check.id, db_check.url, db_check.host_max_concurrency, db_check.host_rate_per_second)
+        return definition
+
+    def peek(self, check_id: int) -> Optional[CheckDefinition]:
+        definition = self._entries.get(check_id)
+        if definition is None:
+            return None
+        if self.ttl_seconds and time.monotonic() - definition.loaded_at > self.ttl_seconds:
+            self.invalidate(check_id)
+            return None
+        return definition
+
+    async def get(self, check_id: int) -> Optional[CheckDefinition]:
+        """Cached definition, loading it from the database on a miss; None if the check is gone."""
+        definition = self.peek(check_id)
+        if definition is not None:
+            return definition
+        async with AsyncSessionLocal() as db:
+            db_check = await get_check(db, check_id)
+        if db_check is None:
+            return None
+        return self.put(db_check)
+
+    def invalidate(self, check_id: int):
+        if self._entries.pop(check_id, None) is not None:
+            forget_check_host_limits(check_id)
+
+    def clear(self):
+        for check_id in self._entries:
+            forget_check_host_limits(check_id)
+        self._entries.clear()
+
+
+check_cache = CheckDefinitionCache()
+
+_handlers: List[ChangeHandler] = []
+_listener_task: Optional[asyncio.Task] = None
+
+
+def on_check_change(handler: ChangeHandler):
+    """Register a coroutine called with (check_id, op) for changes made on other replicas."""
+    _handlers.append(handler)
+
+
+async def notify_check_changed(db: AsyncSession, check_id: int, op: str):
+    """Tell every replica that a check was upserted or deleted (no-op without Postgres)."""
+    await notify_checks_changed(db, [(check_id, op)])
+    if db.bind.dialect.name == "postgresql":
+        await db.commit()
+
+
+async def notify_checks_changed(db: AsyncSession, changes: Iterable[Tuple[int, str]]):
+    """Queue (check_id, op) notifications in db's transaction; they are delivered when it commits."""
+    payloads = []
+    for check_id, op in changes:
+        check_cache.invalidate(check_id)
+        payloads.append(json.dumps({"id": check_id, "op": op}))
+    if not payloads or db.bind.dialect.name != "postgresql":
+        return
+    # one statement however many checks changed
+    await db.execute(
+        text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+        {"channel": CHECK_CHANGES_CHANNEL, "payloads": payloads},
+    )
+
+
+async def _dispatch(check_id: int, op: str):
+    check_cache.invalidate(check_id)
+    for handler in _handlers:
+        try:
+            await handler(check_id, op)
+        except Exception as e:
+            logger.error(f"Check change handler failed for check {check_id}: {e}")
+
+
+async def _listen():
+    loop = asyncio.get_running_loop()
+    while True:
+        lost = asyncio.Event()
+        try:
+            async with async_engine.connect() as conn:
+                raw = (await conn.get_raw_connection()).driver_connection
+
+                def on_notify(_conn, _pid, _channel, payload):
+                    try:
+                        change = json.loads(payload)
+                        loop.create_task(_dispatch(int(change["id"]), change.get("op", "upsert")))
+                    except (ValueError, KeyError, TypeError):
+                        logger.warning(f"Ignoring malformed check change notification: {payload!r}")
+
+                await raw.add_listener(CHECK_CHANGES_CHANNEL, on_notify)
+                raw.add_termination_listener(lambda _conn: lost.set())
+                logger.info(f"Listening for check changes on {CHECK_CHANGES_CHANNEL}")
+                await lost.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Check change listener failed: {e}")
+        # changes may have been missed while disconnected
+        check_cache.clear()
+        await asyncio.sleep(CHECK_LISTENER_RETRY_SECONDS)
+
+
+async def start_check_listener():
+    """Subscribe to check changes from other replicas; only Postgres supports LISTEN."""
+    global _listener_task
+    if async_engine.dialect.name != "postgresql" or _listener_task is not None:
+        return
+    _listener_task = asyncio.create_task(_listen())
+
+
+async def stop_check_listener():
+    global _listener_task
+    if _listener_task is None:
+        return
+    _listener_task.cancel()
+    try:
+        await _listener_task
+    except asyncio.CancelledError:
+        pass
+    _listener_task = None
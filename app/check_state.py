@@ -0,0 +1,139 @@
+"""Per-check rolling state: failure streaks, PASS/FAIL transitions and flapping.
+
+Every execution updates its check's state in O(1) in the execution writer, which stamps the
+transition on the row and upserts the compact check_states row in the same transaction.
+check_states is the source of truth: each batch reads (and on Postgres locks) the rows of
+its checks, so runs written by any replica see the latest state. A check with no row yet
+is rebuilt from its most recent executions when it is first written.
+"""
+import logging
+import os
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import CheckExecution, CheckState
+from app.partitions import retention_cutoff
+
+logger = logging.getLogger(__name__)
+
+# flap score is an EWMA of "this run changed status" over roughly this many runs
+CHECK_FLAP_WINDOW = int(os.getenv("CHECK_FLAP_WINDOW", "20"))
+# hysteresis: a check starts flapping above the high threshold and stops below the low one
+CHECK_FLAP_HIGH = float(os.getenv("CHECK_FLAP_HIGH", "0.3"))
+CHECK_FLAP_LOW = float(os.getenv("CHECK_FLAP_LOW", "0.15"))
+# executions replayed per check when it has no check_states row yet
+CHECK_STATE_REBUILD_ROWS = int(os.getenv("CHECK_STATE_REBUILD_ROWS", "50"))
+
+FLAP_ALPHA = 2 / (CHECK_FLAP_WINDOW + 1)
+
+FAILED = "PASS->FAIL"
+RECOVERED = "FAIL->PASS"
+
+
+@dataclass
+class RollingState:
+    status: Optional[str] = None
+    consecutive_failures: int = 0
+    consecutive_passes: int = 0
+    last_transition_at: Optional[datetime] = None
+    last_executed_at: Optional[datetime] = None
+    flap_score: float = 0.0
+    flapping: bool = False
+
+    def apply(self, status: str, executed_at: datetime, alpha: float) -> Optional[str]:
+        """Fold one execution into the state; returns its transition, if any."""
+        passed = status == "PASS"
+        # the first execution of a check is a baseline, not a transition
+        transition = None
+        if self.status is not None and (self.status == "PASS") != passed:
+            transition = RECOVERED if passed else FAILED
+            self.last_transition_at = executed_at
+        self.status = "PASS" if passed else "FAIL"
+        self.consecutive_passes = self.consecutive_passes + 1 if passed else 0
+        self.consecutive_failures = 0 if passed else self.consecutive_failures + 1
+        self.last_executed_at = executed_at
+        self.flap_score += alpha * ((transition is not None) - self.flap_score)
+        if self.flapping:
+            self.flapping = self.flap_score >= CHECK_FLAP_LOW
+        else:
+            self.flapping = self.flap_score >= CHECK_FLAP_HIGH
+        return transition
+
+    def values(self) -> dict:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+async def load_states(db: AsyncSession, check_ids: Iterable[int]) -> Dict[int, RollingState]:
+    """Current state of each check, read from check_states inside the caller's transaction.
+
+    The rows are locked (Postgres) so concurrent writers of the same check, e.g. the owning
+    replica's writer and an ad-hoc run on another replica, apply their executions one after
+    the other on fresh state. Checks without a row are rebuilt from their recent executions.
+    """
+    # sorted so concurrent writers lock check_states rows in the same order
+    check_ids = sorted(set(check_ids))
+    if not check_ids:
+        return {}
+    stmt = (
+        select(CheckState)
+        .where(CheckState.check_id.in_(check_ids))
+        .order_by(CheckState.check_id)
+        .with_for_update()
+    )
+    states = {
+        row.check_id: RollingState(**{f.name: getattr(row, f.name) for f in fields(RollingState)})
+        for row in (await db.scalars(stmt)).all()
+    }
+    for check_id in check_ids:
+        if check_id not in states:
+            states[check_id] = await _rebuild(db, check_id)
+    return states
+
+
+async def _rebuild(db: AsyncSession, check_id: int) -> RollingState:
+    """Replay the check's last CHECK_STATE_REBUILD_ROWS executions (served by the history index)."""
+    stmt = (
+        select(CheckExecution.status, CheckExecution.executed_at)
+        .where(CheckExecution.check_id == check_id, CheckExecution.executed_at >= retention_cutoff())
+        .order_by(CheckExecution.executed_at.desc(), CheckExecution.id.desc())
+        .limit(CHECK_STATE_REBUILD_ROWS)
+    )
+    state = RollingState()
+    for status, executed_at in reversed((await db.execute(stmt)).all()):
+        state.apply(status, executed_at, FLAP_ALPHA)
+    return state
+
+
+def _upsert(db: AsyncSession, rows: List[dict]):
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(CheckState)
+    columns = {name: stmt.excluded[name] for name in rows[0] if name != "check_id"}
+    return db.execute(stmt.on_conflict_do_update(index_elements=["check_id"], set_=columns), rows)
+
+
+async def record_transitions(db: AsyncSession, rows: List[dict]):
+    """Apply a batch of execution rows to their checks' states (caller commits).
+
+    Sets transition and consecutive_failures on each row and upserts one check_states row
+    per check in the batch. Nothing is kept in memory, so a failed transaction leaves no trace.
+    """
+    states = await load_states(db, (row["check_id"] for row in rows))
+    for row in rows:
+        state = states[row["check_id"]]
+        row["transition"] = state.apply(row["status"], row["executed_at"], FLAP_ALPHA)
+        row["consecutive_failures"] = state.consecutive_failures
+        if row["transition"]:
+            logger.info(f"Check {row['check_id']} went {row['transition']}")
+    if states:
+        await _upsert(db, [{"check_id": check_id, **states[check_id].values()} for check_id in sorted(states)])
+
+
+async def get_check_state(db: AsyncSession, check_id: int) -> Optional[CheckState]:
+    return await db.get(CheckState, check_id)
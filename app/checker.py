@@ -1,82 +1,262 @@
 import asyncio
 import httpx
 import json
+import os
 import time
 
-DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+from app.fieldpaths import compile_paths
+from app.http_client import BODY_COMPLETE, RequestTrace, get_client, host_limiter
+from app.jsonstream import JSONEventParser, RequiredFieldTracker
+from app.metrics import counter, histogram
+from app.ratelimit import HostLimiter, retry_after_seconds
+from app.shape import ShapeBuilder, fingerprint, shape_of
+from app.validation_cache import CachedValidation, cache_key, validation_cache
+
 MAX_RETRIES = 2
 BACKOFF_SECONDS = 0.5
+# defaults for checks that don't set max_body_bytes / max_read_ms
+MAX_BODY_BYTES = int(os.getenv("CHECK_MAX_BODY_BYTES", str(10 * 1024 * 1024)))
+MAX_READ_SECONDS = float(os.getenv("CHECK_MAX_READ_SECONDS", "30"))
+INVALID_JSON = "Response is not valid JSON"
+
+CHECK_RUNS = counter("check_runs_total", "Checks executed, by result", ("status",))
+CHECK_DURATION = histogram("check_duration_seconds", "Request latency of executed checks")
+CHECK_QUEUE = histogram("check_queue_seconds", "Time checks waited on per-host limiters")
+CHECK_RETRIES = counter("check_retries_total", "Requests retried after a transport error")
+# upper bound on how long a 429's Retry-After may hold back a host
+MAX_RETRY_AFTER_SECONDS = float(os.getenv("CHECK_MAX_RETRY_AFTER_SECONDS", "60"))
+
+
+class ResponseBodyError(Exception):
+    """The response body was rejected before being fully read (too large or too slow)."""
+
 
 # data is the json response parsed into a dict
-# path could be a string like "team.stats.assists"
+# path could be a string like "team.stats.assists", "items.0.id" or "items.*.id"
 def field_exists(data: dict, path: str) -> bool:
-    for key in path.split("."):
-        if key not in data:
-            return False
-        # if key exists, move one level deeper
-        data = data[key]
-    return True
+    return not compile_paths((path,)).missing(data)
+
+
+async def _read_body(
+    response: httpx.Response, max_bytes: int, read_seconds: float, tracker=None, shape: ShapeBuilder | None = None
+):
+    """Read the body in chunks, enforcing the size and time budget.
+
+    With a tracker, chunks are parsed incrementally instead of buffered, and reading stops as
+    soon as every required field is resolved; returns None in that mode, else the body bytes.
+    A shape builder fed in that mode is discarded on an early stop, since it saw only part
+    of the document.
+    """
+    declared = response.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise ResponseBodyError(f"Response body of {declared} bytes exceeds the {max_bytes} byte limit")
+    parser = JSONEventParser() if tracker is not None else None
+    body = bytearray()
+    received = 0
+    try:
+        async with asyncio.timeout(read_seconds):
+            async for chunk in response.aiter_bytes():
+                received += len(chunk)
+                if received > max_bytes:
+                    raise ResponseBodyError(f"Response body exceeds the {max_bytes} byte limit")
+                if parser is None:
+                    body += chunk
+                    continue
+                events = parser.feed(chunk)
+                tracker.feed(events)
+                if shape is not None:
+                    shape.feed(events)
+                if tracker.resolved:
+                    if shape is not None:
+                        shape.discard()
+                    return None
+    except TimeoutError:
+        raise ResponseBodyError(f"Response body not read within {read_seconds:g}s") from None
+    if parser is not None:
+        events = parser.close()
+        tracker.feed(events)
+        if shape is not None:
+            shape.feed(events)
+        return None
+    return bytes(body)
+
+
+def _respect_retry_after(limiter: HostLimiter, response: httpx.Response):
+    # the host told us to slow down: hold back every check against it, not just this one
+    delay = retry_after_seconds(response.headers.get("retry-after"))
+    if delay:
+        limiter.pause(min(delay, MAX_RETRY_AFTER_SECONDS))
+
+
+def _slow_phases(phases: dict, thresholds: dict | None) -> list:
+    slow = []
+    for phase, limit in (thresholds or {}).items():
+        took = phases.get(f"{phase}_ms")
+        if took is not None and took > limit:
+            slow.append(f"{phase} {took:.0f}ms > {limit}ms")
+    return slow
+
+
+def _result(
+    status, status_code, latency_ms, trace,
+    missing_fields=None, error=None, shape=None, queue_ms=None, shape_fingerprint=None, from_cache=False,
+):
+    if shape is not None and shape_fingerprint is None:
+        shape_fingerprint = fingerprint(shape)
+    return {
+        "status": status,
+        "missing_fields": missing_fields or [],
+        "status_code": status_code,
+        "latency_ms": latency_ms,
+        "queue_ms": queue_ms,
+        "error": error,
+        "connection_reused": trace.connection_reused,
+        # connect_ms / tls_ms / ttfb_ms / download_ms of the final attempt
+        **trace.phases(),
+        # structural fingerprint of the body for drift detection (see app.shape)
+        "shape_fingerprint": shape_fingerprint if shape is not None else None,
+        "shape": sorted(shape) if shape is not None else None,
+        # true when a 304 let us reuse the previous body's validation outcome
+        "from_cache": from_cache,
+    }
 
 
 # check is an APICheck object
-async def run_check(check):
-    response = None
+# client defaults to the shared pooled client so connections are reused across runs
+async def run_check(check, client: httpx.AsyncClient | None = None):
+    result = await _run_check(check, client)
+    CHECK_RUNS.labels(result["status"]).inc()
+    if result["latency_ms"] is not None:
+        CHECK_DURATION.observe(result["latency_ms"] / 1000)
+    if result["queue_ms"]:
+        CHECK_QUEUE.observe(result["queue_ms"] / 1000)
+    return result
+
+
+async def _run_check(check, client: httpx.AsyncClient | None):
     latency_ms = None
     last_error = None
+    trace = None
+    status_code = None
+    body = None
+    tracker = None
+    builder = None
+    revalidated = None
+    validators = (None, None)
 
-    async with httpx.AsyncClient(timeout=DEFAULT_TIMEOUT, follow_redirects=True) as client:
-        # wrap http requests in a retry loop
-        for attempt in range(MAX_RETRIES + 1):
-            start_time = time.perf_counter()
-            try:
-                response = await client.request(check.method, str(check.url))
-                # time.perf_counter() for higher precision timing for latency
-                latency_ms = (time.perf_counter() - start_time) * 1000
-                break
-            except httpx.RequestError as exc:
-                latency_ms = (time.perf_counter() - start_time) * 1000
-                last_error = str(exc)
-                if attempt == MAX_RETRIES:
-                    return {
-                        "status": "FAIL",
-                        "missing_fields": [],
-                        "error": f"Request failed after {MAX_RETRIES + 1} attempts: {last_error}",
-                        "status_code": None,
-                        "latency_ms": latency_ms,
-                    }
-                await asyncio.sleep(BACKOFF_SECONDS * (2 ** attempt))
-    try:
-        data = response.json()
-    except json.JSONDecodeError:
-        return {
-            "status": "FAIL",
-            "missing_fields": [],
-            "error": "Response is not valid JSON",
-            "status_code": response.status_code,
-            "latency_ms": latency_ms,
-        }
+    if client is None:
+        client = get_client()
+    loop = asyncio.get_running_loop()
+    limiter = host_limiter(check.url)
+    queue_ms = 0.0
+
+    max_bytes = getattr(check, "max_body_bytes", None) or MAX_BODY_BYTES
+    max_read_ms = getattr(check, "max_read_ms", None)
+    read_seconds = max_read_ms / 1000 if max_read_ms else MAX_READ_SECONDS
+    stream_fields = getattr(check, "stream_fields", False)
+    key = cache_key(check)
+    cached = validation_cache.get(key)
+    headers = cached.conditional_headers() if cached is not None else None
+
+    # wrap http requests in a retry loop
+    for attempt in range(MAX_RETRIES + 1):
+        trace = RequestTrace()
+        tracker = RequiredFieldTracker(check.required_fields) if stream_fields else None
+        builder = ShapeBuilder() if stream_fields else None
+        revalidated = None
+        queued_at = loop.time()
+        try:
+            async with limiter.slot():
+                # time spent waiting on the host limiter is reported apart from latency
+                queue_ms += (loop.time() - queued_at) * 1000
+                start_time = time.perf_counter()
+                async with client.stream(
+                    check.method, str(check.url), headers=headers, extensions={"trace": trace}
+                ) as response:
+                    status_code = response.status_code
+                    if status_code == 429:
+                        _respect_retry_after(limiter, response)
+                    if status_code == 304 and cached is not None:
+                        # unchanged since the cached validation: no body to download or parse
+                        revalidated = cached
+                    else:
+                        body = await _read_body(response, max_bytes, read_seconds, tracker, builder)
+                        validators = (response.headers.get("etag"), response.headers.get("last-modified"))
+                    trace.mark(BODY_COMPLETE)
+            # time.perf_counter() for higher precision timing for latency
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            break
+        except ResponseBodyError as exc:
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            return _result("FAIL", status_code, latency_ms, trace, error=str(exc), queue_ms=queue_ms)
+        except json.JSONDecodeError:
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            return _result("FAIL", status_code, latency_ms, trace, error=INVALID_JSON, queue_ms=queue_ms)
+        except httpx.RequestError as exc:
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            last_error = str(exc)
+            if attempt == MAX_RETRIES:
+                return _result(
+                    "FAIL", None, latency_ms, trace,
+                    error=f"Request failed after {MAX_RETRIES + 1} attempts: {last_error}",
+                    queue_ms=queue_ms,
+                )
+            CHECK_RETRIES.inc()
+            await asyncio.sleep(BACKOFF_SECONDS * (2 ** attempt))
 
     # record any missing fields
-    missing = []
-    for field in check.required_fields:
-        if not field_exists(data, field):
-            missing.append(field)
+    shape_fingerprint = None
+    effective_status = status_code
+    if revalidated is not None:
+        missing = list(revalidated.missing_fields)
+        shape, shape_fingerprint = revalidated.shape, revalidated.shape_fingerprint
+        # the server vouched that the resource is unchanged, so it still answers with the cached status
+        effective_status = revalidated.status_code
+    elif tracker is not None:
+        missing = tracker.missing
+        shape = builder.shape()
+    else:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return _result("FAIL", status_code, latency_ms, trace, error=INVALID_JSON, queue_ms=queue_ms)
+        # compiled once per distinct required_fields and evaluated in a single pass
+        missing = compile_paths(tuple(check.required_fields)).missing(data)
+        shape = shape_of(data)
 
     status = "PASS"
     if missing:
         status = "FAIL"
-    if hasattr(check, "expected_status_code") and response.status_code != check.expected_status_code:
+    if hasattr(check, "expected_status_code") and effective_status != check.expected_status_code:
         status = "FAIL"
+        # error bodies have their own shape; don't let an outage look like drift
+        shape = None
+    elif revalidated is None and any(validators):
+        # remember what this body validated to, for the next conditional request
+        if shape is not None and shape_fingerprint is None:
+            shape_fingerprint = fingerprint(shape)
+        validation_cache.put(key, CachedValidation(
+            etag=validators[0],
+            last_modified=validators[1],
+            status_code=status_code,
+            missing_fields=list(missing),
+            shape=shape,
+            shape_fingerprint=shape_fingerprint,
+        ))
 
     # failure if latency exceeds threshold
     if hasattr(check, "latency_threshold_ms") and check.latency_threshold_ms:
         if latency_ms > check.latency_threshold_ms:
             status = "FAIL"
 
-    return {
-        "status": status,
-        "missing_fields": missing,
-        "status_code": response.status_code,
-        "latency_ms": latency_ms,
-        "error": None,
-    }
\ No newline at end of file
+    # per-phase thresholds tell a slow handshake apart from a slow server
+    error = None
+    slow_phases = _slow_phases(trace.phases(), getattr(check, "phase_thresholds_ms", None))
+    if slow_phases:
+        status = "FAIL"
+        error = "Phase thresholds exceeded: " + ", ".join(slow_phases)
+
+    return _result(
+        status, status_code, latency_ms, trace, missing_fields=missing, error=error, shape=shape, queue_ms=queue_ms,
+        shape_fingerprint=shape_fingerprint, from_cache=revalidated is not None,
+    )
@@ -0,0 +1,102 @@
+"""Command line tools.
+
+    python -m app.cli import checks.yaml [--dry-run] [--prune] [--api-url http://localhost:8000]
+
+`import` upserts the checks of a YAML or JSON manifest (a list of checks, or {"checks": [...]})
+by name. Without --api-url it writes to DATABASE_URL directly and running replicas pick the
+changes up through check_changes notifications (Postgres); with --api-url it posts the
+manifest to POST /checks/bulk, which also schedules the checks on that replica.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import List
+
+import httpx
+import yaml
+from pydantic import ValidationError
+
+from app.database import AsyncSessionLocal, async_engine
+from app.manifest import apply_manifest
+from app.schemas import CheckBulkRequest, CheckCreate
+
+
+class ManifestError(Exception):
+    pass
+
+
+def load_manifest(path: Path) -> List[CheckCreate]:
+    """Parse and validate every entry of a manifest file"""
+    text = path.read_text()
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ManifestError(str(e)) from e
+    else:
+        data = json.loads(text)
+    entries = data.get("checks") if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ManifestError("Manifest must be a list of checks or an object with a 'checks' list")
+    try:
+        return CheckBulkRequest(checks=entries).checks
+    except ValidationError as e:
+        raise ManifestError(str(e)) from e
+
+
+async def _import_direct(checks: List[CheckCreate], prune: bool, dry_run: bool) -> dict:
+    try:
+        async with AsyncSessionLocal() as db:
+            diff, _, _ = await apply_manifest(db, checks, prune=prune, dry_run=dry_run)
+    finally:
+        await async_engine.dispose()
+    return {"dry_run": dry_run, **diff.as_dict()}
+
+
+def _import_via_api(api_url: str, checks: List[CheckCreate], prune: bool, dry_run: bool) -> dict:
+    payload = {"checks": [check.model_dump(mode="json") for check in checks], "prune": prune, "dry_run": dry_run}
+    try:
+        response = httpx.post(f"{api_url.rstrip('/')}/checks/bulk", json=payload, timeout=300)
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        raise ManifestError(f"{api_url} rejected the manifest: HTTP {e.response.status_code} {e.response.text}") from e
+    except httpx.HTTPError as e:
+        raise ManifestError(f"Could not reach {api_url}: {type(e).__name__}: {e}") from e
+    return response.json()
+
+
+def import_command(args: argparse.Namespace) -> int:
+    try:
+        checks = load_manifest(Path(args.manifest))
+    except (OSError, ValueError, ManifestError) as e:
+        print(f"Invalid manifest {args.manifest}: {e}", file=sys.stderr)
+        return 1
+    if args.api_url:
+        try:
+            result = _import_via_api(args.api_url, checks, args.prune, args.dry_run)
+        except ManifestError as e:
+            print(f"Import of {args.manifest} failed: {e}", file=sys.stderr)
+            return 1
+    else:
+        result = asyncio.run(_import_direct(checks, args.prune, args.dry_run))
+    print(json.dumps(result, indent=2, default=str))
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="upsert checks from a YAML/JSON manifest")
+    importer.add_argument("manifest")
+    importer.add_argument("--dry-run", action="store_true", help="print the diff without applying it")
+    importer.add_argument("--prune", action="store_true", help="delete checks that are not in the manifest")
+    importer.add_argument("--api-url", help="apply through POST /checks/bulk on a running instance")
+    importer.set_defaults(handler=import_command)
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,335 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from app.metrics import counter, histogram
+
+logger = logging.getLogger(__name__)
+
+_GOLDEN_RATIO = (math.sqrt(5) - 1) / 2
+
+SCHEDULER_LAG = histogram("scheduler_lag_seconds", "Delay between a run's scheduled fire time and its start")
+SCHEDULER_MISSED = counter(
+    "scheduler_missed_runs_total", "Scheduled runs that never started (misfire, overlap, coalesced)", ("reason",)
+)
+
+
+@dataclass(frozen=True)
+class RunInfo:
+    """Timing of the run in progress, readable from the job via current_run()"""
+    scheduled_at: datetime  # naive UTC fire time the run was due at
+    started_at: datetime  # naive UTC time it got a concurrency slot and started
+    lag_seconds: float
+    # fire times of this job skipped or coalesced since its previous run
+    missed_runs: int
+
+
+_current_run: ContextVar[Optional[RunInfo]] = ContextVar("current_run", default=None)
+
+
+def current_run() -> Optional[RunInfo]:
+    """RunInfo of the dispatcher run executing in this task, None outside one."""
+    return _current_run.get()
+
+
+@dataclass
+class Job:
+    id: str
+    func: Callable[..., Awaitable[Any]]
+    interval_seconds: float
+    args: Tuple = ()
+    next_run: Optional[float] = None  # loop.time() of the next fire, set once the dispatcher is started
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    # fire when (unix time - offset) is a multiple of the interval; None fires one interval after scheduling
+    offset_seconds: Optional[float] = None
+    # fire times dropped since the job was added: late beyond the grace period or still running (skipped),
+    # or merged into one run after falling behind (coalesced)
+    skipped: int = 0
+    coalesced: int = 0
+    missed_since_run: int = 0
+
+    def first_delay(self, wall_now: float) -> float:
+        """Seconds from wall_now to the first fire."""
+        if self.offset_seconds is None:
+            return self.interval_seconds
+        return (self.offset_seconds - wall_now) % self.interval_seconds
+
+
+def phase_offset(key: int, interval_seconds: float) -> float:
+    """Deterministic phase for a job inside its interval.
+
+    Fibonacci hashing (key * golden ratio, mod 1) spreads consecutive keys almost perfectly
+    evenly over the interval, and the same key always gets the same phase on every replica
+    and after restarts.
+    """
+    return ((key * _GOLDEN_RATIO) % 1.0) * interval_seconds
+
+
+def expected_load_profile(jobs: List[Job], seconds: int, wall_now: Optional[float] = None) -> dict:
+    """Expected job starts per second over the next epoch-aligned window of `seconds`.
+
+    Only phase-aligned jobs are counted: their fire times are known in advance.
+    """
+    wall_now = time.time() if wall_now is None else wall_now
+    window_start = math.floor(wall_now / seconds) * seconds
+    per_second = [0] * seconds
+    counted = 0
+    for job in jobs:
+        if job.offset_seconds is None:
+            continue
+        counted += 1
+        t = window_start + (job.offset_seconds - window_start) % job.interval_seconds
+        while t < window_start + seconds:
+            per_second[int(t - window_start)] += 1
+            t += job.interval_seconds
+    total = sum(per_second)
+    mean = total / seconds
+    peak = max(per_second) if per_second else 0
+    return {
+        "seconds": seconds,
+        "window_start": window_start,
+        "jobs": counted,
+        "starts": total,
+        "mean_per_second": mean,
+        "peak_per_second": peak,
+        "peak_to_mean": peak / mean if mean else None,
+        "per_second": per_second,
+    }
+
+
+class CheckDispatcher:
+    """Interval scheduler that fires coroutine jobs as tasks on a single asyncio loop.
+
+    Due jobs are kept in a heap keyed by their next fire time, so one timer task drives any
+    number of jobs. Runs go through a semaphore that caps global concurrency. Mirrors the
+    APScheduler job defaults we used before: a job never overlaps itself (max_instances=1),
+    late fire times are coalesced into a single run, and runs later than misfire_grace_seconds
+    are skipped; both are counted per job. Jobs added with an offset fire at a fixed phase of their interval, aligned to
+    the unix epoch, so jobs sharing an interval are spread out instead of firing together.
+    """
+
+    def __init__(self, concurrency: int = 100, misfire_grace_seconds: float = 30, lag_window: int = 1000):
+        self.concurrency = concurrency
+        self.misfire_grace_seconds = misfire_grace_seconds
+        self.skipped_runs = 0
+        self.coalesced_runs = 0
+        # lag of the most recent runs, for percentiles in scheduler_health
+        self._lag_samples: Deque[float] = deque(maxlen=lag_window)
+        self._jobs: Dict[str, Job] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        # schedule_check_job may be called from FastAPI's threadpool
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._timer_task: Optional[asyncio.Task] = None
+        self._in_flight: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return self._timer_task is not None and not self._timer_task.done()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def add_job(
+        self,
+        func,
+        seconds: float,
+        args=(),
+        id: str = None,
+        replace_existing: bool = True,
+        offset: Optional[float] = None,
+        **kwargs,
+    ):
+        if id is None:
+            raise ValueError("Job id is required")
+        if seconds <= 0:
+            raise ValueError("Job interval must be greater than 0")
+        with self._lock:
+            if id in self._jobs and not replace_existing:
+                raise ValueError(f"Job {id} already exists")
+            job = Job(
+                id=id, func=func, interval_seconds=seconds, args=tuple(args), kwargs=kwargs, offset_seconds=offset,
+            )
+            self._jobs[id] = job
+            if self._loop is not None:
+                self._push(job, self._loop.time() + job.first_delay(time.time()))
+        self._notify()
+        return job
+
+    def remove_job(self, id: str):
+        with self._lock:
+            # the stale heap entry is discarded when it comes due
+            self._jobs.pop(id, None)
+
+    def get_job(self, id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(id)
+
+    def get_jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def lag_percentiles(self) -> dict:
+        """Lag (scheduled fire time to start) over the most recent runs, in seconds."""
+        samples = sorted(self._lag_samples)
+        if not samples:
+            return {"samples": 0, "p50": None, "p90": None, "p99": None, "max": None}
+
+        def rank(q: float) -> float:
+            return samples[min(len(samples) - 1, math.ceil(q * len(samples)) - 1)]
+
+        return {"samples": len(samples), "p50": rank(0.5), "p90": rank(0.9), "p99": rank(0.99), "max": samples[-1]}
+
+    def remove_all_jobs(self):
+        with self._lock:
+            self._jobs.clear()
+            self._heap.clear()
+
+    def start(self):
+        """Start the timer task on the running event loop."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        now, wall_now = self._loop.time(), time.time()
+        with self._lock:
+            self._heap.clear()
+            for job in self._jobs.values():
+                self._push(job, now + job.first_delay(wall_now))
+        self._timer_task = self._loop.create_task(self._run())
+
+    async def shutdown(self, wait: bool = True, timeout: Optional[float] = None):
+        """Stop firing jobs; optionally wait for in-flight runs to finish."""
+        if self._timer_task is not None:
+            self._timer_task.cancel()
+            try:
+                await self._timer_task
+            except asyncio.CancelledError:
+                pass
+            self._timer_task = None
+        tasks = list(self._tasks)
+        if tasks:
+            if wait:
+                done, pending = await asyncio.wait(tasks, timeout=timeout)
+            else:
+                pending = tasks
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        self._loop = None
+
+    def _push(self, job: Job, when: float):
+        job.next_run = when
+        heapq.heappush(self._heap, (when, next(self._seq), job.id))
+
+    def _notify(self):
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            wakeup.set()
+        else:
+            loop.call_soon_threadsafe(wakeup.set)
+
+    async def _run(self):
+        while True:
+            now = self._loop.time()
+            due = self._pop_due(now)
+            with self._lock:
+                delay = self._heap[0][0] - now if self._heap else None
+
+            wall_now = time.time()
+            for job, lateness in due:
+                self._fire(job, lateness, wall_now)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _pop_due(self, now: float) -> List[Tuple[Job, float]]:
+        """Take the jobs due at loop time `now`, each with how late its run is."""
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                when, _, job_id = heapq.heappop(self._heap)
+                job = self._jobs.get(job_id)
+                # drop entries for removed or rescheduled jobs
+                if job is None or job.next_run != when:
+                    continue
+                # coalesce: every fire time up to now becomes one run, judged against the latest of them
+                missed = int((now - when) // job.interval_seconds) + 1
+                latest = when + (missed - 1) * job.interval_seconds
+                self._push(job, latest + job.interval_seconds)
+                if missed > 1:
+                    self._count_missed(job, "coalesced", missed - 1)
+                due.append((job, now - latest))
+        return due
+
+    def _count_missed(self, job: Job, reason: str, count: int = 1):
+        if reason == "coalesced":
+            job.coalesced += count
+            self.coalesced_runs += count
+        else:
+            job.skipped += count
+            self.skipped_runs += count
+        job.missed_since_run += count
+        SCHEDULER_MISSED.labels(reason).inc(count)
+
+    def _fire(self, job: Job, lateness: float, wall_now: float):
+        if lateness > self.misfire_grace_seconds:
+            logger.warning(f"Run of job {job.id} was missed by {lateness:.1f}s; skipping")
+            self._count_missed(job, "misfire")
+            return
+        if job.id in self._in_flight:
+            logger.warning(f"Job {job.id} is still running; skipping this run")
+            self._count_missed(job, "overlap")
+            return
+        self._in_flight.add(job.id)
+        task = self._loop.create_task(self._execute(job, wall_now - lateness))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, job: Job, scheduled_wall: float):
+        try:
+            async with self._semaphore:
+                # lag includes waiting for a concurrency slot: that is the scheduler falling behind too
+                started_wall = time.time()
+                lag = max(0.0, started_wall - scheduled_wall)
+                self._lag_samples.append(lag)
+                SCHEDULER_LAG.observe(lag)
+                missed, job.missed_since_run = job.missed_since_run, 0
+                _current_run.set(RunInfo(
+                    scheduled_at=datetime.utcfromtimestamp(scheduled_wall),
+                    started_at=datetime.utcfromtimestamp(started_wall),
+                    lag_seconds=lag,
+                    missed_runs=missed,
+                ))
+                await job.func(*job.args, **job.kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(f"Job {job.id} raised")
+        finally:
+            self._in_flight.discard(job.id)
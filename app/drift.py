@@ -0,0 +1,76 @@
+import logging
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.check_cache import on_check_change
+from app.models import Check
+from app.shape import Shape, diff_shapes
+
+logger = logging.getLogger(__name__)
+
+
+class ShapeCache:
+    """Last known shape per check, so an unchanged response costs one hash comparison."""
+
+    def __init__(self):
+        self._shapes: Dict[int, Tuple[str, Shape]] = {}
+
+    def get(self, check_id: int) -> Optional[Tuple[str, Shape]]:
+        return self._shapes.get(check_id)
+
+    def set(self, check_id: int, digest: str, shape: Shape):
+        self._shapes[check_id] = (digest, shape)
+
+    def forget(self, check_id: int):
+        self._shapes.pop(check_id, None)
+
+    def clear(self):
+        self._shapes.clear()
+
+
+shape_cache = ShapeCache()
+
+
+async def _forget_changed_shape(check_id: int, op: str):
+    # the check may have moved to another URL on another replica; reload its baseline on the next run
+    shape_cache.forget(check_id)
+
+
+on_check_change(_forget_changed_shape)
+
+
+async def detect_drift(db: AsyncSession, check_id: int, result: dict) -> Optional[dict]:
+    """Compare a run's shape with the check's baseline; returns the diff when it drifted.
+
+    The baseline lives on the checks row and is loaded only on a cache miss; it is rewritten
+    only when the fingerprint changes, so steady-state runs never touch the database.
+    """
+    digest, shape = result.get("shape_fingerprint"), result.get("shape")
+    if digest is None or shape is None:
+        return None
+    cached = shape_cache.get(check_id)
+    if cached is None:
+        row = (await db.execute(
+            select(Check.shape_fingerprint, Check.shape).where(Check.id == check_id)
+        )).first()
+        if row is None:
+            return None
+        cached = (row.shape_fingerprint, frozenset(row.shape or ()))
+    previous, previous_shape = cached
+    if previous == digest:
+        shape_cache.set(check_id, digest, previous_shape)
+        return None
+
+    shape_cache.set(check_id, digest, frozenset(shape))
+    await db.execute(
+        update(Check).where(Check.id == check_id).values(shape_fingerprint=digest, shape=sorted(shape))
+    )
+    await db.commit()
+    if previous is None:
+        # first shape seen for this check is the baseline, not drift
+        return None
+    drift = {"previous_fingerprint": previous, **diff_shapes(previous_shape, shape)}
+    logger.info(f"Schema drift on check {check_id}: {drift}")
+    return drift
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from typing import AsyncIterator, FrozenSet, Iterable, Optional, Set
+
+from app.metrics import counter, gauge
+
+logger = logging.getLogger(__name__)
+
+# events buffered per subscriber; past that the oldest are dropped so a slow consumer never blocks publishers
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+# SSE comment / WebSocket ping interval so proxies keep idle streams open
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+
+EVENTS_DROPPED = counter("events_dropped_total", "Events dropped because a subscriber's queue was full")
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def to_json(event: dict) -> str:
+    return json.dumps(event, default=_json_default)
+
+
+class Subscription:
+    """One consumer of the bus: a bounded queue plus an optional set of check ids."""
+
+    def __init__(self, check_ids: Optional[Iterable[int]] = None, queue_size: int = EVENTS_QUEUE_SIZE):
+        self.check_ids = frozenset(check_ids) if check_ids else None
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.dropped = 0
+
+    def wants(self, event: dict) -> bool:
+        return self.check_ids is None or event.get("check_id") in self.check_ids
+
+    def offer(self, event: dict):
+        if self.queue.full():
+            # a dashboard cares about the latest state: drop the oldest event, not the new one
+            self.queue.get_nowait()
+            self.dropped += 1
+            EVENTS_DROPPED.inc()
+        self.queue.put_nowait(event)
+
+    def take_dropped(self) -> int:
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+
+class EventBus:
+    """In-process publish/subscribe for execution results.
+
+    publish() never waits: it runs on the event loop that persisted the executions and only
+    appends to each subscriber's bounded queue. Every replica has its own bus, so viewers
+    see the checks scheduled on the replica they are connected to plus its ad-hoc runs.
+    """
+
+    def __init__(self, queue_size: int = EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Set[Subscription] = set()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, check_ids: Optional[Iterable[int]] = None) -> Subscription:
+        subscription = Subscription(check_ids, self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def publish(self, event: dict) -> int:
+        """Fan an event out to matching subscribers; returns how many received it."""
+        delivered = 0
+        for subscription in self._subscribers:
+            if subscription.wants(event):
+                subscription.offer(event)
+                delivered += 1
+        return delivered
+
+
+bus = EventBus()
+
+gauge("event_subscribers", "Open SSE / WebSocket execution streams", fn=lambda: len(bus))
+
+
+def execution_event(values: dict) -> dict:
+    """Event published for a persisted check_executions row"""
+    return {"type": "execution", **values}
+
+
+def transition_event(values: dict) -> dict:
+    """Event published when an execution changed its check's status (see app.check_state)"""
+    return {
+        "type": "transition",
+        "check_id": values["check_id"],
+        "transition": values["transition"],
+        "consecutive_failures": values.get("consecutive_failures"),
+        "executed_at": values["executed_at"],
+    }
+
+
+def publish_executions(rows: Iterable[dict]):
+    if not len(bus):
+        return
+    for values in rows:
+        bus.publish(execution_event(values))
+        if values.get("transition"):
+            bus.publish(transition_event(values))
+
+
+async def sse_stream(subscription: Subscription, keepalive: float = EVENTS_KEEPALIVE_SECONDS) -> AsyncIterator[str]:
+    """Server-sent events for a subscription; unsubscribes when the client goes away."""
+    try:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            dropped = subscription.take_dropped()
+            if dropped:
+                yield f"event: dropped\ndata: {to_json({'dropped': dropped})}\n\n"
+            yield f"event: {event['type']}\ndata: {to_json(event)}\n\n"
+    finally:
+        bus.unsubscribe(subscription)
+
+
+async def _ws_send(websocket, subscription: Subscription, keepalive: float):
+    while True:
+        try:
+            event = await asyncio.wait_for(subscription.get(), timeout=keepalive)
+        except asyncio.TimeoutError:
+            await websocket.send_text(to_json({"type": "ping"}))
+            continue
+        dropped = subscription.take_dropped()
+        if dropped:
+            await websocket.send_text(to_json({"type": "dropped", "dropped": dropped}))
+        await websocket.send_text(to_json(event))
+
+
+def _parse_check_ids(check_ids) -> Optional[FrozenSet[int]]:
+    if not check_ids:
+        return None
+    if not isinstance(check_ids, list):
+        raise ValueError("check_ids must be a list of check ids or null")
+    try:
+        return frozenset(int(check_id) for check_id in check_ids)
+    except (TypeError, ValueError):
+        raise ValueError("check_ids must be a list of check ids or null") from None
+
+
+async def _ws_receive(websocket, subscription: Subscription):
+    while True:
+        try:
+            message = await websocket.receive_json()
+        except ValueError:
+            continue
+        # {"check_ids": [1, 2]} narrows the stream, {"check_ids": null} widens it to every check
+        if isinstance(message, dict) and "check_ids" in message:
+            try:
+                subscription.check_ids = _parse_check_ids(message["check_ids"])
+            except ValueError as e:
+                # the stream stays open on its current filter
+                await websocket.send_text(to_json({"type": "error", "error": str(e)}))
+
+
+async def websocket_stream(websocket, subscription: Subscription, keepalive: float = EVENTS_KEEPALIVE_SECONDS):
+    """Send events over an accepted WebSocket until either side closes it."""
+    tasks = [
+        asyncio.create_task(_ws_send(websocket, subscription, keepalive)),
+        asyncio.create_task(_ws_receive(websocket, subscription)),
+    ]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        bus.unsubscribe(subscription)
@@ -0,0 +1,89 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# matches every element of an array (or every value of an object); an empty container passes
+WILDCARD = "*"
+MATCHER_CACHE_SIZE = 4096
+
+
+class PathNode:
+    """One segment of the required-field trie.
+
+    `fields` end here, `subtree` is every field at or below this node (what goes missing
+    together when this node cannot be reached), and `wildcard_fields` are the fields whose
+    first wildcard is this node's "*" child.
+    """
+
+    __slots__ = ("segment", "index", "children", "fields", "subtree", "wildcard", "wildcard_fields")
+
+    def __init__(self, segment: Optional[str] = None, wildcard: bool = False):
+        self.segment = segment
+        # numeric segments address array elements (and still match object keys like "0")
+        self.index = int(segment) if segment and segment.isascii() and segment.isdigit() else None
+        self.children: Dict[str, "PathNode"] = {}
+        self.fields: List[str] = []
+        self.subtree: List[str] = []
+        # true if a wildcard sits on the way to this node
+        self.wildcard = wildcard
+        self.wildcard_fields: List[str] = []
+
+
+class PathMatcher:
+    """Required dot paths compiled into a trie, so a document is walked once for all of them."""
+
+    def __init__(self, fields: Tuple[str, ...]):
+        self.fields = fields
+        self.root = PathNode()
+        for field in dict.fromkeys(fields):
+            node = self.root
+            node.subtree.append(field)
+            first_wildcard = None
+            for segment in field.split("."):
+                if segment == WILDCARD and first_wildcard is None:
+                    first_wildcard = node
+                child = node.children.get(segment)
+                if child is None:
+                    child = node.children[segment] = PathNode(segment, node.wildcard or segment == WILDCARD)
+                node = child
+                node.subtree.append(field)
+            node.fields.append(field)
+            if first_wildcard is not None:
+                first_wildcard.wildcard_fields.append(field)
+
+    def missing(self, data) -> List[str]:
+        """Required fields not present in data, in the order they were declared."""
+        missing = set()
+        _walk(self.root, data, missing)
+        return [field for field in self.fields if field in missing]
+
+
+def _walk(node: PathNode, value, missing: set):
+    for segment, child in node.children.items():
+        if segment == WILDCARD:
+            if isinstance(value, dict):
+                items = value.values()
+            elif isinstance(value, list):
+                items = value
+            else:
+                missing.update(child.subtree)
+                continue
+            for item in items:
+                _walk(child, item, missing)
+                if missing.issuperset(child.subtree):
+                    break
+            continue
+        if isinstance(value, dict) and segment in value:
+            item = value[segment]
+        elif isinstance(value, list) and child.index is not None and child.index < len(value):
+            item = value[child.index]
+        else:
+            missing.update(child.subtree)
+            continue
+        if child.children:
+            _walk(child, item, missing)
+
+
+@lru_cache(maxsize=MATCHER_CACHE_SIZE)
+def compile_paths(fields: Tuple[str, ...]) -> PathMatcher:
+    """Compiled matcher for a check's required_fields, shared by every run of that check."""
+    return PathMatcher(fields)
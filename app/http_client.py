@@ -0,0 +1,214 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.ratelimit import HostLimiter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "200"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "100"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+# default request rate per upstream host; 0 disables rate limiting
+HTTP_HOST_RATE_PER_SECOND = float(os.getenv("HTTP_HOST_RATE_PER_SECOND", "0"))
+HTTP_HOST_BURST = float(os.getenv("HTTP_HOST_BURST", "0"))
+# per-host overrides, e.g. {"api.example.com": {"max_concurrency": 4, "rate_per_second": 2, "burst": 5}}
+HOST_LIMITS: Dict[str, dict] = {
+    host.lower(): limits for host, limits in json.loads(os.getenv("HOST_LIMITS", "{}")).items()
+}
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+
+# one pooled client per event loop: httpx connections are bound to the loop that opened them
+_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+_host_limiters: Dict[asyncio.AbstractEventLoop, Dict[str, HostLimiter]] = {}
+# host overrides of the checks loaded on this replica: host + port -> check id -> (max_concurrency, rate)
+_check_host_limits: Dict[str, Dict[int, Tuple[Optional[int], Optional[float]]]] = {}
+_check_hosts: Dict[int, str] = {}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _build_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    http2 = HTTP2_ENABLED
+    if http2 and not _http2_available():
+        logger.warning("HTTP2_ENABLED=true but the h2 package is not installed; falling back to HTTP/1.1")
+        http2 = False
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(
+        timeout=DEFAULT_TIMEOUT, limits=limits, http2=http2, follow_redirects=True, transport=transport,
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared AsyncClient for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _build_client()
+        _clients[loop] = client
+    return client
+
+
+def _host_key(url) -> str:
+    return urlsplit(str(url)).netloc.lower()
+
+
+def host_limits(url) -> dict:
+    """Limits for the url's host: HOST_LIMITS by host:port or host, else the defaults, lowered by check overrides."""
+    parts = urlsplit(str(url))
+    configured = HOST_LIMITS.get(parts.netloc.lower()) or HOST_LIMITS.get((parts.hostname or "").lower()) or {}
+    limits = {
+        "max_concurrency": int(configured.get("max_concurrency", HTTP_MAX_CONNECTIONS_PER_HOST)),
+        "rate_per_second": float(configured.get("rate_per_second", HTTP_HOST_RATE_PER_SECOND)),
+        "burst": float(configured.get("burst", HTTP_HOST_BURST)),
+    }
+    for max_concurrency, rate_per_second in _check_host_limits.get(_host_key(url), {}).values():
+        if max_concurrency is not None:
+            limits["max_concurrency"] = min(limits["max_concurrency"], max_concurrency)
+        if rate_per_second:
+            limits["rate_per_second"] = min(limits["rate_per_second"] or rate_per_second, rate_per_second)
+    return limits
+
+
+def set_check_host_limits(
+    check_id: int, url, max_concurrency: Optional[int] = None, rate_per_second: Optional[float] = None
+):
+    """Record a check's host overrides, replacing the ones it had (possibly for another host)."""
+    forget_check_host_limits(check_id)
+    if max_concurrency is None and not rate_per_second:
+        return
+    key = _host_key(url)
+    _check_host_limits.setdefault(key, {})[check_id] = (max_concurrency, rate_per_second or None)
+    _check_hosts[check_id] = key
+
+
+def forget_check_host_limits(check_id: int):
+    """Drop a check's host overrides, e.g. once it is edited or deleted."""
+    key = _check_hosts.pop(check_id, None)
+    if key is None:
+        return
+    overrides = _check_host_limits.get(key, {})
+    overrides.pop(check_id, None)
+    if not overrides:
+        _check_host_limits.pop(key, None)
+
+
+def host_limiter(url) -> HostLimiter:
+    """Limiter shared by all requests to a host (host + port, whatever the scheme).
+
+    Checks with host overrides never get a limiter of their own, which would let checks with
+    different overrides together exceed any of them. The host's one limiter applies the lowest
+    of the configured limits and the overrides of the checks currently loaded for the host.
+    The limits are worked out on every call and applied in place, so they loosen again once
+    the strictest check is edited or deleted.
+    """
+    loop = asyncio.get_running_loop()
+    limiters = _host_limiters.setdefault(loop, {})
+    key = _host_key(url)
+    limits = host_limits(url)
+    limiter = limiters.get(key)
+    if limiter is None:
+        limiter = limiters[key] = HostLimiter(limits["max_concurrency"], limits["rate_per_second"], limits["burst"])
+    elif (limiter.max_concurrency, limiter.rate_per_second, limiter.burst) != (
+        limits["max_concurrency"], limits["rate_per_second"] or None, limits["burst"],
+    ):
+        limiter.resize(limits["max_concurrency"], limits["rate_per_second"], limits["burst"])
+    return limiter
+
+
+async def start_http_client(transport: Optional[httpx.AsyncBaseTransport] = None):
+    """Open the pooled client for the running loop (FastAPI startup / scheduler start).
+
+    `transport` replaces the network for every check on this loop, e.g. the stub upstream
+    used by the benchmarks in bench/.
+    """
+    if transport is not None:
+        _clients[asyncio.get_running_loop()] = _build_client(transport)
+    get_client()
+    logger.info(
+        f"HTTP client pool started (max_connections={HTTP_MAX_CONNECTIONS}, "
+        f"per_host={HTTP_MAX_CONNECTIONS_PER_HOST}, http2={HTTP2_ENABLED})"
+    )
+
+
+async def close_http_client():
+    """Close the pooled client for the running loop and drop its keep-alive connections."""
+    loop = asyncio.get_running_loop()
+    _host_limiters.pop(loop, None)
+    client = _clients.pop(loop, None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+        logger.info("HTTP client pool closed")
+
+
+BODY_COMPLETE = "body.complete"
+
+
+class RequestTrace:
+    """httpx "trace" extension callback recording connection reuse and per-phase timings."""
+
+    def __init__(self):
+        self.traced = False
+        self.new_connection = False
+        self.timestamps: Dict[str, float] = {}
+
+    async def __call__(self, event_name: str, info: dict):
+        self.traced = True
+        self.timestamps[event_name] = time.perf_counter()
+        if event_name == "connection.connect_tcp.started":
+            self.new_connection = True
+
+    def mark(self, name: str):
+        """Record a checker-side milestone (e.g. BODY_COMPLETE) on the same clock."""
+        self.timestamps[name] = time.perf_counter()
+
+    @property
+    def connection_reused(self) -> Optional[bool]:
+        # transports that do not emit trace events (e.g. MockTransport) leave this unknown
+        if not self.traced:
+            return None
+        return not self.new_connection
+
+    def _at(self, name: str) -> Optional[float]:
+        if name.startswith("http."):
+            # HTTP/1.1 and HTTP/2 emit the same request events under different prefixes
+            suffix = name[len("http."):]
+            return self.timestamps.get(f"http11.{suffix}", self.timestamps.get(f"http2.{suffix}"))
+        return self.timestamps.get(name)
+
+    def _span(self, start: str, end: str) -> Optional[float]:
+        started, ended = self._at(start), self._at(end)
+        if started is None or ended is None:
+            return None
+        return (ended - started) * 1000
+
+    def phases(self) -> Dict[str, Optional[float]]:
+        """Milliseconds per phase; None when a phase did not happen (e.g. no connect on a reused connection).
+
+        httpcore resolves DNS inside connect_tcp, so name resolution is part of connect_ms.
+        """
+        return {
+            "connect_ms": self._span("connection.connect_tcp.started", "connection.connect_tcp.complete"),
+            "tls_ms": self._span("connection.start_tls.started", "connection.start_tls.complete"),
+            "ttfb_ms": self._span("http.send_request_headers.started", "http.receive_response_headers.complete"),
+            "download_ms": self._span("http.receive_response_headers.complete", BODY_COMPLETE),
+        }
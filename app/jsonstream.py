@@ -0,0 +1,292 @@
+import codecs
+import json
+import re
+from json.decoder import scanstring
+from typing import List, Optional, Tuple
+
+from app.fieldpaths import WILDCARD, PathNode, compile_paths
+
+# structural events: (event, path); path is a tuple of object keys (str) and array indexes (int)
+Event = Tuple[str, tuple]
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?")
+_LITERALS = {"t": ("true", "boolean"), "f": ("false", "boolean"), "n": ("null", "null")}
+
+# parser states
+_VALUE, _VALUE_OR_END, _KEY, _KEY_OR_END, _COLON, _COMMA_OR_END, _DONE = range(7)
+
+
+class JSONEventParser:
+    """Incremental JSON parser that turns byte chunks into structural events.
+
+    Emits start_map / key / end_map, start_array / end_array and one of string / number /
+    boolean / null per scalar, each with the path it sits at. Scalar values are skipped, not
+    decoded, so memory stays bounded by the largest single token rather than the document.
+    Tokens split across chunks are held back until the next feed().
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._state = _VALUE
+        self._stack: List[list] = []  # [kind, path, next array index]
+        self._key_path: tuple = ()
+        # offset (from the opening quote) already searched for the end of an unfinished string
+        self._string_scanned = 0
+
+    @property
+    def done(self) -> bool:
+        return self._state == _DONE
+
+    def feed(self, data: bytes) -> List[Event]:
+        self._buf += self._decoder.decode(data)
+        return self._parse(final=False)
+
+    def close(self) -> List[Event]:
+        """Flush the input; raises json.JSONDecodeError if the document is incomplete."""
+        self._buf += self._decoder.decode(b"", final=True)
+        events = self._parse(final=True)
+        if self._state != _DONE:
+            raise json.JSONDecodeError("Unexpected end of JSON input", self._buf, len(self._buf))
+        return events
+
+    def _error(self, message: str, pos: int):
+        raise json.JSONDecodeError(message, self._buf, pos)
+
+    def _value_path(self) -> tuple:
+        if not self._stack:
+            return ()
+        kind, path, index = self._stack[-1]
+        return self._key_path if kind == "map" else path + (index,)
+
+    def _after_value(self):
+        self._state = _COMMA_OR_END if self._stack else _DONE
+
+    def _end_container(self, events: List[Event]):
+        kind, path, _ = self._stack.pop()
+        events.append(("end_map" if kind == "map" else "end_array", path))
+        self._after_value()
+
+    def _string_end(self, buf: str, start: int):
+        """Index just past the closing quote of the string opening at start, or None if unfinished."""
+        i = start + max(1, self._string_scanned)
+        while True:
+            j = buf.find('"', i)
+            if j < 0:
+                self._string_scanned = len(buf) - start
+                return None
+            backslashes = 0
+            k = j - 1
+            while buf[k] == "\\":
+                backslashes += 1
+                k -= 1
+            if backslashes % 2 == 0:
+                self._string_scanned = 0
+                return j + 1
+            i = j + 1
+
+    def _parse(self, final: bool) -> List[Event]:
+        buf = self._buf
+        n = len(buf)
+        pos = 0
+        events: List[Event] = []
+        while True:
+            while pos < n and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos >= n:
+                break
+            ch = buf[pos]
+            state = self._state
+
+            if state == _VALUE or state == _VALUE_OR_END:
+                if ch == "]" and state == _VALUE_OR_END:
+                    pos += 1
+                    self._end_container(events)
+                    continue
+                path = self._value_path()
+                if ch == "{":
+                    events.append(("start_map", path))
+                    self._stack.append(["map", path, 0])
+                    self._state = _KEY_OR_END
+                    pos += 1
+                elif ch == "[":
+                    events.append(("start_array", path))
+                    self._stack.append(["array", path, 0])
+                    self._state = _VALUE_OR_END
+                    pos += 1
+                elif ch == '"':
+                    end = self._string_end(buf, pos)
+                    if end is None:
+                        break
+                    events.append(("string", path))
+                    pos = end
+                    self._after_value()
+                elif ch == "-" or ch.isdigit():
+                    end = pos + 1
+                    while end < n and buf[end] in _NUMBER_CHARS:
+                        end += 1
+                    if end == n and not final:
+                        break  # the number may continue in the next chunk
+                    if not _NUMBER.fullmatch(buf, pos, end):
+                        self._error("Invalid number", pos)
+                    events.append(("number", path))
+                    pos = end
+                    self._after_value()
+                elif ch in _LITERALS:
+                    literal, event = _LITERALS[ch]
+                    if buf.startswith(literal, pos):
+                        events.append((event, path))
+                        pos += len(literal)
+                        self._after_value()
+                    elif not final and literal.startswith(buf[pos:]):
+                        break
+                    else:
+                        self._error("Invalid literal", pos)
+                else:
+                    self._error("Expecting value", pos)
+
+            elif state == _KEY or state == _KEY_OR_END:
+                if ch == "}" and state == _KEY_OR_END:
+                    pos += 1
+                    self._end_container(events)
+                elif ch == '"':
+                    end = self._string_end(buf, pos)
+                    if end is None:
+                        break
+                    key, _ = scanstring(buf, pos + 1)
+                    self._key_path = self._stack[-1][1] + (key,)
+                    events.append(("key", self._key_path))
+                    self._state = _COLON
+                    pos = end
+                else:
+                    self._error("Expecting property name enclosed in double quotes", pos)
+
+            elif state == _COLON:
+                if ch != ":":
+                    self._error("Expecting ':' delimiter", pos)
+                self._state = _VALUE
+                pos += 1
+
+            elif state == _COMMA_OR_END:
+                kind = self._stack[-1][0]
+                if ch == ",":
+                    if kind == "map":
+                        self._state = _KEY
+                    else:
+                        self._stack[-1][2] += 1
+                        self._state = _VALUE
+                    pos += 1
+                elif (ch == "}" and kind == "map") or (ch == "]" and kind == "array"):
+                    pos += 1
+                    self._end_container(events)
+                else:
+                    self._error("Expecting ',' delimiter", pos)
+
+            else:
+                self._error("Extra data", pos)
+
+        self._buf = buf[pos:]
+        return events
+
+
+class _Frame:
+    """An open container and the trie nodes its value is matched against."""
+
+    __slots__ = ("nodes", "seen")
+
+    def __init__(self, nodes: List[PathNode]):
+        self.nodes = nodes
+        self.seen = [set() for _ in nodes]
+
+
+class RequiredFieldTracker:
+    """Resolves required paths (same syntax as app.fieldpaths) from a stream of parser events.
+
+    A plain path is found when its last key or element is reached. A path is proven missing
+    when a container on its way closes without the next segment, or when a value on its way
+    is not a container. Wildcard paths are found once the array they fan out over closes with
+    every element matching. Once every path is resolved, `resolved` is true and the rest of
+    the body need not be read.
+    """
+
+    def __init__(self, fields: List[str]):
+        self.fields = list(fields)
+        self._root = compile_paths(tuple(fields)).root
+        self._open = set(self._root.subtree)
+        self._missing = set()
+        self._stack: List[_Frame] = []
+        self._next: Optional[List[PathNode]] = None  # nodes for the value after a key
+
+    @property
+    def resolved(self) -> bool:
+        return not self._open
+
+    @property
+    def missing(self) -> List[str]:
+        # anything still open when the document ends was never found
+        missing = self._missing | self._open
+        return [field for field in self.fields if field in missing]
+
+    def _found(self, fields: List[str]):
+        for field in fields:
+            if field not in self._missing:
+                self._open.discard(field)
+
+    def _lose(self, fields: List[str]):
+        for field in fields:
+            if field in self._open:
+                self._open.discard(field)
+                self._missing.add(field)
+
+    def _reach(self, frame: _Frame, segment: str) -> List[PathNode]:
+        reached = []
+        for node, seen in zip(frame.nodes, frame.seen):
+            child = node.children.get(segment)
+            if child is not None:
+                seen.add(segment)
+                reached.append(child)
+                if not child.wildcard:
+                    self._found(child.fields)
+            child = node.children.get(WILDCARD)
+            if child is not None:
+                reached.append(child)
+        return reached
+
+    def _start_value(self, path: tuple) -> List[PathNode]:
+        if not self._stack:
+            return [self._root]
+        if self._next is not None:
+            nodes, self._next = self._next, None
+            return nodes
+        return self._reach(self._stack[-1], str(path[-1]))
+
+    def feed(self, events: List[Event]):
+        for event, path in events:
+            if not self._open:
+                return
+            if event == "key":
+                self._next = self._reach(self._stack[-1], path[-1])
+            elif event == "end_map" or event == "end_array":
+                frame = self._stack.pop()
+                for node, seen in zip(frame.nodes, frame.seen):
+                    for segment, child in node.children.items():
+                        if segment != WILDCARD and segment not in seen:
+                            self._lose(child.subtree)
+                    self._found(node.wildcard_fields)
+            else:
+                nodes = self._start_value(path)
+                if event == "start_map" or event == "start_array":
+                    if event == "start_array":
+                        # arrays only have numeric indexes
+                        for node in nodes:
+                            for child in node.children.values():
+                                if child.index is None and child.segment != WILDCARD:
+                                    self._lose(child.subtree)
+                    self._stack.append(_Frame(nodes))
+                else:
+                    # a scalar: nothing below it can appear
+                    for node in nodes:
+                        for child in node.children.values():
+                            self._lose(child.subtree)
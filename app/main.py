@@ -1,14 +1,37 @@
+import json
 import logging
-from fastapi import FastAPI, Depends, HTTPException, status
-from typing import List
-from sqlalchemy.orm import Session
+from datetime import datetime
+from fastapi import FastAPI, Depends, HTTPException, Query, Response, WebSocket, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from app.models import Check, APICheck
+from app.models import APICheck
 from app.checker import run_check
-from app.crud import create_check, get_checks, get_check, get_check_history, create_execution, delete_check
-from app.schemas import CheckCreate, CheckResponse, CheckExecutionResponse
-from app.database import get_db
-from app.scheduler import start_scheduler, stop_scheduler, schedule_check_job, scheduler_health
+from app.adhoc import RUN_CHECKS_MAX_BATCH, run_checks
+from app.async_crud import (
+    create_check, get_checks, get_check, get_check_by_name, get_check_history, delete_check,
+)
+from app.schemas import (
+    CheckBulkRequest, CheckBulkResponse, CheckCreate, CheckResponse, CheckExecutionResponse, CheckStatsResponse,
+    CheckBaselineResponse, CheckStateResponse, RunChecksRequest,
+)
+from app.rollups import get_stats, parse_window
+from app.database import get_async_db
+from app.http_client import start_http_client, close_http_client
+from app.metrics import CONTENT_TYPE, REGISTRY, loop_lag_monitor
+from app.writer import execution_values, execution_writer
+from app.drift import detect_drift, shape_cache
+from app.alerts import alert_pipeline
+from app.baselines import checkpoint_baselines, get_baseline, latency_baselines
+from app.check_state import get_check_state
+from app.events import bus, sse_stream, websocket_stream
+from app.manifest import apply_manifest
+from app.check_cache import check_cache, notify_check_changed, start_check_listener, stop_check_listener
+from app.scheduler import (
+    start_scheduler, stop_scheduler, schedule_check_job, schedule_check_jobs, unschedule_check_job, scheduler_health,
+    load_profile,
+)
 
 # configure logging to see scheduler output
 logging.basicConfig(level=logging.INFO)
@@ -16,30 +39,55 @@ logging.basicConfig(level=logging.INFO)
 app = FastAPI()
 
 @app.on_event("startup")
-def startup_event():
-    """Start scheduler on app startup"""
-    start_scheduler()
+async def startup_event():
+    """Open the pooled HTTP client, start the execution writer and the scheduler on app startup"""
+    await start_http_client()
+    loop_lag_monitor.start()
+    alert_pipeline.start()
+    execution_writer.start()
+    await start_check_listener()
+    await start_scheduler()
 
 @app.on_event("shutdown")
-def shutdown_event():
-    """Stop scheduler on app shutdown"""
-    stop_scheduler()
+async def shutdown_event():
+    """Stop scheduler, flush buffered executions and close the pooled HTTP client on app shutdown"""
+    await stop_scheduler()
+    await stop_check_listener()
+    await execution_writer.stop()
+    await checkpoint_baselines()
+    await alert_pipeline.stop()
+    await loop_lag_monitor.stop()
+    await close_http_client()
 
 @app.post("/run-check")
-async def run_api_check(check: APICheck, db: Session = Depends(get_db)):
+async def run_api_check(check: APICheck):
     try:
         result = await run_check(check)
+        # the full shape is only kept for drift detection on stored checks
+        result.pop("shape", None)
         return result
     except Exception as e:
         logging.exception("Failed to execute ad-hoc check")
         raise HTTPException(status_code=500, detail="Failed to execute check") from e
 
+@app.post("/run-checks")
+async def run_api_checks(request: RunChecksRequest):
+    """Run a batch of ad-hoc checks concurrently, streaming one NDJSON line per result as it completes"""
+    if len(request.checks) > RUN_CHECKS_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {RUN_CHECKS_MAX_BATCH} checks per request")
+
+    async def lines():
+        async for item in run_checks(request.checks, request.concurrency, request.fail_fast):
+            yield json.dumps(item, default=str) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @app.post("/checks", response_model=CheckResponse, status_code=status.HTTP_201_CREATED)
-def create_check_endpoint(check: CheckCreate, db: Session = Depends(get_db)):
-    existing = db.query(Check).filter(Check.name == check.name).first()
+async def create_check_endpoint(check: CheckCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await get_check_by_name(db, check.name)
     if existing:
         raise HTTPException(status_code=400, detail="Check with this name already exists")
-    db_check = create_check(
+    db_check = await create_check(
         db,
         check.name,
         check.url,
@@ -47,56 +95,135 @@ def create_check_endpoint(check: CheckCreate, db: Session = Depends(get_db)):
         check.expected_status_code,
         check.latency_threshold_ms,
         check.interval_minutes,
+        check.max_body_bytes,
+        check.max_read_ms,
+        check.stream_fields,
+        check.host_max_concurrency,
+        check.host_rate_per_second,
+        check.phase_thresholds_ms,
     )
+    await notify_check_changed(db, db_check.id, "upsert")
     try:
-        schedule_check_job(db_check)
+        schedule_check_job(check_cache.put(db_check))
     except Exception:
         logging.exception(f"Failed to schedule new check {db_check.id}")
     return db_check
 
+@app.post("/checks/bulk", response_model=CheckBulkResponse)
+async def bulk_checks_endpoint(request: CheckBulkRequest, db: AsyncSession = Depends(get_async_db)):
+    """Upsert a manifest of checks by name in one transaction; dry_run only reports the diff"""
+    diff, upserted, removed_ids = await apply_manifest(db, request.checks, prune=request.prune, dry_run=request.dry_run)
+    if not request.dry_run:
+        # removals first: SQLite may hand a removed id to a newly added check
+        for check_id in removed_ids:
+            unschedule_check_job(check_id)
+            shape_cache.forget(check_id)
+            alert_pipeline.forget(check_id)
+            latency_baselines.forget(check_id)
+        for db_check in upserted:
+            # a changed URL cleared the stored shape; reload it on the next run
+            shape_cache.forget(db_check.id)
+        schedule_check_jobs([check_cache.put(db_check) for db_check in upserted])
+    return {"dry_run": request.dry_run, **diff.as_dict()}
+
 @app.get("/checks", response_model=List[CheckResponse])
-def list_checks(db: Session = Depends(get_db)):
-    return get_checks(db)
+async def list_checks(db: AsyncSession = Depends(get_async_db)):
+    return await get_checks(db)
 
 @app.get("/checks/{check_id}", response_model=CheckResponse)
-def get_check_endpoint(check_id: int, db: Session = Depends(get_db)):
-    db_check = get_check(db, check_id)
+async def get_check_endpoint(check_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_check = await get_check(db, check_id)
     if not db_check:
         raise HTTPException(status_code=404, detail="Check not found")
     return db_check
 
 @app.delete("/checks/{check_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_check_endpoint(check_id: int, db: Session = Depends(get_db)):
+async def delete_check_endpoint(check_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a check by ID"""
-    db_check = get_check(db, check_id)
+    db_check = await get_check(db, check_id)
     if not db_check:
         raise HTTPException(status_code=404, detail="Check not found")
-    delete_check(db, check_id)
+    await delete_check(db, check_id)
+    await notify_check_changed(db, check_id, "delete")
+    unschedule_check_job(check_id)
+    shape_cache.forget(check_id)
+    alert_pipeline.forget(check_id)
+    latency_baselines.forget(check_id)
     return None
 
 @app.get("/checks/{check_id}/history", response_model=List[CheckExecutionResponse])
-def get_check_history_endpoint(check_id: int, limit: int = 10, db: Session = Depends(get_db)):
-    db_check = get_check(db, check_id)
+async def get_check_history_endpoint(
+    check_id: int,
+    limit: int = Query(10, ge=1, le=1000),
+    before: Optional[datetime] = None,
+    after: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    transitions_only: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Execution history, newest first.
+
+    Page backwards by passing the oldest row on the current page as `before` (its executed_at)
+    and `before_id` (its id), or forwards with the newest one as `after` / `after_id`;
+    `start` / `end` restrict the time range. `transitions_only` keeps just the runs that
+    flipped the check between PASS and FAIL.
+    """
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    if (before_id is not None and before is None) or (after_id is not None and after is None):
+        raise HTTPException(status_code=400, detail="before_id / after_id need before / after")
+    db_check = await get_check(db, check_id)
     if not db_check:
         raise HTTPException(status_code=404, detail="Check not found")
-    history = get_check_history(db, check_id, limit=limit)
+    history = await get_check_history(
+        db, check_id, limit=limit, before=before, after=after, start=start, end=end,
+        transitions_only=transitions_only, before_id=before_id, after_id=after_id,
+    )
     return history
 
+@app.get("/checks/{check_id}/stats", response_model=CheckStatsResponse)
+async def get_check_stats_endpoint(check_id: int, window: str = "24h", db: AsyncSession = Depends(get_async_db)):
+    """Availability and latency percentiles over `window` (e.g. 90m, 24h, 7d), served from rollups"""
+    try:
+        window_delta = parse_window(window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    db_check = await get_check(db, check_id)
+    if not db_check:
+        raise HTTPException(status_code=404, detail="Check not found")
+    stats = await get_stats(db, check_id, window_delta)
+    return {"window": window, **stats}
+
+@app.get("/checks/{check_id}/state", response_model=CheckStateResponse)
+async def get_check_state_endpoint(check_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Current failure streak, last transition and flapping status, as of the last persisted run"""
+    db_check = await get_check(db, check_id)
+    if not db_check:
+        raise HTTPException(status_code=404, detail="Check not found")
+    state = await get_check_state(db, check_id)
+    return state if state is not None else CheckStateResponse(check_id=check_id)
+
+@app.get("/checks/{check_id}/baseline", response_model=CheckBaselineResponse)
+async def get_check_baseline_endpoint(check_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Streaming latency baseline runs are scored against (mean, std and sketch percentiles)"""
+    db_check = await get_check(db, check_id)
+    if not db_check:
+        raise HTTPException(status_code=404, detail="Check not found")
+    baseline = await get_baseline(db, check_id)
+    return {"check_id": check_id, **(baseline.summary() if baseline is not None else {})}
+
 @app.post("/checks/{check_id}/run", response_model=CheckExecutionResponse)
-async def run_check_endpoint(check_id: int, db: Session = Depends(get_db)):
+async def run_check_endpoint(check_id: int, db: AsyncSession = Depends(get_async_db)):
     """Run a check and save the execution result to database"""
-    db_check = get_check(db, check_id)
+    db_check = await get_check(db, check_id)
     if not db_check:
         raise HTTPException(status_code=404, detail="Check not found")
 
     # Build APICheck from stored check
-    payload = APICheck(
-        method="GET",
-        url=db_check.url,
-        required_fields=db_check.required_fields,
-        expected_status_code=db_check.expected_status_code,
-        latency_threshold_ms=db_check.latency_threshold_ms,
-    )
+    payload = APICheck.from_check(db_check)
     # Run the check
 
     try:
@@ -105,25 +232,57 @@ async def run_check_endpoint(check_id: int, db: Session = Depends(get_db)):
         logging.exception(f"Failed to execute check {check_id}")
         raise HTTPException(status_code=500, detail="Failed to execute check") from e
 
-    # Save execution to database
-    execution = create_execution(
-        db=db,
-        check_id=db_check.id,
-        status=result.get("status", "FAIL"),
-        missing_fields=result.get("missing_fields", []),
-        actual_status_code=result.get("status_code"),
-        latency_ms=result.get("latency_ms"),
-        error=result.get("error"),
-    )
+    result["schema_drift"] = await detect_drift(db, db_check.id, result)
+
+    # Save execution to database; write() flushes right away and returns the persisted row
+    execution = await execution_writer.write(execution_values(db_check.id, result))
     return execution
 
 
+@app.get("/events/stream")
+async def events_stream(check_id: Optional[List[int]] = Query(None)):
+    """Server-sent events for executions as they are persisted; repeat check_id to filter"""
+    return StreamingResponse(
+        sse_stream(bus.subscribe(check_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/events/ws")
+async def events_websocket(websocket: WebSocket, check_id: Optional[List[int]] = Query(None)):
+    """Executions as JSON messages; send {"check_ids": [...]} to change the filter"""
+    # subscribed before accepting so nothing persisted after the handshake is missed
+    subscription = bus.subscribe(check_id)
+    try:
+        await websocket.accept()
+    except Exception:
+        bus.unsubscribe(subscription)
+        raise
+    await websocket_stream(websocket, subscription)
+
+
+@app.get("/alerts")
+async def list_alerts():
+    """Alerts currently firing on this replica"""
+    return {
+        "enabled": alert_pipeline.running,
+        "pending": alert_pipeline.pending,
+        "active": [alert.as_dict() for alert in alert_pipeline.active()],
+    }
+
+
+@app.get("/scheduler/load-profile")
+async def scheduler_load_profile(seconds: Optional[int] = Query(None, ge=1, le=86400)):
+    """Expected check starts per second over the next window, to verify that runs are staggered"""
+    return load_profile(seconds)
+
+
 @app.get("/health")
-def health(db: Session = Depends(get_db)):
+async def health(db: AsyncSession = Depends(get_async_db)):
     """Simple health endpoint exposing DB connectivity and scheduler state"""
     scheduler_status = scheduler_health()
     try:
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         db_status = "ok"
     except Exception:
         logging.exception("Health check DB failure")
@@ -132,3 +291,8 @@ def health(db: Session = Depends(get_db)):
         "db": db_status,
         "scheduler": scheduler_status,
     }
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,103 @@
+"""Declarative check manifests: diff a desired set of checks against the checks table and apply it."""
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.check_cache import notify_checks_changed
+from app.models import Check
+from app.schemas import CheckCreate
+
+# ids per DELETE ... WHERE id IN (...), well under SQLite's bound parameter limit
+DELETE_CHUNK = 1000
+
+
+@dataclass
+class CheckDiff:
+    added: List[str] = field(default_factory=list)
+    changed: List[dict] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    def as_dict(self) -> dict:
+        return {"added": self.added, "changed": self.changed, "removed": self.removed, "unchanged": self.unchanged}
+
+
+def check_values(check: CheckCreate) -> dict:
+    """Column values for a manifest entry, as create_check would store them"""
+    values = check.model_dump(exclude={"name"})
+    values["url"] = str(check.url)
+    for name, value in values.items():
+        # an omitted setting gets the column default on insert, so that is what it compares against
+        default = Check.__table__.c[name].default
+        if value is None and default is not None and default.is_scalar:
+            values[name] = default.arg
+    return values
+
+
+def diff_checks(existing: Dict[str, Check], desired: List[CheckCreate], prune: bool = False) -> CheckDiff:
+    """What applying `desired` would do to `existing` (checks keyed by name)"""
+    diff = CheckDiff()
+    for check in desired:
+        row = existing.get(check.name)
+        if row is None:
+            diff.added.append(check.name)
+            continue
+        changes = {
+            name: {"from": getattr(row, name), "to": value}
+            for name, value in check_values(check).items()
+            if getattr(row, name) != value
+        }
+        if changes:
+            diff.changed.append({"name": check.name, "changes": changes})
+        else:
+            diff.unchanged += 1
+    if prune:
+        wanted = {check.name for check in desired}
+        diff.removed = sorted(name for name in existing if name not in wanted)
+    return diff
+
+
+async def apply_manifest(
+    db: AsyncSession, desired: List[CheckCreate], prune: bool = False, dry_run: bool = False
+) -> Tuple[CheckDiff, List[Check], List[int]]:
+    """Upsert `desired` by name (and delete checks missing from it with prune) in one transaction.
+
+    Returns the diff, the added or changed rows and the ids of removed checks. Inserts and
+    updates go through one flush, which batches them into multi-row statements, and every
+    replica is notified of the changes when the transaction commits.
+    """
+    existing = {row.name: row for row in (await db.scalars(select(Check))).all()}
+    diff = diff_checks(existing, desired, prune)
+    if dry_run:
+        return diff, [], []
+
+    by_name = {check.name: check for check in desired}
+    try:
+        added = [Check(name=name, **check_values(by_name[name])) for name in diff.added]
+        db.add_all(added)
+        changed = []
+        for change in diff.changed:
+            row = existing[change["name"]]
+            for name, values in change["changes"].items():
+                setattr(row, name, values["to"])
+            if "url" in change["changes"]:
+                # another endpoint has its own shape: the next run sets a new drift baseline
+                row.shape = row.shape_fingerprint = None
+            changed.append(row)
+        removed_ids = [existing[name].id for name in diff.removed]
+        for start in range(0, len(removed_ids), DELETE_CHUNK):
+            await db.execute(delete(Check).where(Check.id.in_(removed_ids[start:start + DELETE_CHUNK])))
+        # assigns ids to the new rows before the notifications reference them
+        await db.flush()
+
+        upserted = added + changed
+        await notify_checks_changed(
+            db, [(row.id, "upsert") for row in upserted] + [(check_id, "delete") for check_id in removed_ids]
+        )
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return diff, upserted, removed_ids
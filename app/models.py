@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, DateTime, JSON, String, ForeignKey, Text
+from sqlalchemy import Boolean, Column, Float, Index, Integer, DateTime, JSON, String, ForeignKey, Text
 from pydantic import BaseModel, HttpUrl
-from typing import List, Literal, Optional
+from typing import Dict, List, Literal, Optional
 from datetime import datetime
 from app.database import Base
 
+# request phases that can carry their own threshold (see app.http_client.RequestTrace.phases)
+Phase = Literal["connect", "tls", "ttfb", "download"]
+
 # represents what must be true for the api to be considered "healthy"
 class APICheck(BaseModel):
     method: Literal["GET"] # only GET is supported (for now)
@@ -11,6 +14,30 @@ class APICheck(BaseModel):
     required_fields: List[str]
     expected_status_code: int = 200
     latency_threshold_ms: Optional[int] = None
+    max_body_bytes: Optional[int] = None  # falls back to CHECK_MAX_BODY_BYTES
+    max_read_ms: Optional[int] = None  # falls back to CHECK_MAX_READ_SECONDS
+    stream_fields: bool = False  # parse incrementally and stop reading once required_fields resolve
+    # host overrides apply while the check is saved; ad-hoc runs use the host's current limits
+    host_max_concurrency: Optional[int] = None  # lowers HOST_LIMITS / HTTP_MAX_CONNECTIONS_PER_HOST for the host
+    host_rate_per_second: Optional[float] = None  # lowers HOST_LIMITS / HTTP_HOST_RATE_PER_SECOND for the host
+    phase_thresholds_ms: Optional[Dict[Phase, int]] = None  # e.g. {"ttfb": 500}; exceeding any phase fails the run
+
+    @classmethod
+    def from_check(cls, db_check: "Check") -> "APICheck":
+        """Build the runnable payload for a stored check"""
+        return cls(
+            method="GET",
+            url=db_check.url,
+            required_fields=db_check.required_fields,
+            expected_status_code=db_check.expected_status_code,
+            latency_threshold_ms=db_check.latency_threshold_ms,
+            max_body_bytes=db_check.max_body_bytes,
+            max_read_ms=db_check.max_read_ms,
+            stream_fields=bool(db_check.stream_fields),
+            host_max_concurrency=db_check.host_max_concurrency,
+            host_rate_per_second=db_check.host_rate_per_second,
+            phase_thresholds_ms=db_check.phase_thresholds_ms,
+        )
 
 class Check(Base):
     __tablename__ = "checks"
@@ -22,6 +49,15 @@ class Check(Base):
     expected_status_code = Column(Integer, default=200)
     latency_threshold_ms = Column(Integer, default=1000)
     interval_minutes = Column(Integer, default=5)  # Run every 5 minutes by default
+    max_body_bytes = Column(Integer, nullable=True)
+    max_read_ms = Column(Integer, nullable=True)
+    stream_fields = Column(Boolean, nullable=False, default=False)
+    host_max_concurrency = Column(Integer, nullable=True)
+    host_rate_per_second = Column(Float, nullable=True)
+    phase_thresholds_ms = Column(JSON, nullable=True)
+    # last known response shape (app.shape), the baseline drift is measured against
+    shape_fingerprint = Column(String(32), nullable=True)
+    shape = Column(JSON, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 class CheckExecution(Base):
@@ -33,5 +69,92 @@ class CheckExecution(Base):
     missing_fields = Column(JSON, nullable=True)
     actual_status_code = Column(Integer, nullable=True)
     latency_ms = Column(Integer, nullable=True)
+    queue_ms = Column(Integer, nullable=True)  # waited on the per-host limiter; not part of latency_ms
     error = Column(Text, nullable=True)
-    executed_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    connection_reused = Column(Boolean, nullable=True)  # False means the run paid for a fresh TCP/TLS handshake
+    # phase breakdown of latency_ms; connect includes DNS, connect/tls are null on a reused connection
+    connect_ms = Column(Integer, nullable=True)
+    tls_ms = Column(Integer, nullable=True)
+    ttfb_ms = Column(Integer, nullable=True)
+    download_ms = Column(Integer, nullable=True)
+    shape_fingerprint = Column(String(32), nullable=True)
+    schema_drift = Column(JSON, nullable=True)  # set only on runs whose shape differs from the previous one
+    from_cache = Column(Boolean, nullable=True)  # 304: body validation reused from the previous full response
+    # scheduled runs only: when the run was due, when it actually started, and how many earlier
+    # fire times of the check were skipped or coalesced since its previous run
+    scheduled_at = Column(DateTime, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    missed_runs = Column(Integer, nullable=True)
+    # stamped by app.check_state: "PASS->FAIL" / "FAIL->PASS" when the status changed, and the failure streak
+    transition = Column(String(16), nullable=True)
+    consecutive_failures = Column(Integer, nullable=True)
+    # stamped by app.baselines: how unusual latency_ms was for this check, and whether it counts as a regression
+    latency_zscore = Column(Float, nullable=True)
+    latency_regression = Column(Boolean, nullable=True)
+    # partition key on Postgres (daily range partitions, see app.partitions)
+    executed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+# serves get_check_history (filter on check_id, newest first, id breaks ties) without a sort
+Index(
+    "ix_check_executions_check_id_executed_at",
+    CheckExecution.check_id,
+    CheckExecution.executed_at.desc(),
+    CheckExecution.id.desc(),
+)
+
+# transitions only (GET /checks/{id}/history?transitions_only=true); a small fraction of all executions
+Index(
+    "ix_check_executions_transitions",
+    CheckExecution.check_id,
+    CheckExecution.executed_at.desc(),
+    CheckExecution.id.desc(),
+    postgresql_where=CheckExecution.transition.isnot(None),
+    sqlite_where=CheckExecution.transition.isnot(None),
+)
+
+class CheckState(Base):
+    """Rolling status of a check, maintained incrementally by app.check_state"""
+    __tablename__ = "check_states"
+
+    check_id = Column(Integer, ForeignKey("checks.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(String, nullable=True)  # status of the latest execution
+    consecutive_failures = Column(Integer, nullable=False, default=0)
+    consecutive_passes = Column(Integer, nullable=False, default=0)
+    last_transition_at = Column(DateTime, nullable=True)
+    last_executed_at = Column(DateTime, nullable=True)
+    flap_score = Column(Float, nullable=False, default=0)  # EWMA of status changes per run, 0..1
+    flapping = Column(Boolean, nullable=False, default=False)
+
+class CheckBaseline(Base):
+    """Checkpoint of a check's streaming latency baseline (app.baselines)"""
+    __tablename__ = "check_baselines"
+
+    check_id = Column(Integer, ForeignKey("checks.id", ondelete="CASCADE"), primary_key=True)
+    mean_ms = Column(Float, nullable=False, default=0)
+    variance = Column(Float, nullable=False, default=0)
+    samples = Column(Integer, nullable=False, default=0)
+    sketch = Column(JSON, nullable=True)  # app.sketch.LatencySketch.to_dict()
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class CheckRollup(Base):
+    """Per-check aggregate of executions over one minute/hour/day bucket"""
+    __tablename__ = "check_rollups"
+
+    check_id = Column(Integer, ForeignKey("checks.id", ondelete="CASCADE"), primary_key=True)
+    granularity = Column(String, primary_key=True)  # "minute", "hour" or "day"
+    bucket_start = Column(DateTime, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    pass_count = Column(Integer, nullable=False, default=0)
+    fail_count = Column(Integer, nullable=False, default=0)
+    latency_sum = Column(Float, nullable=False, default=0)
+    latency_min = Column(Float, nullable=True)
+    latency_max = Column(Float, nullable=True)
+    latency_sketch = Column(JSON, nullable=True)  # app.sketch.LatencySketch.to_dict()
+
+class SchedulerReplica(Base):
+    """A running scheduler; check shards are split among the rows with a fresh heartbeat"""
+    __tablename__ = "scheduler_replicas"
+
+    replica_id = Column(String, primary_key=True)
+    started_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    heartbeat_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -0,0 +1,154 @@
+import logging
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.models import CheckExecution
+
+logger = logging.getLogger(__name__)
+
+# rows (and whole daily partitions) older than this are dropped by the maintenance job
+EXECUTION_RETENTION_DAYS = int(os.getenv("EXECUTION_RETENTION_DAYS", "30"))
+# how many days of partitions to keep created ahead of today
+PARTITION_PREMAKE_DAYS = int(os.getenv("PARTITION_PREMAKE_DAYS", "7"))
+PARTITION_MAINTENANCE_INTERVAL_SECONDS = int(os.getenv("PARTITION_MAINTENANCE_INTERVAL_SECONDS", "3600"))
+
+PARENT_TABLE = "check_executions"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+_LOWER_BOUND = re.compile(r"FROM \('([^']+)'\)")
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def retention_cutoff(now: Optional[datetime] = None) -> datetime:
+    """Oldest executed_at still inside the retention window (naive UTC, like executed_at)."""
+    now = now or datetime.utcnow()
+    return now - timedelta(days=EXECUTION_RETENTION_DAYS)
+
+
+def partition_name(day: date) -> str:
+    return f"{PARENT_TABLE}_p{day:%Y%m%d}"
+
+
+def partition_upper_bound(bound_expr: str) -> Optional[datetime]:
+    """Parse the exclusive upper bound out of pg_get_expr(relpartbound); None for DEFAULT/MAXVALUE."""
+    match = _UPPER_BOUND.search(bound_expr or "")
+    if not match:
+        return None
+    return datetime.fromisoformat(match.group(1))
+
+
+def partition_overlaps(bound_expr: str, start: datetime, end: datetime) -> bool:
+    """Whether a range partition already holds part of [start, end); never true for DEFAULT.
+
+    MINVALUE / MAXVALUE bounds are open ended, like the legacy partition the partitioning
+    migration attached FROM (MINVALUE).
+    """
+    if "FROM" not in (bound_expr or ""):
+        return False
+    lower = _LOWER_BOUND.search(bound_expr)
+    lower = datetime.fromisoformat(lower.group(1)) if lower else datetime.min
+    upper = partition_upper_bound(bound_expr) or datetime.max
+    return lower < end and upper > start
+
+
+def _is_postgres(db: AsyncSession) -> bool:
+    return db.bind.dialect.name == "postgresql"
+
+
+async def ensure_partitions(db: AsyncSession, today: Optional[date] = None) -> List[str]:
+    """Create the daily partitions for today through PARTITION_PREMAKE_DAYS ahead.
+
+    Days an existing partition already covers (the legacy one included) are skipped. Rows
+    that landed in the DEFAULT partition for a missing day are moved into its new partition,
+    since Postgres refuses to create a partition whose range DEFAULT already holds rows for.
+    """
+    if not _is_postgres(db):
+        return []
+    today = today or datetime.utcnow().date()
+    existing = await _list_partitions(db)
+    has_default = any(name == DEFAULT_PARTITION for name, _ in existing)
+    created = []
+    for offset in range(PARTITION_PREMAKE_DAYS + 1):
+        day = today + timedelta(days=offset)
+        start = datetime.combine(day, datetime.min.time())
+        end = start + timedelta(days=1)
+        if any(partition_overlaps(bound_expr, start, end) for _, bound_expr in existing):
+            continue
+        name = partition_name(day)
+        bounds = f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+        if has_default and await _default_has_rows(db, start, end):
+            # build the partition detached, move the day's rows out of DEFAULT, then attach it
+            await db.execute(text(
+                f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+            ))
+            moved = await db.execute(text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE executed_at >= :start AND executed_at < :end "
+                f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+            ), {"start": start, "end": end})
+            await db.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} {bounds}"))
+            logger.info(f"Moved {moved.rowcount} executions from {DEFAULT_PARTITION} into {name}")
+        else:
+            await db.execute(text(f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} {bounds}"))
+        created.append(name)
+    await db.commit()
+    return created
+
+
+async def _default_has_rows(db: AsyncSession, start: datetime, end: datetime) -> bool:
+    result = await db.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE executed_at >= :start AND executed_at < :end)"
+    ), {"start": start, "end": end})
+    return bool(result.scalar())
+
+
+async def drop_expired_partitions(db: AsyncSession, now: Optional[datetime] = None) -> List[str]:
+    """Drop partitions entirely older than the retention window, and expired rows in DEFAULT.
+
+    SQLite (tests, local dev) has no partitioning, so expired rows are deleted instead.
+    """
+    cutoff = retention_cutoff(now)
+    if not _is_postgres(db):
+        await db.execute(delete(CheckExecution).where(CheckExecution.executed_at < cutoff))
+        await db.commit()
+        return []
+    dropped = []
+    for name, bound_expr in await _list_partitions(db):
+        if name == DEFAULT_PARTITION:
+            # DEFAULT never ages out as a whole; only its expired rows are deleted
+            await db.execute(text(f"DELETE FROM {name} WHERE executed_at < :cutoff"), {"cutoff": cutoff})
+            continue
+        upper = partition_upper_bound(bound_expr)
+        if upper is not None and upper <= cutoff:
+            await db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    await db.commit()
+    return dropped
+
+
+async def _list_partitions(db: AsyncSession):
+    result = await db.execute(text(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = CAST(:parent AS regclass)
+        """
+    ), {"parent": PARENT_TABLE})
+    return result.all()
+
+
+async def run_partition_maintenance():
+    """Scheduled job: create upcoming partitions and drop expired ones."""
+    try:
+        async with AsyncSessionLocal() as db:
+            created = await ensure_partitions(db)
+            dropped = await drop_expired_partitions(db)
+        if created or dropped:
+            logger.info(f"Partition maintenance: created {created}, dropped {dropped}")
+    except Exception as e:
+        logger.error(f"Partition maintenance failed: {e}")
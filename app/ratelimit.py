@@ -0,0 +1,136 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Deque, Optional
+
+
+class TokenBucket:
+    """Token bucket on the event loop clock: `rate` tokens per second, up to `burst` banked.
+
+    Waiters are served in arrival order (asyncio.Lock is FIFO), so a burst of checks against
+    one host is spread out at the configured rate instead of racing for each new token.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        self.rate = rate
+        self.burst = burst if burst and burst > 0 else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def set_rate(self, rate: float, burst: Optional[float] = None):
+        """Change the rate in place; banked tokens are kept up to the new burst."""
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        self.rate = rate
+        self.burst = burst if burst and burst > 0 else max(1.0, rate)
+        self._tokens = min(self._tokens, self.burst)
+
+    def _refill(self, now: float):
+        if self._updated is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            while True:
+                self._refill(loop.time())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class HostLimiter:
+    """Concurrency cap plus optional token bucket for requests to one upstream host.
+
+    resize() changes the limits in place: requests already holding a slot keep counting
+    against the new cap, so lowering it never lets more requests run than it allows.
+    """
+
+    def __init__(self, max_concurrency: int, rate_per_second: Optional[float] = None, burst: Optional[float] = None):
+        self.max_concurrency = max_concurrency
+        self.rate_per_second = rate_per_second or None
+        self.burst = burst
+        self._active = 0
+        # FIFO of requests waiting for a slot; a waiter's future is resolved once it holds one
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._bucket = TokenBucket(rate_per_second, burst) if rate_per_second else None
+        self._paused_until = 0.0
+
+    def resize(self, max_concurrency: int, rate_per_second: Optional[float], burst: Optional[float] = None):
+        """Apply new limits, keeping the requests in flight and any pause in force."""
+        self.max_concurrency = max_concurrency
+        self.rate_per_second = rate_per_second or None
+        self.burst = burst
+        if self.rate_per_second is None:
+            self._bucket = None
+        elif self._bucket is None:
+            self._bucket = TokenBucket(self.rate_per_second, burst)
+        else:
+            self._bucket.set_rate(self.rate_per_second, burst)
+        self._grant()
+
+    def pause(self, seconds: float):
+        """Hold back new requests to this host, e.g. for a 429's Retry-After."""
+        loop = asyncio.get_running_loop()
+        self._paused_until = max(self._paused_until, loop.time() + seconds)
+
+    def _grant(self):
+        while self._waiters and self._active < self.max_concurrency:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._active += 1
+                waiter.set_result(None)
+
+    def _release(self):
+        self._active -= 1
+        self._grant()
+
+    async def _acquire(self):
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # cancelled after the slot was handed over: give it to the next waiter
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+
+    @asynccontextmanager
+    async def slot(self):
+        loop = asyncio.get_running_loop()
+        await self._acquire()
+        try:
+            while (delay := self._paused_until - loop.time()) > 0:
+                await asyncio.sleep(delay)
+            if self._bucket is not None:
+                await self._bucket.acquire()
+            yield
+        finally:
+            self._release()
+
+
+def retry_after_seconds(value: Optional[str], now: Optional[datetime] = None) -> Optional[float]:
+    """Parse a Retry-After header (delta seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
@@ -0,0 +1,226 @@
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.models import CheckRollup
+from app.sketch import LatencySketch
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+# how long each granularity is kept; day buckets are kept forever
+ROLLUP_RETENTION = {
+    "minute": timedelta(days=int(os.getenv("ROLLUP_MINUTE_RETENTION_DAYS", "2"))),
+    "hour": timedelta(days=int(os.getenv("ROLLUP_HOUR_RETENTION_DAYS", "90"))),
+}
+
+_WINDOW = re.compile(r"^(\d+)([mhdw])$")
+_WINDOW_UNITS = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+RollupKey = Tuple[int, str, datetime]
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == "minute":
+        return ts.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def parse_window(window: str) -> timedelta:
+    """Parse a window like "90m", "24h", "7d" or "2w"."""
+    match = _WINDOW.match(window.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError("window must look like 90m, 24h, 7d or 2w")
+    return timedelta(**{_WINDOW_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def granularity_for(window: timedelta) -> str:
+    """Coarsest bucket that still gives a useful resolution for the window."""
+    if window <= timedelta(hours=3):
+        return "minute"
+    if window <= timedelta(days=7):
+        return "hour"
+    return "day"
+
+
+class RollupAccumulator:
+    """In-memory aggregate for one rollup bucket; merges with a stored row."""
+
+    def __init__(self):
+        self.count = 0
+        self.pass_count = 0
+        self.fail_count = 0
+        self.latency_sum = 0.0
+        self.latency_min: Optional[float] = None
+        self.latency_max: Optional[float] = None
+        self.sketch = LatencySketch()
+
+    def add(self, status: str, latency_ms: Optional[float]):
+        self.count += 1
+        if status == "PASS":
+            self.pass_count += 1
+        else:
+            self.fail_count += 1
+        if latency_ms is not None:
+            self.latency_sum += latency_ms
+            self.latency_min = latency_ms if self.latency_min is None else min(self.latency_min, latency_ms)
+            self.latency_max = latency_ms if self.latency_max is None else max(self.latency_max, latency_ms)
+            self.sketch.add(latency_ms)
+
+    def merge_row(self, row: CheckRollup):
+        self.count += row.count
+        self.pass_count += row.pass_count
+        self.fail_count += row.fail_count
+        self.latency_sum += row.latency_sum or 0.0
+        if row.latency_min is not None:
+            self.latency_min = row.latency_min if self.latency_min is None else min(self.latency_min, row.latency_min)
+        if row.latency_max is not None:
+            self.latency_max = row.latency_max if self.latency_max is None else max(self.latency_max, row.latency_max)
+        self.sketch.merge(LatencySketch.from_dict(row.latency_sketch))
+
+    def values(self) -> dict:
+        return {
+            "count": self.count,
+            "pass_count": self.pass_count,
+            "fail_count": self.fail_count,
+            "latency_sum": self.latency_sum,
+            "latency_min": self.latency_min,
+            "latency_max": self.latency_max,
+            "latency_sketch": self.sketch.to_dict(),
+        }
+
+
+def _insert_missing(db: AsyncSession, keys: List[RollupKey]):
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    rows = [
+        {"check_id": check_id, "granularity": granularity, "bucket_start": start,
+         "count": 0, "pass_count": 0, "fail_count": 0, "latency_sum": 0.0}
+        for check_id, granularity, start in keys
+    ]
+    return db.execute(insert(CheckRollup).on_conflict_do_nothing(), rows)
+
+
+async def record_rollups(db: AsyncSession, rows: List[dict]):
+    """Fold a batch of execution rows into their minute/hour/day rollups (caller commits).
+
+    Rows are aggregated in memory first, so a batch costs one insert, one locking select and
+    one bulk update however many executions it holds.
+    """
+    batch: Dict[RollupKey, RollupAccumulator] = {}
+    for row in rows:
+        for granularity in GRANULARITIES:
+            key = (row["check_id"], granularity, bucket_start(row["executed_at"], granularity))
+            batch.setdefault(key, RollupAccumulator()).add(row.get("status"), row.get("latency_ms"))
+    if not batch:
+        return
+    # sorted keys / ordered locking keep concurrent writers from deadlocking on each other
+    keys = sorted(batch)
+    # make sure every bucket row exists, then lock them so concurrent writers merge serially
+    await _insert_missing(db, keys)
+    pk = (CheckRollup.check_id, CheckRollup.granularity, CheckRollup.bucket_start)
+    stmt = select(CheckRollup).where(tuple_(*pk).in_(keys)).order_by(*pk).with_for_update()
+    stored = (await db.execute(stmt)).scalars().all()
+    updates = []
+    for row in stored:
+        acc = batch[(row.check_id, row.granularity, row.bucket_start)]
+        acc.merge_row(row)
+        updates.append({
+            "check_id": row.check_id,
+            "granularity": row.granularity,
+            "bucket_start": row.bucket_start,
+            **acc.values(),
+        })
+    # drop the loaded instances so the bulk UPDATE is not shadowed by stale identity-map state
+    db.expunge_all()
+    await db.execute(update(CheckRollup), updates)
+
+
+async def get_rollups(
+    db: AsyncSession, check_id: int, granularity: str, start: datetime, end: Optional[datetime] = None
+) -> List[CheckRollup]:
+    stmt = select(CheckRollup).where(
+        CheckRollup.check_id == check_id,
+        CheckRollup.granularity == granularity,
+        CheckRollup.bucket_start >= bucket_start(start, granularity),
+    )
+    if end is not None:
+        stmt = stmt.where(CheckRollup.bucket_start <= end)
+    result = await db.execute(stmt.order_by(CheckRollup.bucket_start))
+    return list(result.scalars().all())
+
+
+async def get_stats(db: AsyncSession, check_id: int, window: timedelta, now: Optional[datetime] = None) -> dict:
+    """Availability and latency summary for the window, read only from rollup rows.
+
+    The first bucket is aligned down to its granularity, so up to one bucket of data just
+    before the window start is included.
+    """
+    now = now or datetime.utcnow()
+    granularity = granularity_for(window)
+    start = now - window
+    buckets = await get_rollups(db, check_id, granularity, start, now)
+    acc = RollupAccumulator()
+    for row in buckets:
+        acc.merge_row(row)
+    latency_samples = acc.sketch.count
+
+    def percentile(q: float) -> Optional[float]:
+        # sketch answers are bucket midpoints; keep them inside the exact observed range
+        value = acc.sketch.quantile(q)
+        if value is None:
+            return None
+        return min(max(value, acc.latency_min), acc.latency_max)
+
+    return {
+        "check_id": check_id,
+        "granularity": granularity,
+        "start": start,
+        "end": now,
+        "buckets": len(buckets),
+        "count": acc.count,
+        "pass_count": acc.pass_count,
+        "fail_count": acc.fail_count,
+        "availability": acc.pass_count / acc.count if acc.count else None,
+        "latency_avg_ms": acc.latency_sum / latency_samples if latency_samples else None,
+        "latency_min_ms": acc.latency_min,
+        "latency_max_ms": acc.latency_max,
+        "latency_p50_ms": percentile(0.50),
+        "latency_p90_ms": percentile(0.90),
+        "latency_p95_ms": percentile(0.95),
+        "latency_p99_ms": percentile(0.99),
+    }
+
+
+async def prune_rollups(db: AsyncSession, now: Optional[datetime] = None):
+    now = now or datetime.utcnow()
+    for granularity, keep in ROLLUP_RETENTION.items():
+        await db.execute(delete(CheckRollup).where(
+            CheckRollup.granularity == granularity,
+            CheckRollup.bucket_start < now - keep,
+        ))
+    await db.commit()
+
+
+async def run_rollup_maintenance():
+    """Scheduled job: drop minute/hour buckets past their retention."""
+    try:
+        async with AsyncSessionLocal() as db:
+            await prune_rollups(db)
+    except Exception as e:
+        logger.error(f"Rollup maintenance failed: {e}")
@@ -1,151 +1,235 @@
-import asyncio
 import logging
 import os
-from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
-from apscheduler.schedulers.background import BackgroundScheduler
-from app.database import SessionLocal, engine
-from app.models import Check, APICheck
-from app.crud import get_checks, create_execution
+from typing import Iterable, List, Optional
+from app.database import AsyncSessionLocal
+from app.dispatcher import CheckDispatcher, current_run, expected_load_profile, phase_offset
+from app.models import Check
+from app.async_crud import get_checks_in_shards
+from app.baselines import latency_baselines, release_baselines
+from app.check_cache import CheckDefinition, check_cache, on_check_change
 from app.checker import run_check
+from app.writer import execution_values, execution_writer
+from app.drift import detect_drift
+from app.metrics import counter, gauge, histogram
+from app.partitions import PARTITION_MAINTENANCE_INTERVAL_SECONDS, run_partition_maintenance
+from app.rollups import run_rollup_maintenance
+from app.sharding import SCHEDULER_HEARTBEAT_SECONDS, ShardCoordinator, shard_for
 
 logger = logging.getLogger(__name__)
 
 SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
-ADVISORY_LOCK_ID = int(os.getenv("SCHEDULER_ADVISORY_LOCK_ID", "672311"))
+# global cap on checks running at once across all jobs
+SCHEDULER_CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "200"))
+SCHEDULER_MISFIRE_GRACE_SECONDS = float(os.getenv("SCHEDULER_MISFIRE_GRACE_SECONDS", "30"))
+# number of recent runs the lag percentiles in scheduler_health are computed over
+SCHEDULER_LAG_WINDOW = int(os.getenv("SCHEDULER_LAG_WINDOW", "1000"))
 
-jobstores = {
-    "default": SQLAlchemyJobStore(url=os.getenv("DATABASE_URL")),
-}
-
-scheduler = BackgroundScheduler(
-    jobstores=jobstores,
-    job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 30},
-    timezone="UTC",
+# jobs are rebuilt from the checks table on every start, so no persistent job store is needed
+scheduler = CheckDispatcher(
+    concurrency=SCHEDULER_CONCURRENCY,
+    misfire_grace_seconds=SCHEDULER_MISFIRE_GRACE_SECONDS,
+    lag_window=SCHEDULER_LAG_WINDOW,
 )
 
-_scheduler_lock_conn = None
+# which check shards this replica runs; replaces the single advisory-lock leader
+coordinator = ShardCoordinator()
+# latency baselines are tracked and checkpointed only by the replica owning the check's shard
+latency_baselines.owns = lambda check_id: coordinator.owns(check_id)
+
+SCHEDULED_RUN_SECONDS = histogram(
+    "scheduler_job_duration_seconds", "Scheduled check jobs end to end (check, drift detection, queueing the result)"
+)
+SCHEDULED_RUN_ERRORS = counter("scheduler_job_errors_total", "Scheduled check jobs that raised")
+gauge("scheduler_jobs", "Jobs scheduled on this replica", fn=lambda: len(scheduler.get_jobs()))
+gauge("scheduler_in_flight", "Scheduled checks running right now", fn=lambda: scheduler.in_flight)
 
 def _job_id(check_id: int) -> str:
     return f"check_{check_id}"
 
 
-def _is_postgres() -> bool:
-    url = os.getenv("DATABASE_URL", "")
-    return url.startswith("postgres") or url.startswith("postgresql")
-
-
-def acquire_scheduler_lock() -> bool:
-    """Try to acquire a Postgres advisory lock so only one scheduler instance runs."""
-    global _scheduler_lock_conn
-    if not _is_postgres():
-        return True
-    conn = engine.raw_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT pg_try_advisory_lock(%s);", (ADVISORY_LOCK_ID,))
-    locked = cur.fetchone()[0]
-    if not locked:
-        conn.close()
-        return False
-    _scheduler_lock_conn = conn
-    return True
-
-
-def release_scheduler_lock():
-    global _scheduler_lock_conn
-    if _scheduler_lock_conn is None:
-        return
-    try:
-        cur = _scheduler_lock_conn.cursor()
-        cur.execute("SELECT pg_advisory_unlock(%s);", (ADVISORY_LOCK_ID,))
-    finally:
-        _scheduler_lock_conn.close()
-        _scheduler_lock_conn = None
-
 async def run_check_task(check_id: int):
     """Background task to run a check and save execution result"""
-    db = SessionLocal()
+    with SCHEDULED_RUN_SECONDS.time():
+        await _run_check_task(check_id)
+
+async def _run_check_task(check_id: int):
     try:
-        from app.crud import get_check
-        db_check = get_check(db, check_id)
-        if not db_check:
+        # prebuilt payload from the in-process cache; the database is only read on a miss
+        definition = await check_cache.get(check_id)
+        if definition is None:
             logger.warning(f"Check {check_id} not found")
+            unschedule_check_job(check_id)
             return
-
-        # Build APICheck payload
-        payload = APICheck(
-            method="GET",
-            url=db_check.url,
-            required_fields=db_check.required_fields,
-            expected_status_code=db_check.expected_status_code,
-            latency_threshold_ms=db_check.latency_threshold_ms,
-        )
+        name = definition.name
 
         # Run the check
-        result = await run_check(payload)
-
-        # Save execution result
-        create_execution(
-            db=db,
-            check_id=db_check.id,
-            status=result.get("status", "FAIL"),
-            missing_fields=result.get("missing_fields", []),
-            actual_status_code=result.get("status_code"),
-            latency_ms=result.get("latency_ms"),
-            error=result.get("error"),
-        )
-        logger.info(f"Check {check_id} ({db_check.name}) executed: {result.get('status')}")
+        result = await run_check(definition.payload)
+        run = current_run()
+        if run is not None:
+            # stored next to executed_at so scheduler lag can be told apart from API latency
+            result["scheduled_at"] = run.scheduled_at
+            result["started_at"] = run.started_at
+            result["missed_runs"] = run.missed_runs
+        async with AsyncSessionLocal() as db:
+            # cache hit (the common case) compares one hash and never touches the database
+            result["schema_drift"] = await detect_drift(db, check_id, result)
+
+        # Queue the execution result for the next batched insert
+        await execution_writer.submit(execution_values(check_id, result))
+        logger.info(f"Check {check_id} ({name}) executed: {result.get('status')}")
     except Exception as e:
+        SCHEDULED_RUN_ERRORS.inc()
         logger.error(f"Error running check {check_id}: {e}")
-    finally:
-        db.close()
-
-def run_check_task_sync(check_id: int):
-    """Wrapper to run async check task in sync context"""
-    asyncio.run(run_check_task(check_id))
 
-def schedule_check_job(check: Check):
+def _add_check_job(check: Check | CheckDefinition) -> bool:
+    interval_seconds = check.interval_minutes * 60
     try:
         scheduler.add_job(
-            run_check_task_sync,
-            'interval',
-            minutes=check.interval_minutes,
+            run_check_task,
+            seconds=interval_seconds,
             args=[check.id],
             id=_job_id(check.id),
             replace_existing=True,
+            # stagger checks across their interval instead of firing them all in the same second
+            offset=phase_offset(check.id, interval_seconds),
         )
-        logger.info(f"Scheduled check {check.id} ({check.name}) to run every {check.interval_minutes} minutes")
+        return True
     except Exception as e:
         logger.error(f"Error scheduling check {check.id} ({check.name}): {e}")
+        return False
+
+def schedule_check_job(check: Check | CheckDefinition):
+    if not coordinator.owns(check.id):
+        # another replica owns this shard and schedules it from its own heartbeat / notification
+        return
+    if _add_check_job(check):
+        logger.info(f"Scheduled check {check.id} ({check.name}) to run every {check.interval_minutes} minutes")
+
+def schedule_check_jobs(checks: Iterable[Check | CheckDefinition]) -> int:
+    """Schedule many checks at once (bulk import) with one log line; returns how many this replica took"""
+    checks = list(checks)
+    scheduled = sum(1 for check in checks if coordinator.owns(check.id) and _add_check_job(check))
+    logger.info(f"Scheduled {scheduled} of {len(checks)} checks")
+    return scheduled
+
+def unschedule_check_job(check_id: int):
+    scheduler.remove_job(_job_id(check_id))
+
+
+async def _apply_check_change(check_id: int, op: str):
+    """Keep this replica's jobs in step with checks created or deleted elsewhere"""
+    if not scheduler.running:
+        return
+    definition = None if op == "delete" else await check_cache.get(check_id)
+    if definition is None:
+        unschedule_check_job(check_id)
+    else:
+        schedule_check_job(definition)
+
+
+on_check_change(_apply_check_change)
+
+
+async def rebalance_shards():
+    """Heartbeat job: refresh membership and move jobs for shards gained or lost"""
+    try:
+        async with AsyncSessionLocal() as db:
+            gained, lost = await coordinator.heartbeat(db)
+            released = _unschedule_shards(lost)
+            if gained:
+                for check in await get_checks_in_shards(db, gained, coordinator.shards):
+                    # the previous owner may have moved the baseline on since this replica last held it
+                    latency_baselines.forget(check.id)
+                    schedule_check_job(check_cache.put(check))
+        await release_baselines(released)
+        if gained or lost:
+            logger.info(
+                f"Shards rebalanced across {len(coordinator.replicas)} replicas: "
+                f"gained {sorted(gained)}, lost {sorted(lost)}, owning {len(coordinator.owned)}"
+            )
+    except Exception as e:
+        logger.error(f"Shard rebalance failed: {e}")
+        lost = coordinator.expire()
+        if lost:
+            # the other replicas consider this one dead and run these shards now
+            await release_baselines(_unschedule_shards(lost))
+            logger.warning(f"Heartbeats failing for over {coordinator.ttl_seconds}s; released {len(lost)} shards")
 
-def start_scheduler():
-    """Start the scheduler and load all checks"""
+
+def _unschedule_shards(shards) -> List[int]:
+    """Remove the jobs of checks in `shards`; returns their check ids."""
+    removed = []
+    if not shards:
+        return removed
+    for job in scheduler.get_jobs():
+        if job.func is run_check_task and shard_for(job.args[0], coordinator.shards) in shards:
+            scheduler.remove_job(job.id)
+            removed.append(job.args[0])
+    return removed
+
+
+def _on_shard_zero(job):
+    """Wrap a housekeeping job so only the replica owning shard 0 runs it"""
+    async def run():
+        if coordinator.owns_shard(0):
+            await job()
+    run.__name__ = job.__name__
+    return run
+
+
+async def start_scheduler():
+    """Start the scheduler on the running event loop and join the replica set"""
     if not SCHEDULER_ENABLED:
         logger.info("Scheduler disabled via SCHEDULER_ENABLED=false")
         return
     if scheduler.running:
         return
-    if not acquire_scheduler_lock():
-        logger.warning("Scheduler lock not acquired; another instance is running")
-        return
     scheduler.start()
-    db = SessionLocal()
+    # create today's partitions before the first results are written, then keep them rolling
+    await run_partition_maintenance()
+    scheduler.add_job(
+        _on_shard_zero(run_partition_maintenance),
+        seconds=PARTITION_MAINTENANCE_INTERVAL_SECONDS,
+        id="partition_maintenance",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        _on_shard_zero(run_rollup_maintenance),
+        seconds=PARTITION_MAINTENANCE_INTERVAL_SECONDS,
+        id="rollup_maintenance",
+        replace_existing=True,
+    )
+    # the first heartbeat registers this replica and schedules the checks in its shards
+    await rebalance_shards()
+    scheduler.add_job(
+        rebalance_shards,
+        seconds=SCHEDULER_HEARTBEAT_SECONDS,
+        id="shard_heartbeat",
+        replace_existing=True,
+    )
+    logger.info(f"Scheduler started as replica {coordinator.replica_id}")
+
+
+async def stop_scheduler(timeout: float = 30):
+    """Stop the scheduler, letting in-flight checks finish for up to `timeout` seconds"""
+    if not scheduler.running:
+        return
+    await scheduler.shutdown(wait=True, timeout=timeout)
+    scheduler.remove_all_jobs()
     try:
-        checks = get_checks(db)
-        for check in checks:
-            schedule_check_job(check)
-        logger.info("Scheduler started")
+        async with AsyncSessionLocal() as db:
+            await coordinator.leave(db)
     except Exception as e:
-        logger.error(f"Error starting scheduler: {e}")
-    finally:
-        db.close()
+        logger.error(f"Failed to deregister replica {coordinator.replica_id}: {e}")
+    logger.info("Scheduler stopped")
 
 
-def stop_scheduler():
-    """Stop the scheduler"""
-    if scheduler.running:
-        scheduler.shutdown()
-        logger.info("Scheduler stopped")
-    release_scheduler_lock()
+def load_profile(seconds: Optional[int] = None) -> dict:
+    """Expected check starts per second on this replica; the window defaults to the longest interval"""
+    jobs = [job for job in scheduler.get_jobs() if job.func is run_check_task]
+    if seconds is None:
+        seconds = int(max((job.interval_seconds for job in jobs), default=60))
+    return expected_load_profile(jobs, seconds)
 
 
 def is_scheduler_running() -> bool:
@@ -153,6 +237,11 @@ def is_scheduler_running() -> bool:
     return scheduler.running
 
 
+def _most_missed(jobs, limit: int = 10) -> list:
+    missed = [job for job in jobs if job.skipped or job.coalesced]
+    missed.sort(key=lambda job: job.skipped + job.coalesced, reverse=True)
+    return [{"job_id": job.id, "skipped": job.skipped, "coalesced": job.coalesced} for job in missed[:limit]]
+
 def scheduler_health() -> dict:
     """Return scheduler health details including job store reachability and job count."""
     running = scheduler.running
@@ -169,5 +258,17 @@ def scheduler_health() -> dict:
         "jobstore_ok": jobstore_ok,
         "job_count": job_count,
         "scheduler_enabled": SCHEDULER_ENABLED,
-        "lock_held": _scheduler_lock_conn is not None,
+        "replica_id": coordinator.replica_id,
+        "shard_count": coordinator.shards,
+        # None until the first heartbeat: not coordinating, every shard is treated as owned
+        "owned_shards": sorted(coordinator.owned) if coordinator.owned is not None else None,
+        "replicas": coordinator.assignment(),
+        "last_heartbeat": coordinator.last_heartbeat,
+        "concurrency": scheduler.concurrency,
+        "in_flight": scheduler.in_flight,
+        # scheduled fire time to actual start; growing lag means the scheduler is the bottleneck
+        "lag_seconds": scheduler.lag_percentiles(),
+        "skipped_runs": scheduler.skipped_runs,
+        "coalesced_runs": scheduler.coalesced_runs,
+        "most_missed": _most_missed(jobs if jobstore_ok else []),
     }
@@ -1,7 +1,9 @@
 from pydantic import BaseModel, HttpUrl, validator
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
+from app.models import APICheck, Phase
+
 class CheckCreate(BaseModel):
     name: str
     url: HttpUrl
@@ -9,6 +11,12 @@ class CheckCreate(BaseModel):
     expected_status_code: int = 200
     latency_threshold_ms: Optional[int] = None
     interval_minutes: int = 5  # ADD THIS
+    max_body_bytes: Optional[int] = None
+    max_read_ms: Optional[int] = None
+    stream_fields: bool = False
+    host_max_concurrency: Optional[int] = None
+    host_rate_per_second: Optional[float] = None
+    phase_thresholds_ms: Optional[Dict[Phase, int]] = None
 
     @validator("interval_minutes")
     def interval_positive(cls, value: int) -> int:
@@ -22,6 +30,18 @@ class CheckCreate(BaseModel):
             raise ValueError("latency_threshold_ms must be non-negative")
         return value
 
+    @validator("max_body_bytes", "max_read_ms", "host_max_concurrency", "host_rate_per_second")
+    def limits_positive(cls, value: Optional[int]) -> Optional[int]:
+        if value is not None and value <= 0:
+            raise ValueError("limits must be greater than 0")
+        return value
+
+    @validator("phase_thresholds_ms")
+    def phase_thresholds_positive(cls, value: Optional[Dict[str, int]]) -> Optional[Dict[str, int]]:
+        if value and any(limit <= 0 for limit in value.values()):
+            raise ValueError("phase thresholds must be greater than 0")
+        return value
+
     @validator("required_fields")
     def required_fields_non_empty(cls, value: List[str]) -> List[str]:
         if not value:
@@ -30,6 +50,45 @@ class CheckCreate(BaseModel):
             raise ValueError("required_fields entries must be non-empty strings")
         return value
 
+class CheckBulkRequest(BaseModel):
+    """Declarative set of checks, upserted by name"""
+    checks: List[CheckCreate]
+    dry_run: bool = False  # only report the diff
+    prune: bool = False  # delete checks that are not in the manifest
+
+    @validator("checks")
+    def names_unique(cls, value: List[CheckCreate]) -> List[CheckCreate]:
+        seen = set()
+        duplicates = sorted({check.name for check in value if check.name in seen or seen.add(check.name)})
+        if duplicates:
+            raise ValueError(f"duplicate check names: {', '.join(duplicates)}")
+        return value
+
+class CheckBulkResponse(BaseModel):
+    dry_run: bool
+    added: List[str]
+    changed: List[dict]  # {"name": ..., "changes": {field: {"from": ..., "to": ...}}}
+    removed: List[str]
+    unchanged: int
+
+class RunChecksRequest(BaseModel):
+    """Batch of ad-hoc checks for POST /run-checks"""
+    checks: List[APICheck]
+    concurrency: Optional[int] = None  # defaults to RUN_CHECKS_CONCURRENCY
+    fail_fast: bool = False  # stop at the first failing check
+
+    @validator("checks")
+    def checks_non_empty(cls, value: List[APICheck]) -> List[APICheck]:
+        if not value:
+            raise ValueError("checks must contain at least one check")
+        return value
+
+    @validator("concurrency")
+    def concurrency_positive(cls, value: Optional[int]) -> Optional[int]:
+        if value is not None and value <= 0:
+            raise ValueError("concurrency must be greater than 0")
+        return value
+
 class CheckResponse(BaseModel):
     id: int
     name: str
@@ -38,6 +97,12 @@ class CheckResponse(BaseModel):
     expected_status_code: int
     latency_threshold_ms: Optional[int]
     interval_minutes: int  # ADD THIS
+    max_body_bytes: Optional[int] = None
+    max_read_ms: Optional[int] = None
+    stream_fields: bool = False
+    host_max_concurrency: Optional[int] = None
+    host_rate_per_second: Optional[float] = None
+    phase_thresholds_ms: Optional[Dict[str, int]] = None
 
     # allows fastapi to convert from sqlalchemy model to pydantic model
     class Config:
@@ -50,8 +115,65 @@ class CheckExecutionResponse(BaseModel):
     missing_fields: List[str]
     actual_status_code: Optional[int]
     latency_ms: Optional[float]
+    queue_ms: Optional[float] = None
     error: Optional[str]
+    connection_reused: Optional[bool] = None
+    connect_ms: Optional[float] = None
+    tls_ms: Optional[float] = None
+    ttfb_ms: Optional[float] = None
+    download_ms: Optional[float] = None
+    shape_fingerprint: Optional[str] = None
+    schema_drift: Optional[dict] = None
+    from_cache: Optional[bool] = None
+    scheduled_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    missed_runs: Optional[int] = None
+    transition: Optional[str] = None
+    consecutive_failures: Optional[int] = None
+    latency_zscore: Optional[float] = None
+    latency_regression: Optional[bool] = None
     executed_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class CheckBaselineResponse(BaseModel):
+    check_id: int
+    samples: int = 0
+    mean_ms: Optional[float] = None
+    std_ms: Optional[float] = None
+    p50_ms: Optional[float] = None
+    p90_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+
+class CheckStateResponse(BaseModel):
+    check_id: int
+    status: Optional[str] = None
+    consecutive_failures: int = 0
+    consecutive_passes: int = 0
+    last_transition_at: Optional[datetime] = None
+    last_executed_at: Optional[datetime] = None
+    flap_score: float = 0.0
+    flapping: bool = False
+
+    class Config:
+        from_attributes = True
+
+class CheckStatsResponse(BaseModel):
+    check_id: int
+    window: str
+    granularity: str
+    start: datetime
+    end: datetime
+    buckets: int
+    count: int
+    pass_count: int
+    fail_count: int
+    availability: Optional[float]
+    latency_avg_ms: Optional[float]
+    latency_min_ms: Optional[float]
+    latency_max_ms: Optional[float]
+    latency_p50_ms: Optional[float]
+    latency_p90_ms: Optional[float]
+    latency_p95_ms: Optional[float]
+    latency_p99_ms: Optional[float]
@@ -0,0 +1,107 @@
+import hashlib
+import os
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# documents with more distinct paths than this (e.g. maps keyed by ids) are not fingerprinted
+SHAPE_MAX_ENTRIES = int(os.getenv("SHAPE_MAX_ENTRIES", "5000"))
+
+ROOT = "$"
+# array elements collapse onto one path, so list length never changes the shape
+ELEMENT = "*"
+
+_EVENT_TYPES = {
+    "start_map": "object",
+    "start_array": "array",
+    "string": "string",
+    "number": "number",
+    "boolean": "boolean",
+    "null": "null",
+}
+
+Shape = FrozenSet[str]
+
+
+def _type_name(value) -> str:
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    return "null"
+
+
+def shape_of(data) -> Optional[Shape]:
+    """Set of "path:type" entries for a parsed document, or None if it is too large to track."""
+    entries = set()
+    stack = [(ROOT, data)]
+    while stack:
+        path, value = stack.pop()
+        entries.add(f"{path}:{_type_name(value)}")
+        if len(entries) > SHAPE_MAX_ENTRIES:
+            return None
+        if isinstance(value, dict):
+            prefix = "" if path == ROOT else path + "."
+            stack.extend((prefix + key, item) for key, item in value.items())
+        elif isinstance(value, list):
+            element = ELEMENT if path == ROOT else path + "." + ELEMENT
+            stack.extend((element, item) for item in value)
+    return frozenset(entries)
+
+
+class ShapeBuilder:
+    """Builds the same entries as shape_of() from app.jsonstream parser events."""
+
+    def __init__(self):
+        self._entries = set()
+        self.truncated = False
+
+    def feed(self, events: Iterable[Tuple[str, tuple]]):
+        if self.truncated:
+            return
+        for event, path in events:
+            kind = _EVENT_TYPES.get(event)
+            if kind is None:
+                continue
+            dotted = ".".join(ELEMENT if isinstance(part, int) else part for part in path) or ROOT
+            self._entries.add(f"{dotted}:{kind}")
+        if len(self._entries) > SHAPE_MAX_ENTRIES:
+            self.discard()
+
+    def discard(self):
+        """The document was not read to the end, so its shape is unknown."""
+        self.truncated = True
+        self._entries.clear()
+
+    def shape(self) -> Optional[Shape]:
+        return None if self.truncated else frozenset(self._entries)
+
+
+def fingerprint(shape: Shape) -> str:
+    return hashlib.blake2b("\n".join(sorted(shape)).encode(), digest_size=16).hexdigest()
+
+
+def _by_path(shape: Iterable[str]) -> Dict[str, List[str]]:
+    paths: Dict[str, List[str]] = {}
+    for entry in shape:
+        path, kind = entry.rsplit(":", 1)
+        paths.setdefault(path, []).append(kind)
+    return {path: sorted(kinds) for path, kinds in paths.items()}
+
+
+def diff_shapes(old: Iterable[str], new: Iterable[str]) -> dict:
+    """Paths added, removed, or whose value type changed between two shapes."""
+    old_paths, new_paths = _by_path(old), _by_path(new)
+    return {
+        "added": sorted(path for path in new_paths if path not in old_paths),
+        "removed": sorted(path for path in old_paths if path not in new_paths),
+        "changed": [
+            {"path": path, "from": old_paths[path], "to": new_paths[path]}
+            for path in sorted(old_paths.keys() & new_paths.keys())
+            if old_paths[path] != new_paths[path]
+        ],
+    }
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import SchedulerReplica
+
+# checks are split into this many virtual shards (check_id % SCHEDULER_SHARDS); must match on every replica
+SCHEDULER_SHARDS = int(os.getenv("SCHEDULER_SHARDS", "64"))
+SCHEDULER_HEARTBEAT_SECONDS = float(os.getenv("SCHEDULER_HEARTBEAT_SECONDS", "10"))
+# a replica that has not heartbeated for this long is considered dead and its shards move
+SCHEDULER_REPLICA_TTL_SECONDS = float(os.getenv("SCHEDULER_REPLICA_TTL_SECONDS", "30"))
+REPLICA_ID = os.getenv("SCHEDULER_REPLICA_ID") or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def shard_for(check_id: int, shards: int = SCHEDULER_SHARDS) -> int:
+    return check_id % shards
+
+
+def _weight(replica_id: str, shard: int) -> int:
+    digest = hashlib.blake2b(f"{replica_id}:{shard}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def assign_shards(replicas: Iterable[str], shards: int = SCHEDULER_SHARDS) -> Dict[str, List[int]]:
+    """Rendezvous hashing: each shard goes to the replica with the highest weight for it.
+
+    Every replica computes the same assignment from the same membership, and a join or
+    leave only moves the shards won or lost by that replica.
+    """
+    replicas = sorted(set(replicas))
+    assignment: Dict[str, List[int]] = {replica: [] for replica in replicas}
+    if not replicas:
+        return assignment
+    for shard in range(shards):
+        owner = max(replicas, key=lambda replica: _weight(replica, shard))
+        assignment[owner].append(shard)
+    return assignment
+
+
+def _upsert(db: AsyncSession, replica_id: str, now: datetime, started_at: datetime):
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(SchedulerReplica).values(replica_id=replica_id, started_at=started_at, heartbeat_at=now)
+    return db.execute(stmt.on_conflict_do_update(index_elements=["replica_id"], set_={"heartbeat_at": now}))
+
+
+class ShardCoordinator:
+    """Cooperative shard ownership for this replica.
+
+    Each heartbeat refreshes this replica's row in scheduler_replicas, reads the live
+    membership and recomputes which shards it owns. Until the first heartbeat (or when the
+    scheduler is disabled) `owned` is None and every check counts as owned, which is also
+    the single-process behaviour. A replica whose heartbeats keep failing for longer than
+    the TTL gives up its shards (see expire()), since the others have taken them over by then.
+    """
+
+    def __init__(
+        self,
+        replica_id: str = REPLICA_ID,
+        shards: int = SCHEDULER_SHARDS,
+        ttl_seconds: float = SCHEDULER_REPLICA_TTL_SECONDS,
+    ):
+        self.replica_id = replica_id
+        self.shards = shards
+        self.ttl_seconds = ttl_seconds
+        self.started_at = datetime.utcnow()
+        self.replicas: List[str] = []
+        self.owned: Optional[FrozenSet[int]] = None
+        self.last_heartbeat: Optional[datetime] = None
+
+    def owns_shard(self, shard: int) -> bool:
+        return self.owned is None or shard in self.owned
+
+    def owns(self, check_id: int) -> bool:
+        return self.owns_shard(shard_for(check_id, self.shards))
+
+    def assignment(self) -> Dict[str, List[int]]:
+        return assign_shards(self.replicas, self.shards)
+
+    async def heartbeat(self, db: AsyncSession, now: Optional[datetime] = None) -> Tuple[Set[int], Set[int]]:
+        """Refresh membership; returns the shards gained and lost since the previous heartbeat."""
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.ttl_seconds)
+        await _upsert(db, self.replica_id, now, self.started_at)
+        await db.execute(delete(SchedulerReplica).where(SchedulerReplica.heartbeat_at < cutoff))
+        result = await db.execute(select(SchedulerReplica.replica_id).where(SchedulerReplica.heartbeat_at >= cutoff))
+        self.replicas = sorted(result.scalars().all())
+        await db.commit()
+
+        owned = frozenset(self.assignment().get(self.replica_id, []))
+        previous = self.owned or frozenset()
+        self.owned = owned
+        self.last_heartbeat = now
+        return set(owned - previous), set(previous - owned)
+
+    def expire(self, now: Optional[datetime] = None) -> Set[int]:
+        """After a failed heartbeat: drop every shard once the last success is older than the TTL.
+
+        The other replicas have removed this one from the membership by then and run its
+        shards themselves. Returns the shards dropped; the next successful heartbeat gains
+        them back.
+        """
+        now = now or datetime.utcnow()
+        if not self.owned or self.last_heartbeat is None:
+            return set()
+        if now - self.last_heartbeat <= timedelta(seconds=self.ttl_seconds):
+            return set()
+        lost, self.owned = set(self.owned), frozenset()
+        return lost
+
+    async def leave(self, db: AsyncSession):
+        """Deregister so the other replicas pick up these shards on their next heartbeat."""
+        await db.execute(delete(SchedulerReplica).where(SchedulerReplica.replica_id == self.replica_id))
+        await db.commit()
+        self.replicas = []
+        self.owned = None
@@ -0,0 +1,78 @@
+import math
+from typing import Dict, Optional
+
+# relative accuracy of quantile estimates: a reported p95 is within 2% of the true value
+DEFAULT_RELATIVE_ACCURACY = 0.02
+
+
+class LatencySketch:
+    """Mergeable quantile sketch over positive values (DDSketch-style log buckets).
+
+    Each value lands in bucket ceil(log(value) / log(gamma)), so every bucket spans a fixed
+    relative error. Two sketches merge by adding bucket counts, which is what lets rollup
+    rows combine minute -> hour -> window without keeping raw samples. Latencies between
+    0.1 ms and 100 s fit in a few hundred buckets at most.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float, count: int = 1):
+        if value <= 0:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += count
+
+    def merge(self, other: "LatencySketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def decay(self, factor: float = 0.5):
+        """Scale every count down so older values weigh less; empty buckets are dropped."""
+        self.bins = {index: kept for index, count in self.bins.items() if (kept := int(count * factor))}
+        self.zero_count = int(self.zero_count * factor)
+        self.count = self.zero_count + sum(self.bins.values())
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                # midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self) -> dict:
+        # JSON object keys are strings
+        return {
+            "a": self.relative_accuracy,
+            "z": self.zero_count,
+            "n": self.count,
+            "b": {str(index): count for index, count in self.bins.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "LatencySketch":
+        if not data:
+            return cls()
+        sketch = cls(data.get("a", DEFAULT_RELATIVE_ACCURACY))
+        sketch.zero_count = data.get("z", 0)
+        sketch.count = data.get("n", 0)
+        sketch.bins = {int(index): count for index, count in data.get("b", {}).items()}
+        return sketch
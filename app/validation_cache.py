@@ -0,0 +1,75 @@
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.shape import Shape
+
+VALIDATION_CACHE_SIZE = int(os.getenv("CHECK_VALIDATION_CACHE_SIZE", "10000"))
+
+# (method, url, required_fields, stream_fields, max_body_bytes, max_read_ms): every check setting
+# the cached outcome depends on. A body validated under looser read limits, or parsed in the
+# other mode, must be fetched again rather than reused.
+CacheKey = Tuple[str, str, Tuple[str, ...], bool, Optional[int], Optional[int]]
+
+
+@dataclass(frozen=True)
+class CachedValidation:
+    """Validators of the last full response and what validating its body concluded"""
+    etag: Optional[str]
+    last_modified: Optional[str]
+    status_code: int
+    missing_fields: List[str]
+    shape: Optional[Shape]
+    shape_fingerprint: Optional[str]
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ValidationCache:
+    """LRU of validated responses, so a 304 can reuse the outcome without a body."""
+
+    def __init__(self, max_entries: int = VALIDATION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, CachedValidation]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> Optional[CachedValidation]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: CacheKey, entry: CachedValidation):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: CacheKey):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+validation_cache = ValidationCache()
+
+
+def cache_key(check) -> CacheKey:
+    return (
+        check.method,
+        str(check.url),
+        tuple(check.required_fields),
+        bool(getattr(check, "stream_fields", False)),
+        getattr(check, "max_body_bytes", None),
+        getattr(check, "max_read_ms", None),
+    )
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from datetime import datetime
+from typing import Deque, List, Optional, Tuple
+
+from app.alerts import alert_pipeline
+from app.async_crud import create_executions
+from app.baselines import record_baselines
+from app.check_state import record_transitions
+from app.database import AsyncSessionLocal
+from app.events import publish_executions
+from app.metrics import counter, gauge
+from app.models import CheckExecution
+from app.rollups import record_rollups
+
+logger = logging.getLogger(__name__)
+
+EXECUTION_BATCH_SIZE = int(os.getenv("EXECUTION_BATCH_SIZE", "500"))
+EXECUTION_FLUSH_INTERVAL_SECONDS = float(os.getenv("EXECUTION_FLUSH_INTERVAL_SECONDS", "1.0"))
+EXECUTION_MAX_PENDING = int(os.getenv("EXECUTION_MAX_PENDING", "10000"))
+# a failed batch goes back to the front of the buffer and is retried this many times, backing off
+# exponentially from EXECUTION_RETRY_BACKOFF_SECONDS up to EXECUTION_RETRY_MAX_BACKOFF_SECONDS
+EXECUTION_WRITE_RETRIES = int(os.getenv("EXECUTION_WRITE_RETRIES", "5"))
+EXECUTION_RETRY_BACKOFF_SECONDS = float(os.getenv("EXECUTION_RETRY_BACKOFF_SECONDS", "0.5"))
+EXECUTION_RETRY_MAX_BACKOFF_SECONDS = float(os.getenv("EXECUTION_RETRY_MAX_BACKOFF_SECONDS", "10"))
+
+EXECUTIONS_DROPPED = counter("executions_dropped_total", "Execution rows given up on after failed writes")
+
+
+def execution_values(check_id: int, result: dict) -> dict:
+    """Map a run_check result onto check_executions columns"""
+    return {
+        "check_id": check_id,
+        "status": result.get("status", "FAIL"),
+        "missing_fields": result.get("missing_fields", []),
+        "actual_status_code": result.get("status_code"),
+        "latency_ms": result.get("latency_ms"),
+        "queue_ms": result.get("queue_ms"),
+        "error": result.get("error"),
+        "connection_reused": result.get("connection_reused"),
+        "connect_ms": result.get("connect_ms"),
+        "tls_ms": result.get("tls_ms"),
+        "ttfb_ms": result.get("ttfb_ms"),
+        "download_ms": result.get("download_ms"),
+        "shape_fingerprint": result.get("shape_fingerprint"),
+        "schema_drift": result.get("schema_drift"),
+        "from_cache": result.get("from_cache"),
+        "scheduled_at": result.get("scheduled_at"),
+        "started_at": result.get("started_at"),
+        "missed_runs": result.get("missed_runs"),
+        # stamped when the result is produced, not when its batch is flushed
+        "executed_at": datetime.utcnow(),
+    }
+
+
+async def _insert_rows(rows: List[dict], returning: bool) -> List[CheckExecution]:
+    async with AsyncSessionLocal() as db:
+        # states and rollups are written in the same transaction that create_executions commits;
+        # the in-memory baselines only move forward once it has committed
+        await record_transitions(db, rows)
+        install_baselines = await record_baselines(db, rows)
+        await record_rollups(db, rows)
+        persisted = await create_executions(db, rows, returning=returning)
+    # the rows are committed from here on: a failing follow-up is logged, never retried as a write
+    _after_commit("baseline install", install_baselines)
+    # live streams and alert rules only ever see committed executions
+    _after_commit("event publish", publish_executions, rows)
+    _after_commit("alert offer", alert_pipeline.offer, rows)
+    return persisted
+
+
+def _after_commit(what: str, fn, *args):
+    try:
+        fn(*args)
+    except Exception:
+        logger.exception(f"Execution writer {what} failed after commit")
+
+
+class ExecutionWriter:
+    """Buffers execution rows and writes them with bulk inserts.
+
+    A batch is flushed once batch_size rows are pending or flush_interval seconds have
+    passed, whichever comes first. submit() waits while max_pending rows are buffered, so a
+    slow database pushes back on the checks producing results. write() is the synchronous
+    path: it flushes right away and returns the persisted row.
+
+    A batch that fails to insert is put back at the front of the buffer and retried after a
+    backoff; rows that still fail after `retries` attempts are dropped and counted in
+    executions_dropped_total.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = EXECUTION_BATCH_SIZE,
+        flush_interval: float = EXECUTION_FLUSH_INTERVAL_SECONDS,
+        max_pending: int = EXECUTION_MAX_PENDING,
+        retries: int = EXECUTION_WRITE_RETRIES,
+        retry_backoff: float = EXECUTION_RETRY_BACKOFF_SECONDS,
+        max_retry_backoff: float = EXECUTION_RETRY_MAX_BACKOFF_SECONDS,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        # (row, waiter of write(), failed attempts so far)
+        self._buffer: Deque[Tuple[dict, Optional[asyncio.Future], int]] = deque()
+        self._failures = 0
+        self._flush_now: Optional[asyncio.Event] = None
+        self._has_space: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def start(self):
+        """Start the background flush task on the running event loop."""
+        if self.running:
+            return
+        self._flush_now = asyncio.Event()
+        self._has_space = asyncio.Event()
+        self._has_space.set()
+        self._flush_lock = asyncio.Lock()
+        self._stopping = False
+        self._failures = 0
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task and write out everything still buffered."""
+        if self._task is None:
+            return
+        # let the flush task exit on its own so an in-progress insert is never cut off
+        self._stopping = True
+        self._flush_now.set()
+        await self._task
+        self._task = None
+        logger.info("Execution writer stopped")
+
+    async def submit(self, values: dict):
+        """Queue a row for the next batch; waits while the buffer is full."""
+        if not self.running:
+            await _insert_rows([values], False)
+            return
+        while len(self._buffer) >= self.max_pending:
+            self._has_space.clear()
+            await self._has_space.wait()
+        self._buffer.append((values, None, 0))
+        if len(self._buffer) >= self.batch_size:
+            self._flush_now.set()
+
+    async def write(self, values: dict) -> CheckExecution:
+        """Persist a row immediately (along with anything buffered) and return it."""
+        if not self.running:
+            rows = await _insert_rows([values], True)
+            return rows[0]
+        future = asyncio.get_running_loop().create_future()
+        self._buffer.append((values, future, 0))
+        self._flush_now.set()
+        return await future
+
+    async def _run(self):
+        while not self._stopping:
+            if self._failures:
+                # the database is failing: back off before retrying the requeued rows
+                delay = min(self.retry_backoff * 2 ** (self._failures - 1), self.max_retry_backoff)
+                await asyncio.sleep(delay)
+            else:
+                try:
+                    await asyncio.wait_for(self._flush_now.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._flush_now.clear()
+            try:
+                await self._flush_pending()
+            except Exception:
+                logger.exception("Execution writer flush failed")
+        if self._buffer:
+            # the last flush on shutdown failed; nothing is left to retry it
+            self._drop(list(self._buffer), RuntimeError("Execution writer stopped before the rows were written"))
+            self._buffer.clear()
+
+    async def _flush_pending(self):
+        async with self._flush_lock:
+            while self._buffer:
+                count = min(self.batch_size, len(self._buffer))
+                batch = [self._buffer.popleft() for _ in range(count)]
+                self._has_space.set()
+                if not await self._flush_batch(batch):
+                    return
+
+    async def _flush_batch(self, batch) -> bool:
+        rows = [values for values, _, _ in batch]
+        waiters = [(index, future) for index, (_, future, _) in enumerate(batch) if future is not None]
+        try:
+            persisted = await _insert_rows(rows, bool(waiters))
+        except Exception as exc:
+            self._failures += 1
+            retry = [(values, future, attempts + 1) for values, future, attempts in batch if attempts < self.retries]
+            logger.error(f"Failed to write {len(rows)} executions ({len(retry)} will be retried): {exc}")
+            self._drop([entry for entry in batch if entry[2] >= self.retries], exc)
+            # back at the front, in order, so retried rows keep their place ahead of newer ones
+            self._buffer.extendleft(reversed(retry))
+            return False
+        self._failures = 0
+        for index, future in waiters:
+            if not future.done():
+                future.set_result(persisted[index])
+        return True
+
+    @staticmethod
+    def _drop(entries, exc: Exception):
+        if not entries:
+            return
+        EXECUTIONS_DROPPED.inc(len(entries))
+        logger.error(f"Dropped {len(entries)} executions after failed writes: {exc}")
+        for _, future, _ in entries:
+            if future is not None and not future.done():
+                future.set_exception(exc)
+
+
+execution_writer = ExecutionWriter()
+
+gauge("execution_writer_pending", "Execution rows buffered for the next batch", fn=lambda: execution_writer.pending)
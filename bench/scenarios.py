@@ -0,0 +1,275 @@
+"""Benchmark scenarios. Imported by bench.throughput after it has pointed DATABASE_URL at the bench database."""
+import asyncio
+import math
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import func, insert, select
+
+from app.check_cache import check_cache
+from app.checker import run_check
+from app.database import AsyncSessionLocal, Base, async_engine
+from app.dispatcher import CheckDispatcher, phase_offset
+from app.drift import shape_cache
+from app.http_client import HTTP_MAX_CONNECTIONS_PER_HOST, close_http_client, start_http_client
+from app.models import APICheck, Check, CheckExecution
+from app.scheduler import run_check_task
+from app.validation_cache import validation_cache
+from app.writer import execution_writer
+from bench.stub import StubUpstream
+
+REQUIRED_FIELDS = ["status", "data.id"]
+INSERT_CHUNK = 1000
+
+
+@dataclass
+class Workload:
+    checks: int
+    concurrency: int = 200
+    hosts: int = 100
+    latency_ms: float = 20
+    payload_bytes: int = 2048
+    error_rate: float = 0.0
+    seed: int = 0
+    stream_fields: bool = False
+    interval_seconds: float = 10
+    duration_seconds: float = 20
+
+    def stub(self) -> StubUpstream:
+        return StubUpstream(self.latency_ms, self.payload_bytes, self.error_rate, self.seed)
+
+    def describe(self) -> dict:
+        return {
+            "checks": self.checks,
+            "concurrency": self.concurrency,
+            "hosts": self.hosts,
+            "per_host_concurrency": HTTP_MAX_CONNECTIONS_PER_HOST,
+            "latency_ms": self.latency_ms,
+            "payload_bytes": self.payload_bytes,
+            "error_rate": self.error_rate,
+            "stream_fields": self.stream_fields,
+            "database": async_engine.dialect.name,
+        }
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+def _timings(durations: List[float]) -> dict:
+    ordered = sorted(durations)
+    p50, p99 = percentile(ordered, 0.5), percentile(ordered, 0.99)
+    return {
+        "e2e_p50_ms": p50 * 1000 if p50 is not None else None,
+        "e2e_p99_ms": p99 * 1000 if p99 is not None else None,
+    }
+
+
+def _url(index: int, hosts: int) -> str:
+    # spread checks over several stub hosts so the per-host limiter is exercised the way it is in production
+    return f"http://stub-{index % hosts}.bench/checks/{index}"
+
+
+async def _bounded(count: int, concurrency: int, run: Callable[[int], Awaitable[None]]) -> List[float]:
+    """Run run(0..count-1) with at most `concurrency` at once; returns each call's duration."""
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = [0.0] * count
+
+    async def one(index: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await run(index)
+            durations[index] = time.perf_counter() - started
+
+    await asyncio.gather(*(one(index) for index in range(count)))
+    return durations
+
+
+async def _reset_state():
+    check_cache.clear()
+    shape_cache.clear()
+    validation_cache.clear()
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def _insert_checks(workload: Workload) -> List[Check]:
+    rows = [
+        {
+            "name": f"bench-{index}",
+            "url": _url(index, workload.hosts),
+            "required_fields": REQUIRED_FIELDS,
+            "expected_status_code": 200,
+            "latency_threshold_ms": 1000,
+            "interval_minutes": 1,
+            "stream_fields": workload.stream_fields,
+        }
+        for index in range(workload.checks)
+    ]
+    async with AsyncSessionLocal() as db:
+        for start in range(0, len(rows), INSERT_CHUNK):
+            await db.execute(insert(Check), rows[start:start + INSERT_CHUNK])
+        await db.commit()
+        checks = list((await db.scalars(select(Check).order_by(Check.id))).all())
+    # scheduled runs read prebuilt definitions, as they do after a rebalance
+    for check in checks:
+        check_cache.put(check)
+    return checks
+
+
+async def _count_executions() -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(CheckExecution))
+
+
+async def _memory_per_inflight(stub: StubUpstream, checks: List[APICheck], count: int) -> Optional[float]:
+    """Traced memory held per check while `count` checks are parked mid-request in the stub."""
+    count = min(count, len(checks))
+    if count == 0:
+        return None
+    stub.hold = asyncio.Event()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tasks = [asyncio.create_task(run_check(checks[index])) for index in range(count)]
+        # wait until every check is parked in the stub or queued behind its host limiter
+        previous = -1
+        while stub.waiting != previous:
+            previous = stub.waiting
+            await asyncio.sleep(0.05)
+        held = tracemalloc.get_traced_memory()[0] - baseline
+        stub.hold.set()
+        await asyncio.gather(*tasks)
+    finally:
+        stub.hold = None
+        tracemalloc.stop()
+    return held / count
+
+
+async def bench_checker(workload: Workload) -> dict:
+    """run_check alone: HTTP, body read and validation, no database."""
+    validation_cache.clear()
+    stub = workload.stub()
+    checks = [
+        APICheck(
+            method="GET",
+            url=_url(index, workload.hosts),
+            required_fields=REQUIRED_FIELDS,
+            latency_threshold_ms=1000,
+            stream_fields=workload.stream_fields,
+        )
+        for index in range(workload.checks)
+    ]
+    statuses = Counter()
+
+    async def one(index: int):
+        result = await run_check(checks[index])
+        statuses[result["status"]] += 1
+
+    await start_http_client(stub.transport())
+    try:
+        started = time.perf_counter()
+        durations = await _bounded(len(checks), workload.concurrency, one)
+        elapsed = time.perf_counter() - started
+        memory = await _memory_per_inflight(stub, checks, workload.concurrency)
+    finally:
+        await close_http_client()
+    return {
+        "elapsed_seconds": elapsed,
+        "checks_per_second": len(checks) / elapsed,
+        **_timings(durations),
+        "pass": statuses["PASS"],
+        "fail": statuses["FAIL"],
+        "requests": stub.requests,
+        "memory_per_inflight_bytes": memory,
+    }
+
+
+async def bench_pipeline(workload: Workload) -> dict:
+    """The scheduled-run path for every check once: cached definition, run_check, drift, batched insert."""
+    await _reset_state()
+    checks = await _insert_checks(workload)
+    stub = workload.stub()
+
+    await start_http_client(stub.transport())
+    execution_writer.start()
+    try:
+        started = time.perf_counter()
+        durations = await _bounded(len(checks), workload.concurrency, lambda index: run_check_task(checks[index].id))
+        checks_elapsed = time.perf_counter() - started
+        # rows still buffered are part of the cost of writing them
+        await execution_writer.stop()
+        elapsed = time.perf_counter() - started
+    finally:
+        await execution_writer.stop()
+        await close_http_client()
+    rows = await _count_executions()
+    return {
+        "elapsed_seconds": elapsed,
+        "checks_per_second": len(checks) / checks_elapsed,
+        **_timings(durations),
+        "requests": stub.requests,
+        "rows_written": rows,
+        "rows_per_second": rows / elapsed,
+    }
+
+
+async def bench_scheduler(workload: Workload) -> dict:
+    """The dispatcher firing every check each interval for a fixed duration."""
+    await _reset_state()
+    checks = await _insert_checks(workload)
+    stub = workload.stub()
+    expected_runs = workload.checks * workload.duration_seconds / workload.interval_seconds
+    dispatcher = CheckDispatcher(concurrency=workload.concurrency, lag_window=max(1000, math.ceil(expected_runs) * 2))
+    for check in checks:
+        dispatcher.add_job(
+            run_check_task,
+            seconds=workload.interval_seconds,
+            args=[check.id],
+            id=f"check_{check.id}",
+            offset=phase_offset(check.id, workload.interval_seconds),
+        )
+
+    await start_http_client(stub.transport())
+    execution_writer.start()
+    try:
+        dispatcher.start()
+        started = time.perf_counter()
+        await asyncio.sleep(workload.duration_seconds)
+        await dispatcher.shutdown(wait=True, timeout=workload.interval_seconds)
+        await execution_writer.stop()
+        elapsed = time.perf_counter() - started
+    finally:
+        await execution_writer.stop()
+        await close_http_client()
+    rows = await _count_executions()
+    lag = dispatcher.lag_percentiles()
+    return {
+        "elapsed_seconds": elapsed,
+        "interval_seconds": workload.interval_seconds,
+        "duration_seconds": workload.duration_seconds,
+        "expected_runs": expected_runs,
+        "runs": lag["samples"],
+        "checks_per_second": lag["samples"] / elapsed,
+        "lag_p50_ms": lag["p50"] * 1000 if lag["p50"] is not None else None,
+        "lag_p99_ms": lag["p99"] * 1000 if lag["p99"] is not None else None,
+        "lag_max_ms": lag["max"] * 1000 if lag["max"] is not None else None,
+        "skipped_runs": dispatcher.skipped_runs,
+        "coalesced_runs": dispatcher.coalesced_runs,
+        "rows_written": rows,
+        "rows_per_second": rows / elapsed,
+    }
+
+
+SCENARIOS = {
+    "checker": bench_checker,
+    "pipeline": bench_pipeline,
+    "scheduler": bench_scheduler,
+}
@@ -0,0 +1,54 @@
+import asyncio
+import json
+import random
+from typing import Optional
+
+import httpx
+
+
+def build_payload(size_bytes: int) -> bytes:
+    """JSON body of roughly size_bytes that satisfies the benchmark checks' required_fields."""
+    document = {"status": "ok", "data": {"id": 1}, "items": []}
+    base = len(json.dumps(document))
+    item_size = len(json.dumps({"id": 0, "name": "item-000000"})) + 2
+    count = max(0, (size_bytes - base) // item_size)
+    document["items"] = [{"id": i, "name": f"item-{i:06d}"} for i in range(count)]
+    return json.dumps(document).encode()
+
+
+class StubUpstream:
+    """In-process upstream served through httpx.MockTransport.
+
+    Every request waits `latency_ms` and then, with probability `error_rate`, fails: half of
+    the failures are 500 responses, the other half connection errors (which run_check
+    retries with backoff). Outcomes come from a seeded RNG so runs are repeatable.
+    Setting `hold` parks every request until the event is set, which lets a benchmark
+    measure memory with a known number of checks in flight.
+    """
+
+    def __init__(self, latency_ms: float = 0, payload_bytes: int = 1024, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.body = build_payload(payload_bytes)
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.waiting = 0
+        self.hold: Optional[asyncio.Event] = None
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.hold is not None:
+            self.waiting += 1
+            await self.hold.wait()
+            self.waiting -= 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        roll = self.random.random()
+        if roll < self.error_rate / 2:
+            raise httpx.ConnectError("stub upstream refused the connection", request=request)
+        if roll < self.error_rate:
+            return httpx.Response(500, json={"error": "stub upstream error"})
+        return httpx.Response(200, content=self.body, headers={"content-type": "application/json"})
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self)
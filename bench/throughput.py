@@ -0,0 +1,108 @@
+"""Offline throughput benchmarks for the checker, the scheduled-run pipeline and the dispatcher.
+
+Upstreams are in-process stubs (bench.stub) and results go to SQLite or a local Postgres,
+so runs need no network and can be compared across commits. Each (scenario, size) pair
+prints one JSON line:
+
+    python -m bench.throughput --scenario checker pipeline --checks 100 1000 10000
+    python -m bench.throughput --checks 50000 --latency-ms 50 --error-rate 0.01 --output results.jsonl
+
+The bench database is dropped and recreated for every run: only point --database-url at a
+scratch database.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--scenario", nargs="+", choices=["checker", "pipeline", "scheduler"], default=["checker", "pipeline"],
+    )
+    parser.add_argument("--checks", nargs="+", type=int, default=[100, 1000], help="workload sizes to run")
+    parser.add_argument("--concurrency", type=int, default=200, help="checks running at once")
+    parser.add_argument("--hosts", type=int, default=100, help="distinct stub hosts the checks are spread over")
+    parser.add_argument("--latency-ms", type=float, default=20, help="stub response latency")
+    parser.add_argument("--payload-bytes", type=int, default=2048, help="stub JSON body size")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of failed requests (500s + resets)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stream-fields", action="store_true", help="validate with the streaming parser")
+    parser.add_argument("--interval", type=float, default=10, help="check interval in the scheduler scenario (s)")
+    parser.add_argument("--duration", type=float, default=20, help="length of the scheduler scenario (s)")
+    parser.add_argument("--database-url", help="scratch database (default: a temporary SQLite file)")
+    parser.add_argument("--output", help="append JSON lines to this file instead of stdout")
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace, out):
+    # imported here: app.database reads DATABASE_URL at import time
+    from app.database import async_engine
+    from bench.scenarios import SCENARIOS, Workload
+
+    meta = {
+        "commit": _git_revision(),
+        "python": platform.python_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+    try:
+        for size in args.checks:
+            workload = Workload(
+                checks=size,
+                concurrency=args.concurrency,
+                hosts=args.hosts,
+                latency_ms=args.latency_ms,
+                payload_bytes=args.payload_bytes,
+                error_rate=args.error_rate,
+                seed=args.seed,
+                stream_fields=args.stream_fields,
+                interval_seconds=args.interval,
+                duration_seconds=args.duration,
+            )
+            for scenario in args.scenario:
+                result = await SCENARIOS[scenario](workload)
+                record = {"scenario": scenario, **workload.describe(), **result, **meta}
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+    finally:
+        await async_engine.dispose()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/bench.db"
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+        os.environ["SCHEDULER_ENABLED"] = "false"
+        # per-run logging would dominate the measurements; skipped runs are counted in the results
+        logging.basicConfig(level=logging.ERROR)
+        if args.output:
+            with open(args.output, "a") as out:
+                asyncio.run(run(args, out))
+        else:
+            asyncio.run(run(args, sys.stdout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.adhoc import run_checks
+from app.main import app
+from app.models import APICheck
+
+
+def _check(path):
+    return APICheck(method="GET", url=f"http://example.com/{path}", required_fields=[])
+
+
+def _fake_run_check(delays, failing=(), active=None):
+    """run_check stand-in: sleeps per url path, fails the paths in `failing`."""
+    async def fake(check):
+        path = check.url.path.strip("/")
+        if active is not None:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        try:
+            await asyncio.sleep(delays[path])
+        finally:
+            if active is not None:
+                active["now"] -= 1
+        return {"status": "FAIL" if path in failing else "PASS", "error": None, "shape": ["id:number"]}
+    return fake
+
+
+async def _collect(generator):
+    return [item async for item in generator]
+
+
+def test_run_checks_yields_in_completion_order_with_bounded_fanout():
+    delays = {"slow": 0.05, "a": 0.01, "b": 0.01, "c": 0.01}
+    active = {"now": 0, "peak": 0}
+    checks = [_check(path) for path in delays]
+    with patch("app.adhoc.run_check", _fake_run_check(delays, active=active)):
+        items = asyncio.run(_collect(run_checks(checks, concurrency=2)))
+
+    results, summary = items[:-1], items[-1]
+    assert [item["event"] for item in results] == ["result"] * 4
+    assert results[-1]["index"] == 0  # the slow check finishes last although it was first
+    assert active["peak"] == 2
+    assert summary == {
+        "event": "summary", "total": 4, "passed": 4, "failed": 0, "cancelled": 0, "fail_fast_triggered": False,
+    }
+
+
+def test_run_checks_fail_fast_cancels_the_rest():
+    delays = {"broken": 0.01, "slow-1": 1, "slow-2": 1}
+    checks = [_check(path) for path in delays]
+    with patch("app.adhoc.run_check", _fake_run_check(delays, failing={"broken"})):
+        items = asyncio.run(asyncio.wait_for(_collect(run_checks(checks, fail_fast=True)), timeout=0.5))
+
+    assert [item["url"] for item in items[:-1]] == ["http://example.com/broken"]
+    assert items[-1]["failed"] == 1 and items[-1]["cancelled"] == 2 and items[-1]["fail_fast_triggered"]
+
+
+def test_run_checks_endpoint_streams_ndjson():
+    delays = {"a": 0, "b": 0}
+    payload = {"checks": [{"method": "GET", "url": f"http://example.com/{p}", "required_fields": []} for p in delays]}
+    with patch("app.adhoc.run_check", _fake_run_check(delays, failing={"b"})):
+        with TestClient(app) as client:
+            response = client.post("/run-checks", json=payload)
+            assert client.post("/run-checks", json={"checks": []}).status_code == 422
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["status"] for line in lines[:-1]) == ["FAIL", "PASS"]
+    assert not any("shape" in line for line in lines)
+    assert lines[-1]["event"] == "summary" and lines[-1]["passed"] == 1
+
+
+@pytest.mark.parametrize("concurrency", [0, -1])
+def test_run_checks_rejects_bad_concurrency(concurrency):
+    with TestClient(app) as client:
+        payload = {"checks": [{"method": "GET", "url": "http://example.com/", "required_fields": []}]}
+        assert client.post("/run-checks", json={**payload, "concurrency": concurrency}).status_code == 422
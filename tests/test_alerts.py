@@ -0,0 +1,153 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+
+import httpx
+import pytest
+
+from app.alerts import FIRING, RESOLVED, AlertPipeline, ConsecutiveFailuresRule, LatencyRegressionRule
+
+
+def _row(check_id=1, status="FAIL", consecutive_failures=1, latency_ms=10, latency_regression=False):
+    return {
+        "check_id": check_id,
+        "status": status,
+        "consecutive_failures": consecutive_failures,
+        "latency_ms": latency_ms,
+        "latency_zscore": 5.0 if latency_regression else 0.0,
+        "latency_regression": latency_regression,
+        "executed_at": datetime.utcnow(),
+    }
+
+
+class StubWebhook:
+    """Local webhook endpoint served through httpx.MockTransport."""
+
+    def __init__(self, statuses=(), hold: asyncio.Event = None):
+        self.statuses = list(statuses)
+        self.hold = hold
+        self.payloads = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        if self.hold is not None:
+            await self.hold.wait()
+        self.payloads.append(json.loads(request.content))
+        return httpx.Response(self.statuses.pop(0) if self.statuses else 200)
+
+    @property
+    def alerts(self):
+        return [alert for payload in self.payloads for alert in payload["alerts"]]
+
+
+def test_consecutive_failures_fire_once_and_resolve():
+    pipeline = AlertPipeline(["http://hooks.test/a"], rules=[ConsecutiveFailuresRule(threshold=3)])
+    streak = [1, 2, 3, 4, 5]
+    fired = [pipeline.evaluate(_row(consecutive_failures=n)) for n in streak]
+    assert [[a.state for a in alerts] for alerts in fired] == [[], [], [FIRING], [], []]
+    assert len(pipeline.active()) == 1
+
+    resolved = pipeline.evaluate(_row(status="PASS", consecutive_failures=0))
+    assert [(a.rule, a.state) for a in resolved] == [("consecutive_failures", RESOLVED)]
+    assert pipeline.active() == []
+
+
+def test_latency_regression_needs_a_run_of_flagged_executions():
+    pipeline = AlertPipeline(["http://hooks.test/a"], rules=[LatencyRegressionRule(runs=2)])
+    assert pipeline.evaluate(_row(status="PASS", latency_ms=500, latency_regression=True)) == []
+    assert pipeline.evaluate(_row(status="PASS", latency_ms=100)) == []
+    assert pipeline.evaluate(_row(status="PASS", latency_ms=500, latency_regression=True)) == []
+    [alert] = pipeline.evaluate(_row(status="PASS", latency_ms=450, latency_regression=True))
+    assert (alert.rule, alert.state) == ("latency_regression", FIRING)
+    # runs without a latency say nothing either way
+    assert pipeline.evaluate(_row(latency_ms=None, latency_regression=None)) == []
+    [alert] = pipeline.evaluate(_row(status="PASS", latency_ms=110))
+    assert alert.state == RESOLVED
+
+
+@pytest.mark.asyncio
+async def test_alerts_are_batched_per_destination():
+    first, second = StubWebhook(), StubWebhook()
+
+    async def route(request):
+        return await (first if request.url.path == "/a" else second)(request)
+
+    pipeline = AlertPipeline(
+        ["http://hooks.test/a", "http://hooks.test/b"],
+        rules=[ConsecutiveFailuresRule(threshold=2)],
+        transport=httpx.MockTransport(route),
+        batch_wait=0.05,
+        rate_per_second=100,
+    )
+    pipeline.start()
+    pipeline.offer([_row(check_id=n, consecutive_failures=2) for n in (1, 2, 3)])
+    await pipeline.stop()
+
+    for webhook in (first, second):
+        assert len(webhook.payloads) == 1
+        assert sorted(alert["check_id"] for alert in webhook.alerts) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_failed_delivery_is_retried():
+    webhook = StubWebhook(statuses=[503, 500])
+    pipeline = AlertPipeline(
+        ["http://hooks.test/a"],
+        rules=[ConsecutiveFailuresRule(threshold=1)],
+        transport=httpx.MockTransport(webhook),
+        batch_wait=0,
+        retry_backoff=0.01,
+    )
+    pipeline.start()
+    pipeline.offer([_row()])
+    await pipeline.stop()
+    assert len(webhook.payloads) == 3
+    assert webhook.payloads[0] == webhook.payloads[-1]
+
+
+@pytest.mark.asyncio
+async def test_stuck_destination_never_blocks_offers():
+    webhook = StubWebhook(hold=asyncio.Event())
+    pipeline = AlertPipeline(
+        ["http://hooks.test/a"],
+        rules=[ConsecutiveFailuresRule(threshold=1)],
+        queue_size=10,
+        transport=httpx.MockTransport(webhook),
+        batch_wait=0,
+    )
+    pipeline.start()
+    started = time.perf_counter()
+    for n in range(1000):
+        pipeline.offer([_row(check_id=n)])
+    assert time.perf_counter() - started < 0.5
+    assert pipeline.pending == 10
+
+    await pipeline.stop(drain_seconds=0.05)
+    assert not pipeline.running
+    assert webhook.payloads == []
+
+
+@pytest.mark.asyncio
+async def test_unexpected_delivery_error_does_not_stop_the_sender():
+    webhook = StubWebhook()
+    calls = []
+
+    async def route(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.InvalidURL("bad url")
+        return await webhook(request)
+
+    pipeline = AlertPipeline(
+        ["http://hooks.test/a"],
+        rules=[ConsecutiveFailuresRule(threshold=1)],
+        transport=httpx.MockTransport(route),
+        batch_wait=0,
+        rate_per_second=0,
+    )
+    pipeline.start()
+    pipeline.offer([_row(check_id=1)])
+    await asyncio.sleep(0.05)
+    pipeline.offer([_row(check_id=2)])
+    await pipeline.stop()
+    assert [alert["check_id"] for alert in webhook.alerts] == [2]
@@ -0,0 +1,212 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import Base, async_engine
+from app.check_cache import check_cache
+from app.main import app
+from app.scheduler import scheduler
+
+
+async def _reset_schema():
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+@pytest.fixture
+def client():
+    asyncio.run(_reset_schema())
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _check_payload(name="demo"):
+    return {"name": name, "url": "http://example.com/api", "required_fields": ["status"], "interval_minutes": 1}
+
+
+def test_check_crud_endpoints(client):
+    created = client.post("/checks", json=_check_payload())
+    assert created.status_code == 201
+    check_id = created.json()["id"]
+
+    duplicate = client.post("/checks", json=_check_payload())
+    assert duplicate.status_code == 400
+
+    assert [c["id"] for c in client.get("/checks").json()] == [check_id]
+    assert client.get(f"/checks/{check_id}").json()["name"] == "demo"
+    assert client.get(f"/checks/{check_id}/history").json() == []
+
+    assert scheduler.get_job(f"check_{check_id}") is not None
+
+    assert client.delete(f"/checks/{check_id}").status_code == 204
+    assert client.get(f"/checks/{check_id}").status_code == 404
+    # deleting unschedules the job and drops the cached definition
+    assert scheduler.get_job(f"check_{check_id}") is None
+    assert check_cache.peek(check_id) is None
+
+
+def test_history_keyset_pagination(client):
+    from datetime import datetime, timedelta
+
+    from app.database import AsyncSessionLocal
+    from app.async_crud import create_executions
+
+    check_id = client.post("/checks", json=_check_payload()).json()["id"]
+    base = (datetime.utcnow() - timedelta(days=1)).replace(second=0, microsecond=0)
+    rows = [
+        {"check_id": check_id, "status": "PASS", "missing_fields": [], "executed_at": base + timedelta(minutes=n)}
+        for n in range(5)
+    ]
+
+    async def seed():
+        async with AsyncSessionLocal() as db:
+            await create_executions(db, rows)
+
+    asyncio.run(seed())
+
+    def minutes(page):
+        return [int((datetime.fromisoformat(e["executed_at"]) - base).total_seconds() // 60) for e in page]
+
+    first = client.get(f"/checks/{check_id}/history", params={"limit": 2}).json()
+    assert minutes(first) == [4, 3]
+    second = client.get(f"/checks/{check_id}/history", params={"limit": 2, "before": first[-1]["executed_at"]}).json()
+    assert minutes(second) == [2, 1]
+    newer = client.get(f"/checks/{check_id}/history", params={"limit": 2, "after": second[0]["executed_at"]}).json()
+    assert minutes(newer) == [4, 3]
+
+    ranged = client.get(
+        f"/checks/{check_id}/history",
+        params={
+            "start": (base + timedelta(minutes=1)).isoformat() + "Z",
+            "end": (base + timedelta(minutes=2)).isoformat(),
+        },
+    ).json()
+    assert minutes(ranged) == [2, 1]
+
+    both = client.get(
+        f"/checks/{check_id}/history", params={"before": first[0]["executed_at"], "after": base.isoformat()},
+    )
+    assert both.status_code == 400
+
+
+def test_history_cursor_breaks_timestamp_ties(client):
+    from datetime import datetime, timedelta
+
+    from app.database import AsyncSessionLocal
+    from app.async_crud import create_executions
+
+    check_id = client.post("/checks", json=_check_payload()).json()["id"]
+    executed_at = (datetime.utcnow() - timedelta(hours=1)).replace(microsecond=0)
+    rows = [{"check_id": check_id, "status": "PASS", "missing_fields": [], "executed_at": executed_at}] * 5
+
+    async def seed():
+        async with AsyncSessionLocal() as db:
+            await create_executions(db, rows)
+
+    asyncio.run(seed())
+
+    url = f"/checks/{check_id}/history"
+    pages, params = [], {"limit": 2}
+    while page := client.get(url, params=params).json():
+        pages.append([e["id"] for e in page])
+        params = {"limit": 2, "before": page[-1]["executed_at"], "before_id": page[-1]["id"]}
+    ids = [i for page in pages for i in page]
+    assert len(ids) == 5 and ids == sorted(ids, reverse=True)
+
+    newer = client.get(url, params={"limit": 2, "after": executed_at.isoformat(), "after_id": ids[-1]}).json()
+    assert [e["id"] for e in newer] == ids[-3:-1]
+    assert client.get(url, params={"before_id": ids[0]}).status_code == 400
+
+
+def test_stats_endpoint(client):
+    check_id = client.post("/checks", json=_check_payload()).json()["id"]
+
+    stats = client.get(f"/checks/{check_id}/stats", params={"window": "24h"})
+    assert stats.status_code == 200
+    body = stats.json()
+    assert body["granularity"] == "hour"
+    assert body["count"] == 0
+    assert body["availability"] is None
+
+    assert client.get(f"/checks/{check_id}/stats", params={"window": "forever"}).status_code == 400
+    assert client.get("/checks/9999/stats").status_code == 404
+
+
+def test_bulk_upsert_dry_run_and_prune(client):
+    existing = client.post("/checks", json=_check_payload("keep")).json()["id"]
+    client.post("/checks", json=_check_payload("stale"))
+    manifest = [
+        {**_check_payload("keep"), "interval_minutes": 5},
+        _check_payload("new-a"),
+        _check_payload("new-b"),
+    ]
+
+    preview = client.post("/checks/bulk", json={"checks": manifest, "prune": True, "dry_run": True}).json()
+    assert preview["dry_run"] is True
+    assert preview["added"] == ["new-a", "new-b"]
+    assert preview["changed"] == [{"name": "keep", "changes": {"interval_minutes": {"from": 1, "to": 5}}}]
+    assert preview["removed"] == ["stale"]
+    assert sorted(c["name"] for c in client.get("/checks").json()) == ["keep", "stale"]
+
+    applied = client.post("/checks/bulk", json={"checks": manifest, "prune": True})
+    assert applied.status_code == 200
+    checks = {c["name"]: c for c in client.get("/checks").json()}
+    assert sorted(checks) == ["keep", "new-a", "new-b"]
+    assert checks["keep"]["id"] == existing and checks["keep"]["interval_minutes"] == 5
+    assert scheduler.get_job(f"check_{existing}").interval_seconds == 300
+    assert scheduler.get_job(f"check_{checks['new-a']['id']}") is not None
+
+    again = client.post("/checks/bulk", json={"checks": manifest}).json()
+    assert again["added"] == [] and again["changed"] == [] and again["unchanged"] == 3
+
+
+def test_bulk_rejects_duplicate_names(client):
+    response = client.post("/checks/bulk", json={"checks": [_check_payload("a"), _check_payload("a")]})
+    assert response.status_code == 422
+
+
+def test_persisted_runs_are_published_to_subscribers(client):
+    from unittest.mock import AsyncMock, patch
+
+    from app.events import bus
+
+    watched = client.post("/checks", json=_check_payload("watched")).json()["id"]
+    other = client.post("/checks", json=_check_payload("other")).json()["id"]
+    result = {"status": "PASS", "missing_fields": [], "status_code": 200, "latency_ms": 3}
+    subscription = bus.subscribe([watched])
+    try:
+        with patch("app.main.run_check", AsyncMock(return_value=result)):
+            client.post(f"/checks/{other}/run")
+            execution = client.post(f"/checks/{watched}/run").json()
+        event = subscription.queue.get_nowait()
+    finally:
+        bus.unsubscribe(subscription)
+    assert event["type"] == "execution"
+    assert (event["check_id"], event["status"]) == (watched, "PASS")
+    assert event["executed_at"].isoformat() == execution["executed_at"]
+    assert subscription.queue.empty()
+
+
+def test_check_state_tracks_transitions(client):
+    from unittest.mock import AsyncMock, patch
+
+    check_id = client.post("/checks", json=_check_payload()).json()["id"]
+    assert client.get(f"/checks/{check_id}/state").json()["status"] is None
+
+    results = [
+        {"status": "PASS", "missing_fields": [], "status_code": 200, "latency_ms": 3},
+        {"status": "FAIL", "missing_fields": ["status"], "status_code": 200, "latency_ms": 3},
+    ]
+    with patch("app.main.run_check", AsyncMock(side_effect=results)):
+        first = client.post(f"/checks/{check_id}/run").json()
+        second = client.post(f"/checks/{check_id}/run").json()
+    assert first["transition"] is None
+    assert (second["transition"], second["consecutive_failures"]) == ("PASS->FAIL", 1)
+
+    state = client.get(f"/checks/{check_id}/state").json()
+    assert (state["status"], state["consecutive_failures"]) == ("FAIL", 1)
+    assert state["last_transition_at"] == second["executed_at"]
+    transitions = client.get(f"/checks/{check_id}/history", params={"transitions_only": True}).json()
+    assert [e["id"] for e in transitions] == [second["id"]]
@@ -0,0 +1,168 @@
+import asyncio
+import random
+from datetime import datetime
+
+import pytest
+
+from app import baselines
+from app.async_crud import create_check
+from app.baselines import BaselineTracker, LatencyBaseline, record_baselines
+from app.database import AsyncSessionLocal, Base, async_engine
+
+
+def _warm(baseline, mean=100, spread=5, runs=300, seed=3):
+    rng = random.Random(seed)
+    for _ in range(runs):
+        value = max(0.1, rng.gauss(mean, spread))
+        assert not baseline.is_regression(value)
+        baseline.update(value)
+
+
+def test_baseline_flags_anomalies_but_not_noise():
+    baseline = LatencyBaseline()
+    _warm(baseline)
+    assert baseline.mean == pytest.approx(100, abs=3)
+    assert baseline.std == pytest.approx(5, rel=0.4)
+
+    assert baseline.is_regression(400)
+    assert baseline.zscore(400) > 20
+    before = baseline.mean
+    baseline.update(5000)
+    # the spike is clipped to the z threshold before it is folded in
+    assert baseline.mean < before + 2
+
+
+def test_lasting_shift_becomes_the_new_normal():
+    baseline = LatencyBaseline()
+    _warm(baseline)
+    assert baseline.is_regression(300)
+    runs = 0
+    while baseline.is_regression(300):
+        baseline.update(300)
+        runs += 1
+    # flagged for a short episode, long enough for an alert, until the variance widens
+    assert 3 <= runs < 50
+    for _ in range(200):
+        baseline.update(300)
+    assert baseline.mean == pytest.approx(300, rel=0.05)
+    assert not baseline.is_regression(300)
+
+
+def test_small_absolute_changes_on_fast_checks_are_ignored():
+    baseline = LatencyBaseline()
+    _warm(baseline, mean=5, spread=0.5)
+    assert baseline.zscore(12) > baselines.BASELINE_Z_THRESHOLD
+    assert not baseline.is_regression(12)
+
+
+def test_sketch_decays_to_a_bounded_window():
+    baseline = LatencyBaseline()
+    for _ in range(5 * baselines.BASELINE_SKETCH_WINDOW):
+        baseline.update(100)
+    assert baseline.sketch.count < 2 * baselines.BASELINE_SKETCH_WINDOW
+    assert baseline.sketch.quantile(0.5) == pytest.approx(100, rel=0.02)
+
+
+def test_record_baselines_flags_rows_and_checkpoints(monkeypatch):
+    monkeypatch.setattr(baselines, "latency_baselines", BaselineTracker(checkpoint_seconds=0))
+
+    def row(check_id, latency_ms):
+        return {"check_id": check_id, "status": "PASS", "latency_ms": latency_ms, "executed_at": datetime.utcnow()}
+
+    async def scenario():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        rng = random.Random(5)
+        async with AsyncSessionLocal() as db:
+            check_id = (await create_check(db, "baseline", "http://example.com", ["a"])).id
+            warmup = [row(check_id, rng.gauss(200, 10)) for _ in range(100)]
+            install = await record_baselines(db, warmup)
+            assert not any(r["latency_regression"] for r in warmup)
+            # nothing is tracked until the transaction commits
+            assert baselines.latency_baselines.get(check_id) is None
+            await db.commit()
+            install()
+
+            batch = [row(check_id, 900), row(check_id, None)]
+            install = await record_baselines(db, batch)
+            await db.commit()
+            install()
+            assert batch[0]["latency_regression"] and batch[0]["latency_zscore"] > 4
+            assert batch[1]["latency_regression"] is None
+
+        # a restarted replica resumes from the checkpoint
+        tracker = BaselineTracker()
+        async with AsyncSessionLocal() as db:
+            await tracker.load(db, [check_id])
+        restored = tracker.get(check_id)
+        assert restored.samples == 101
+        assert restored.mean == pytest.approx(baselines.latency_baselines.get(check_id).mean)
+        assert restored.is_regression(900)
+
+    asyncio.run(scenario())
+
+
+def test_checkpoint_keeps_baselines_dirty_until_committed_and_release_hands_over(monkeypatch):
+    tracker = BaselineTracker(checkpoint_seconds=0)
+    monkeypatch.setattr(baselines, "latency_baselines", tracker)
+
+    async def scenario():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSessionLocal() as db:
+            check_id = (await create_check(db, "handover", "http://example.com", ["a"])).id
+        tracker.install(tracker.stage([{"check_id": check_id, "latency_ms": 120.0}]))
+
+        async with AsyncSessionLocal() as db:
+            assert await tracker.checkpoint(db) == [check_id]
+            await db.rollback()
+        # the write never committed, so the baseline is still due
+        assert tracker.checkpoint_due({})
+
+        await baselines.release_baselines([check_id])
+        assert tracker.get(check_id) is None and not tracker.checkpoint_due({})
+        # the replica taking the shard over resumes from the handed over checkpoint
+        successor = BaselineTracker()
+        async with AsyncSessionLocal() as db:
+            await successor.load(db, [check_id])
+        return successor.get(check_id)
+
+    restored = asyncio.run(scenario())
+    assert restored.samples == 1 and restored.mean == 120.0
+
+
+def test_runs_of_checks_owned_elsewhere_are_scored_but_not_tracked(monkeypatch):
+    owner = BaselineTracker(checkpoint_seconds=0)
+    replica = BaselineTracker(checkpoint_seconds=0, owns=lambda check_id: False)
+
+    async def scenario():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSessionLocal() as db:
+            check_id = (await create_check(db, "owned-elsewhere", "http://example.com", ["a"])).id
+        rng = random.Random(7)
+        owner.install(owner.stage([{"check_id": check_id, "latency_ms": rng.gauss(200, 10)} for _ in range(100)]))
+        async with AsyncSessionLocal() as db:
+            checkpointed = await owner.checkpoint(db)
+            await db.commit()
+        owner.install({}, checkpointed)
+
+        # an ad-hoc run lands on a replica that does not own the check's shard
+        monkeypatch.setattr(baselines, "latency_baselines", replica)
+        row = {"check_id": check_id, "latency_ms": 900.0}
+        async with AsyncSessionLocal() as db:
+            install = await record_baselines(db, [row])
+            await db.commit()
+        install()
+        async with AsyncSessionLocal() as db:
+            stored = await baselines.get_baseline(db, check_id)
+        return row, stored
+
+    row, stored = asyncio.run(scenario())
+    assert row["latency_regression"] and row["latency_zscore"] > 4
+    assert len(replica) == 0 and not replica.checkpoint_due({})
+    # the owner's checkpoint is left as it was
+    assert stored.samples == 100
@@ -0,0 +1,68 @@
+import asyncio
+from unittest.mock import patch
+
+from app import check_cache as check_cache_module
+from app.async_crud import create_check
+from app.check_cache import CheckDefinitionCache
+from app.database import AsyncSessionLocal, Base, async_engine
+from app.models import APICheck
+
+
+async def _create(name="cached"):
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        return await create_check(db, name, "http://example.com/api", ["status"], interval_minutes=2)
+
+
+def test_cache_loads_once_and_reloads_after_invalidate():
+    async def scenario():
+        check = await _create()
+        cache = CheckDefinitionCache(ttl_seconds=0)
+        with patch.object(check_cache_module, "get_check", wraps=check_cache_module.get_check) as loads:
+            first = await cache.get(check.id)
+            second = await cache.get(check.id)
+            reads_warm = loads.call_count
+            cache.invalidate(check.id)
+            await cache.get(check.id)
+            missing = await cache.get(check.id + 1)
+        return first, second, reads_warm, loads.call_count, missing
+
+    first, second, reads_warm, reads_total, missing = asyncio.run(scenario())
+    assert first is second
+    assert isinstance(first.payload, APICheck)
+    assert first.interval_minutes == 2
+    assert reads_warm == 1
+    assert reads_total == 3
+    assert missing is None
+
+
+def test_cache_entries_expire_after_ttl():
+    async def scenario():
+        check = await _create()
+        cache = CheckDefinitionCache(ttl_seconds=60)
+        definition = await cache.get(check.id)
+        with patch("app.check_cache.time.monotonic", return_value=definition.loaded_at + 61):
+            assert cache.peek(check.id) is None
+        return len(cache)
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_cached_checks_drive_the_host_limits():
+    from app.http_client import host_limits
+
+    async def scenario():
+        await _create()
+        async with AsyncSessionLocal() as db:
+            strict = await create_check(db, "strict", "http://example.com/other", ["status"], host_max_concurrency=1)
+        cache = CheckDefinitionCache(ttl_seconds=0)
+        await cache.get(strict.id)
+        cached = host_limits("http://example.com/api")["max_concurrency"]
+        cache.invalidate(strict.id)
+        return cached, host_limits("http://example.com/api")["max_concurrency"]
+
+    cached, dropped = asyncio.run(scenario())
+    assert cached == 1
+    assert dropped == host_limits("http://unrelated.example.com/")["max_concurrency"]
@@ -0,0 +1,79 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.async_crud import create_check, create_executions, get_check_history
+from app.check_state import FAILED, RECOVERED, RollingState, get_check_state, load_states, record_transitions
+from app.database import AsyncSessionLocal, Base, async_engine
+
+
+def test_rolling_state_streaks_and_transitions():
+    state = RollingState()
+    now = datetime.utcnow()
+    statuses = ["PASS", "PASS", "FAIL", "FAIL", "FAIL", "PASS"]
+    transitions = [state.apply(status, now + timedelta(minutes=n), alpha=0.1) for n, status in enumerate(statuses)]
+
+    assert transitions == [None, None, FAILED, None, None, RECOVERED]
+    assert state.consecutive_passes == 1
+    assert state.consecutive_failures == 0
+    assert state.last_transition_at == now + timedelta(minutes=5)
+
+
+def test_flapping_has_hysteresis():
+    state = RollingState()
+    now = datetime.utcnow()
+    for n in range(10):
+        state.apply("PASS" if n % 2 else "FAIL", now, alpha=0.2)
+    assert state.flapping
+    # stays flapping while the score decays between the low and high thresholds
+    state.apply("PASS", now, alpha=0.2)
+    assert state.flapping
+    for _ in range(20):
+        state.apply("PASS", now, alpha=0.2)
+    assert not state.flapping and state.flap_score < 0.05
+
+
+def test_record_transitions_persists_and_rebuilds():
+    now = datetime.utcnow().replace(microsecond=0)
+
+    def row(check_id, status, minutes):
+        executed_at = now + timedelta(minutes=minutes)
+        return {"check_id": check_id, "status": status, "missing_fields": [], "executed_at": executed_at}
+
+    async def scenario():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSessionLocal() as db:
+            tracked = (await create_check(db, "tracked", "http://example.com", ["a"])).id
+            legacy = (await create_check(db, "legacy", "http://example.com", ["a"])).id
+            # executions written before states existed: rebuilt on first use
+            await create_executions(db, [row(legacy, "PASS", 0), row(legacy, "FAIL", 1), row(legacy, "FAIL", 2)])
+
+            batch = [row(tracked, "PASS", 0), row(tracked, "FAIL", 1), row(legacy, "PASS", 3)]
+            await record_transitions(db, batch)
+            await create_executions(db, batch)
+            assert [r["transition"] for r in batch] == [None, FAILED, RECOVERED]
+            assert [r["consecutive_failures"] for r in batch] == [0, 1, 0]
+
+            history = await get_check_history(db, legacy, transitions_only=True)
+            assert [e.transition for e in history] == [RECOVERED]
+            stored = await get_check_state(db, tracked)
+            assert (stored.status, stored.consecutive_failures, stored.last_transition_at) == (
+                "FAIL", 1, now + timedelta(minutes=1)
+            )
+
+        # another replica extends the streak; the next batch here continues from the stored row
+        async with AsyncSessionLocal() as db:
+            await record_transitions(db, [row(tracked, "FAIL", 2)])
+            await db.commit()
+        async with AsyncSessionLocal() as db:
+            follow_up = [row(tracked, "FAIL", 3)]
+            await record_transitions(db, follow_up)
+            await db.rollback()
+            assert follow_up[0]["consecutive_failures"] == 3
+            # the rolled back batch left the stored state alone
+            states = await load_states(db, [tracked, legacy])
+        assert states[tracked].consecutive_failures == 2
+        assert states[legacy].status == "PASS"
+
+    asyncio.run(scenario())
@@ -1,20 +1,30 @@
+import itertools
 import json
-from unittest.mock import AsyncMock, MagicMock, patch
+import time
+from unittest.mock import patch
 
+import httpx
 import pytest
 
 from app.checker import run_check
+from app.http_client import RequestTrace
+from app.jsonstream import JSONEventParser, RequiredFieldTracker
 from app.models import APICheck
+from app.validation_cache import validation_cache
 
 
-def _mock_async_client(mock_response):
-    """Helper to create a properly mocked AsyncClient context manager."""
-    mock_client = AsyncMock()
-    mock_client.request = AsyncMock(return_value=mock_response)
-    mock_client_instance = AsyncMock()
-    mock_client_instance.__aenter__ = AsyncMock(return_value=mock_client)
-    mock_client_instance.__aexit__ = AsyncMock(return_value=None)
-    return mock_client_instance
+def _mock_async_client(handler):
+    """Helper to create a shared AsyncClient backed by an in-process handler."""
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _respond(status_code=200, **kwargs):
+    return lambda request: httpx.Response(status_code, **kwargs)
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
 
 
 @pytest.mark.asyncio
@@ -28,11 +38,8 @@ async def test_run_check_pass():
         latency_threshold_ms=1000,
     )
 
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = {"status": "ok", "data": {"id": 123}}
-
-    with patch("app.checker.httpx.AsyncClient", return_value=_mock_async_client(mock_response)):
+    client = _mock_async_client(_respond(json={"status": "ok", "data": {"id": 123}}))
+    with patch("app.checker.get_client", return_value=client):
         result = await run_check(check)
 
         assert result["status"] == "PASS"
@@ -51,11 +58,8 @@ async def test_run_check_fail_bad_status():
         expected_status_code=200,
     )
 
-    mock_response = MagicMock()
-    mock_response.status_code = 500
-    mock_response.json.return_value = {}
-
-    with patch("app.checker.httpx.AsyncClient", return_value=_mock_async_client(mock_response)):
+    client = _mock_async_client(_respond(500, json={}))
+    with patch("app.checker.get_client", return_value=client):
         result = await run_check(check)
 
         assert result["status"] == "FAIL"
@@ -72,11 +76,8 @@ async def test_run_check_fail_missing_fields():
         expected_status_code=200,
     )
 
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = {"status": "ok"}
-
-    with patch("app.checker.httpx.AsyncClient", return_value=_mock_async_client(mock_response)):
+    client = _mock_async_client(_respond(json={"status": "ok"}))
+    with patch("app.checker.get_client", return_value=client):
         result = await run_check(check)
 
         assert result["status"] == "FAIL"
@@ -94,14 +95,11 @@ async def test_run_check_fail_latency_threshold():
         latency_threshold_ms=100,
     )
 
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = {}
-
-    with patch("app.checker.httpx.AsyncClient", return_value=_mock_async_client(mock_response)):
+    client = _mock_async_client(_respond(json={}))
+    with patch("app.checker.get_client", return_value=client):
         with patch("app.checker.time.perf_counter") as mock_time:
-            # Simulate 500ms latency
-            mock_time.side_effect = [0.0, 0.5]
+            # Simulate 500ms latency (httpx reads the clock too, so every later call sees 0.5)
+            mock_time.side_effect = itertools.chain([0.0], itertools.repeat(0.5))
 
             result = await run_check(check)
 
@@ -119,11 +117,8 @@ async def test_run_check_fail_invalid_json():
         expected_status_code=200,
     )
 
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.json.side_effect = json.JSONDecodeError("Invalid JSON", "", 0)
-
-    with patch("app.checker.httpx.AsyncClient", return_value=_mock_async_client(mock_response)):
+    client = _mock_async_client(_respond(content=b"<html>oops</html>"))
+    with patch("app.checker.get_client", return_value=client):
         result = await run_check(check)
 
         assert result["status"] == "FAIL"
@@ -140,17 +135,200 @@ async def test_run_check_fail_request_error():
         expected_status_code=200,
     )
 
-    import httpx
+    def handler(request):
+        raise httpx.ConnectError("Connection failed", request=request)
 
-    mock_client = AsyncMock()
-    mock_client.request = AsyncMock(side_effect=httpx.RequestError("Connection failed"))
-    mock_client_instance = AsyncMock()
-    mock_client_instance.__aenter__ = AsyncMock(return_value=mock_client)
-    mock_client_instance.__aexit__ = AsyncMock(return_value=None)
-
-    with patch("app.checker.httpx.AsyncClient", return_value=mock_client_instance):
+    client = _mock_async_client(handler)
+    with patch("app.checker.get_client", return_value=client), patch("app.checker.BACKOFF_SECONDS", 0):
         result = await run_check(check)
 
         assert result["status"] == "FAIL"
         assert "after" in result["error"]
         assert "attempts" in result["error"]
+
+
+@pytest.mark.asyncio
+async def test_run_check_reports_connection_reuse():
+    """The trace extension tells a fresh handshake apart from a pooled keep-alive connection."""
+    check = APICheck(method="GET", url="http://example.com/api", required_fields=[])
+
+    async def handler(request):
+        await request.extensions["trace"]("connection.connect_tcp.started", {})
+        await request.extensions["trace"]("http11.send_request_headers.started", {})
+        return httpx.Response(200, json={})
+
+    result = await run_check(check, client=_mock_async_client(handler))
+    assert result["connection_reused"] is False
+
+    async def pooled_handler(request):
+        await request.extensions["trace"]("http11.send_request_headers.started", {})
+        return httpx.Response(200, json={})
+
+    result = await run_check(check, client=_mock_async_client(pooled_handler))
+    assert result["connection_reused"] is True
+
+
+@pytest.mark.asyncio
+async def test_run_check_reports_phase_timings():
+    """Trace events split latency into connect, TLS, TTFB and download; phase thresholds fail the run."""
+    check = APICheck(
+        method="GET",
+        url="https://example.com/api",
+        required_fields=[],
+        phase_thresholds_ms={"connect": 100, "ttfb": 100},
+    )
+
+    async def handler(request):
+        trace = request.extensions["trace"]
+        await trace("connection.connect_tcp.started", {})
+        now = time.perf_counter()
+        trace.timestamps.update({
+            "connection.connect_tcp.started": now - 0.30,
+            "connection.connect_tcp.complete": now - 0.25,
+            "connection.start_tls.started": now - 0.25,
+            "connection.start_tls.complete": now - 0.20,
+            "http11.send_request_headers.started": now - 0.20,
+            "http11.receive_response_headers.complete": now,
+        })
+        return httpx.Response(200, json={})
+
+    result = await run_check(check, client=_mock_async_client(handler))
+    assert result["connect_ms"] == pytest.approx(50)
+    assert result["tls_ms"] == pytest.approx(50)
+    assert result["ttfb_ms"] == pytest.approx(200)
+    assert result["download_ms"] >= 0
+    assert result["status"] == "FAIL"
+    assert result["error"] == "Phase thresholds exceeded: ttfb 200ms > 100ms"
+
+
+def test_request_trace_phases_without_events():
+    """Transports without trace events, and reused connections, leave phases unknown."""
+    trace = RequestTrace()
+    assert trace.phases() == {"connect_ms": None, "tls_ms": None, "ttfb_ms": None, "download_ms": None}
+
+
+@pytest.mark.asyncio
+async def test_run_check_rejects_oversized_body():
+    """Fail: a body over max_body_bytes is cut off, declared up front or not."""
+    check = APICheck(method="GET", url="http://example.com/api", required_fields=[], max_body_bytes=16)
+
+    result = await run_check(check, client=_mock_async_client(_respond(content=b"[" + b"1," * 50 + b"1]")))
+    assert result["status"] == "FAIL"
+    assert "byte limit" in result["error"]
+
+    # chunked: no Content-Length, the cap is enforced while reading
+    undeclared = _respond(content=_chunks(b'{"a": "', b"x" * 32, b'"}'))
+    result = await run_check(check, client=_mock_async_client(undeclared))
+    assert result["status"] == "FAIL"
+    assert "byte limit" in result["error"]
+
+
+@pytest.mark.asyncio
+async def test_run_check_stream_fields_stops_early():
+    """With stream_fields, reading stops once every required field is resolved."""
+    check = APICheck(
+        method="GET",
+        url="http://example.com/api",
+        required_fields=["status", "data.id"],
+        max_body_bytes=64,
+        stream_fields=True,
+    )
+    # the trailing padding would blow the cap if it were read
+    body = _chunks(b'{"status": "ok", "data": {"id', b'": 1}, "pad": "', b"x" * 128, b'"}')
+    result = await run_check(check, client=_mock_async_client(_respond(content=body)))
+    assert result["status"] == "PASS"
+    assert result["missing_fields"] == []
+
+    body = _chunks(b'{"status": "ok", "data": {"name": "x"}', b"}")
+    result = await run_check(check, client=_mock_async_client(_respond(content=body)))
+    assert result["status"] == "FAIL"
+    assert result["missing_fields"] == ["data.id"]
+
+    result = await run_check(check, client=_mock_async_client(_respond(content=_chunks(b'{"status": '))))
+    assert result["status"] == "FAIL"
+    assert "not valid JSON" in result["error"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1000])
+def test_json_event_parser_matches_json_loads(chunk_size):
+    doc = {"a": [1, -2.5e3, "x\"y", {"b": None}], "c": True, "d": {"e": "é"}}
+    raw = json.dumps(doc, ensure_ascii=False).encode()
+    parser = JSONEventParser()
+    events = []
+    for i in range(0, len(raw), chunk_size):
+        events.extend(parser.feed(raw[i:i + chunk_size]))
+    events.extend(parser.close())
+
+    assert ("key", ("a",)) in events
+    assert ("number", ("a", 1)) in events
+    assert ("string", ("a", 2)) in events
+    assert ("null", ("a", 3, "b")) in events
+    assert ("string", ("d", "e")) in events
+    assert events[-1] == ("end_map", ())
+
+    tracker = RequiredFieldTracker(["c", "a.b", "d.e", "d.f"])
+    tracker.feed(events)
+    assert tracker.resolved
+    assert tracker.missing == ["a.b", "d.f"]
+
+
+def test_json_event_parser_rejects_bad_input():
+    with pytest.raises(json.JSONDecodeError):
+        JSONEventParser().feed(b'{"a" 1}')
+    parser = JSONEventParser()
+    parser.feed(b'{"a": [1, 2')
+    with pytest.raises(json.JSONDecodeError):
+        parser.close()
+
+
+@pytest.mark.asyncio
+async def test_run_check_revalidates_with_etag():
+    """A 304 reuses the cached validation outcome and shape instead of re-reading the body."""
+    check = APICheck(method="GET", url="http://example.com/etag", required_fields=["status", "gone"])
+    seen_headers = []
+
+    def handler(request):
+        seen_headers.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"'})
+        return httpx.Response(200, headers={"ETag": '"v1"'}, json={"status": "ok"})
+
+    validation_cache.clear()
+    client = _mock_async_client(handler)
+    full = await run_check(check, client=client)
+    cached = await run_check(check, client=client)
+
+    assert seen_headers == [None, '"v1"']
+    assert full["from_cache"] is False
+    assert cached["from_cache"] is True
+    assert cached["status_code"] == 304
+    assert cached["status"] == full["status"] == "FAIL"
+    assert cached["missing_fields"] == ["gone"]
+    assert cached["shape_fingerprint"] == full["shape_fingerprint"]
+
+
+@pytest.mark.asyncio
+async def test_revalidation_is_not_reused_across_body_limits():
+    """Tightening a read limit (or switching to stream_fields) fetches and validates the body again."""
+    body = {"status": "ok", "pad": "x" * 64}
+    seen_headers = []
+
+    def handler(request):
+        seen_headers.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"'})
+        return httpx.Response(200, headers={"ETag": '"v1"'}, json=body)
+
+    validation_cache.clear()
+    client = _mock_async_client(handler)
+    check = APICheck(method="GET", url="http://example.com/limits", required_fields=["status"])
+    assert (await run_check(check, client=client))["status"] == "PASS"
+
+    limited = check.model_copy(update={"max_body_bytes": 16})
+    result = await run_check(limited, client=client)
+    assert result["from_cache"] is False
+    assert "byte limit" in result["error"]
+
+    streamed = check.model_copy(update={"stream_fields": True})
+    assert (await run_check(streamed, client=client))["from_cache"] is False
+    assert seen_headers == [None, None, None]
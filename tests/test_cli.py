@@ -0,0 +1,51 @@
+import json
+
+import httpx
+import pytest
+
+from app import cli
+from app.cli import ManifestError, load_manifest
+
+
+def test_load_manifest_json_and_yaml(tmp_path):
+    entry = {"name": "demo", "url": "http://example.com/api", "required_fields": ["status"]}
+    as_json = tmp_path / "checks.json"
+    as_json.write_text(json.dumps([entry]))
+    assert [check.name for check in load_manifest(as_json)] == ["demo"]
+
+    as_yaml = tmp_path / "checks.yaml"
+    as_yaml.write_text(
+        "checks:\n"
+        "  - name: demo\n"
+        "    url: http://example.com/api\n"
+        "    required_fields: [status, data.id]\n"
+        "    interval_minutes: 2\n"
+    )
+    [check] = load_manifest(as_yaml)
+    assert check.required_fields == ["status", "data.id"] and check.interval_minutes == 2
+
+
+def test_load_manifest_validates_every_entry(tmp_path):
+    manifest = tmp_path / "checks.json"
+    manifest.write_text(json.dumps({"checks": [{"name": "bad", "url": "not a url", "required_fields": []}]}))
+    with pytest.raises(ManifestError):
+        load_manifest(manifest)
+
+    manifest.write_text(json.dumps({"name": "not a list"}))
+    with pytest.raises(ManifestError):
+        load_manifest(manifest)
+
+
+@pytest.mark.parametrize("outcome", [httpx.ConnectError("connection refused"), 422])
+def test_import_via_api_reports_http_errors(tmp_path, monkeypatch, capsys, outcome):
+    manifest = tmp_path / "checks.json"
+    manifest.write_text(json.dumps([{"name": "demo", "url": "http://example.com/api", "required_fields": ["id"]}]))
+
+    def post(url, **kwargs):
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, json={"detail": "bad"}, request=httpx.Request("POST", url))
+
+    monkeypatch.setattr(cli.httpx, "post", post)
+    assert cli.main(["import", str(manifest), "--api-url", "http://localhost:1"]) == 1
+    assert "failed" in capsys.readouterr().err
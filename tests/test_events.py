@@ -0,0 +1,118 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.events import EventBus, Subscription, bus, publish_executions, sse_stream, websocket_stream
+
+
+def test_bus_filters_by_check_id():
+    events = EventBus()
+    everything = events.subscribe()
+    only_two = events.subscribe([2])
+    assert events.publish({"type": "execution", "check_id": 1}) == 1
+    assert events.publish({"type": "execution", "check_id": 2}) == 2
+    assert everything.queue.qsize() == 2
+    assert only_two.queue.get_nowait()["check_id"] == 2
+
+    events.unsubscribe(everything)
+    assert len(events) == 1
+
+
+def test_full_queue_drops_oldest():
+    subscription = Subscription(queue_size=2)
+    for n in range(4):
+        subscription.offer({"type": "execution", "check_id": n})
+    assert [subscription.queue.get_nowait()["check_id"] for _ in range(2)] == [2, 3]
+    assert subscription.take_dropped() == 2
+    assert subscription.take_dropped() == 0
+
+
+@pytest.mark.asyncio
+async def test_sse_stream_formats_events_and_unsubscribes():
+    subscription = bus.subscribe([7])
+    stream = sse_stream(subscription, keepalive=0.01)
+    assert await stream.__anext__() == ": connected\n\n"
+    assert await stream.__anext__() == ": keep-alive\n\n"
+
+    subscription.queue = asyncio.Queue(1)
+    publish_executions([{"check_id": 7, "status": "PASS"}, {"check_id": 7, "status": "FAIL"}])
+    assert await stream.__anext__() == 'event: dropped\ndata: {"dropped": 1}\n\n'
+    chunk = await stream.__anext__()
+    assert chunk.startswith("event: execution\ndata: ")
+    assert json.loads(chunk.split("data: ", 1)[1])["status"] == "FAIL"
+
+    await stream.aclose()
+    assert subscription not in bus._subscribers
+
+
+@pytest.mark.asyncio
+async def test_writer_publishes_only_persisted_rows():
+    from app.writer import _insert_rows
+
+    subscription = bus.subscribe()
+    try:
+        with patch("app.writer.record_transitions", AsyncMock()), patch("app.writer.record_baselines", AsyncMock()), \
+                patch("app.writer.record_rollups", AsyncMock()):
+            with patch("app.writer.create_executions", AsyncMock()):
+                await _insert_rows([{"check_id": 1, "status": "PASS"}], False)
+            with patch("app.writer.create_executions", AsyncMock(side_effect=RuntimeError("insert failed"))):
+                with pytest.raises(RuntimeError):
+                    await _insert_rows([{"check_id": 2, "status": "PASS"}], False)
+        assert subscription.queue.get_nowait() == {"type": "execution", "check_id": 1, "status": "PASS"}
+        assert subscription.queue.empty()
+    finally:
+        bus.unsubscribe(subscription)
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.incoming = asyncio.Queue()
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def receive_json(self):
+        message = await self.incoming.get()
+        if message is None:
+            raise ConnectionError("client went away")
+        return message
+
+
+@pytest.mark.asyncio
+async def test_websocket_stream_refilters_and_unsubscribes_on_disconnect():
+    websocket = FakeWebSocket()
+    subscription = bus.subscribe([1])
+    task = asyncio.create_task(websocket_stream(websocket, subscription, keepalive=60))
+
+    publish_executions([{"check_id": 1, "status": "PASS"}, {"check_id": 2, "status": "PASS"}])
+    await asyncio.sleep(0.01)
+    await websocket.incoming.put({"check_ids": [2]})
+    await asyncio.sleep(0.01)
+    publish_executions([{"check_id": 1, "status": "FAIL"}, {"check_id": 2, "status": "FAIL"}])
+    await asyncio.sleep(0.01)
+    await websocket.incoming.put(None)
+    await asyncio.wait_for(task, 1)
+
+    assert [(e["check_id"], e["status"]) for e in websocket.sent] == [(1, "PASS"), (2, "FAIL")]
+    assert subscription not in bus._subscribers
+
+
+@pytest.mark.asyncio
+async def test_websocket_stream_rejects_bad_filter_and_stays_open():
+    websocket = FakeWebSocket()
+    subscription = bus.subscribe([1])
+    task = asyncio.create_task(websocket_stream(websocket, subscription, keepalive=60))
+
+    for bad in (["x"], "12", [{"id": 1}]):
+        await websocket.incoming.put({"check_ids": bad})
+    await asyncio.sleep(0.01)
+    publish_executions([{"check_id": 1, "status": "PASS"}])
+    await asyncio.sleep(0.01)
+    await websocket.incoming.put(None)
+    await asyncio.wait_for(task, 1)
+
+    assert [e["type"] for e in websocket.sent] == ["error", "error", "error", "execution"]
+    assert subscription.check_ids == frozenset({1})
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from app.checker import field_exists
+from app.fieldpaths import compile_paths
+from app.jsonstream import JSONEventParser, RequiredFieldTracker
+
+DOC = {
+    "status": "ok",
+    "items": [{"id": 1, "tags": []}, {"id": 2, "tags": ["a"]}],
+    "meta": {"0": "zero", "count": None},
+    "empty": [],
+}
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("status", True),
+    ("items.0.id", True),
+    ("items.2.id", False),
+    ("items.*.id", True),
+    ("items.*.tags", True),
+    ("items.*.tags.*.x", False),  # "a" is not an object
+    ("meta.0", True),
+    ("meta.count", True),
+    ("meta.*", True),
+    ("empty.*.id", True),  # nothing to check in an empty array
+    ("status.length", False),  # no crash on non-dict intermediates
+    ("items.id", False),
+])
+def test_field_exists(path, expected):
+    assert field_exists(DOC, path) is expected
+
+
+def test_missing_keeps_declared_order_and_caches():
+    fields = ("missing.b", "status", "items.*.name", "items.0.id")
+    matcher = compile_paths(fields)
+    assert matcher.missing(DOC) == ["missing.b", "items.*.name"]
+    assert compile_paths(fields) is matcher
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 1000])
+def test_streaming_tracker_agrees_with_matcher(chunk_size):
+    fields = ["items.*.id", "items.1.tags.0", "items.*.tags.*.x", "meta.0", "meta.count.x", "empty.*", "nope"]
+    raw = json.dumps(DOC).encode()
+    parser = JSONEventParser()
+    tracker = RequiredFieldTracker(fields)
+    for i in range(0, len(raw), chunk_size):
+        tracker.feed(parser.feed(raw[i:i + chunk_size]))
+    tracker.feed(parser.close())
+
+    assert tracker.resolved
+    assert tracker.missing == compile_paths(tuple(fields)).missing(DOC)
+    assert tracker.missing == ["items.*.tags.*.x", "meta.count.x", "nope"]
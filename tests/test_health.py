@@ -11,4 +11,12 @@ def test_health_endpoint():
     assert data["db"] in {"ok", "error"}
     assert isinstance(data["scheduler"], dict)
     # Scheduler enabled state depends on env; just verify it's present
-    assert "scheduler_enabled" in data["scheduler"]
\ No newline at end of file
+    assert "scheduler_enabled" in data["scheduler"]
+
+def test_metrics_endpoint():
+    client = TestClient(app)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE check_runs_total counter" in response.text
+    assert "# TYPE event_loop_lag_seconds histogram" in response.text
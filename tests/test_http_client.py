@@ -0,0 +1,69 @@
+from unittest.mock import patch
+
+import pytest
+
+from app import http_client
+
+
+@pytest.mark.asyncio
+async def test_get_client_is_shared_until_closed():
+    client = http_client.get_client()
+    try:
+        assert http_client.get_client() is client
+        assert not client.is_closed
+    finally:
+        await http_client.close_http_client()
+
+    assert client.is_closed
+    fresh = http_client.get_client()
+    try:
+        assert fresh is not client
+    finally:
+        await http_client.close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_host_limiter_is_per_host():
+    try:
+        a = http_client.host_limiter("http://example.com/a")
+        assert http_client.host_limiter("http://EXAMPLE.com/b") is a
+        assert http_client.host_limiter("https://example.com/a") is a
+        assert http_client.host_limiter("http://example.com:8080/a") is not a
+    finally:
+        await http_client.close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_host_limiter_follows_the_current_check_overrides():
+    try:
+        limiter = http_client.host_limiter("http://example.com/a")
+        default = (http_client.HTTP_MAX_CONNECTIONS_PER_HOST, http_client.HTTP_HOST_RATE_PER_SECOND or None)
+        http_client.set_check_host_limits(1, "http://example.com/a", max_concurrency=1, rate_per_second=2)
+        http_client.set_check_host_limits(2, "https://example.com/b", max_concurrency=3)
+        # the strictest override applies to the host's one limiter, resized in place
+        assert http_client.host_limiter("http://example.com/c") is limiter
+        assert (limiter.max_concurrency, limiter.rate_per_second) == (1, 2)
+
+        # editing the strict check onto another host, then deleting the other, loosens it again
+        http_client.set_check_host_limits(1, "http://other.example.com/a", max_concurrency=1)
+        http_client.host_limiter("http://example.com/a")
+        assert (limiter.max_concurrency, limiter.rate_per_second) == (3, default[1])
+        http_client.forget_check_host_limits(2)
+        assert http_client.host_limiter("http://example.com/a") is limiter
+        assert (limiter.max_concurrency, limiter.rate_per_second) == default
+    finally:
+        http_client.forget_check_host_limits(1)
+        http_client.forget_check_host_limits(2)
+        await http_client.close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_host_limits_config_overrides_defaults():
+    with patch.dict(http_client.HOST_LIMITS, {"api.example.com": {"max_concurrency": 2, "rate_per_second": 5}}):
+        try:
+            limiter = http_client.host_limiter("https://api.example.com/v1")
+            assert (limiter.max_concurrency, limiter.rate_per_second) == (2, 5)
+            default = http_client.host_limiter("https://other.example.com/v1")
+            assert default.max_concurrency == http_client.HTTP_MAX_CONNECTIONS_PER_HOST
+        finally:
+            await http_client.close_http_client()
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import pytest
+
+from app.metrics import LOOP_LAG, Counter, Gauge, Histogram, LoopLagMonitor, MetricsRegistry
+
+
+def test_counter_and_gauge_render_prometheus_text():
+    registry = MetricsRegistry()
+    runs = registry.register(Counter("runs_total", "Runs", ("status",)))
+    pending = registry.register(Gauge("pending", "Pending rows", fn=lambda: 3))
+    runs.labels("PASS").inc()
+    runs.labels("PASS").inc()
+    runs.labels("FAIL").inc()
+
+    text = registry.render()
+    assert "# TYPE runs_total counter" in text
+    assert 'runs_total{status="PASS"} 2' in text
+    assert 'runs_total{status="FAIL"} 1' in text
+    assert "pending 3" in text
+    assert pending.name == "pending"
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.register(Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    text = registry.render()
+    assert 'latency_seconds_bucket{le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{le="1"} 3' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in text
+    assert "latency_seconds_count 4" in text
+    assert "latency_seconds_sum 3.65" in text
+
+
+def test_registry_rejects_duplicates_and_bad_labels():
+    registry = MetricsRegistry()
+    runs = registry.register(Counter("runs_total", "Runs", ("status",)))
+    with pytest.raises(ValueError):
+        registry.register(Counter("runs_total", "Runs again"))
+    with pytest.raises(ValueError):
+        runs.labels("PASS", "extra")
+
+
+def test_loop_lag_monitor_records_blocking():
+    lag_before = LOOP_LAG.labels().sum
+
+    async def scenario():
+        monitor = LoopLagMonitor(interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0.02)
+        # block the loop past the monitor's next wake-up
+        time.sleep(0.1)
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+        assert not monitor.running
+
+    asyncio.run(scenario())
+    assert LOOP_LAG.labels().sum - lag_before >= 0.05
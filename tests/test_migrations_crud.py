@@ -1,3 +1,4 @@
+import asyncio
 import os
 from pathlib import Path
 
@@ -6,8 +7,8 @@ from alembic import command
 from alembic.config import Config
 from sqlalchemy import text
 
-from app import crud
-from app.database import Base, SessionLocal, engine
+from app import async_crud
+from app.database import AsyncSessionLocal, Base, async_engine
 
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -18,6 +19,11 @@ def run_migrations():
     command.upgrade(cfg, "head")
 
 
+async def drop_schema():
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+
 @pytest.mark.skipif(
     os.getenv("DATABASE_URL", "").startswith("sqlite"),
     reason="Requires PostgreSQL (migrations use Postgres-specific DDL)",
@@ -25,7 +31,7 @@ def run_migrations():
 def test_migrations_and_crud():
     # Drop all tables and recreate schema via migrations
     try:
-        Base.metadata.drop_all(engine)
+        asyncio.run(drop_schema())
     except Exception:
         pass  # If drop fails (DB unavailable), skip silently
     
@@ -34,26 +40,26 @@ def test_migrations_and_crud():
     except Exception as e:
         pytest.skip(f"Could not run migrations: {e}")
 
-    session = SessionLocal()
-    try:
-        # sanity check connectivity
-        session.execute(text("SELECT 1"))
-
-        check = crud.create_check(
-            session,
-            name="demo",
-            url="http://example.com",
-            required_fields=["foo"],
-            expected_status_code=200,
-            latency_threshold_ms=500,
-            interval_minutes=1,
-        )
-        fetched = crud.get_check(session, check.id)
-        assert fetched is not None
-        assert fetched.name == "demo"
-
-        removed = crud.delete_check(session, check.id)
-        assert removed is True
-        assert crud.get_check(session, check.id) is None
-    finally:
-        session.close()
+    async def scenario():
+        async with AsyncSessionLocal() as session:
+            # sanity check connectivity
+            await session.execute(text("SELECT 1"))
+
+            check = await async_crud.create_check(
+                session,
+                name="demo",
+                url="http://example.com",
+                required_fields=["foo"],
+                expected_status_code=200,
+                latency_threshold_ms=500,
+                interval_minutes=1,
+            )
+            fetched = await async_crud.get_check(session, check.id)
+            assert fetched is not None
+            assert fetched.name == "demo"
+
+            removed = await async_crud.delete_check(session, check.id)
+            assert removed is True
+            assert await async_crud.get_check(session, check.id) is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,52 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app import partitions
+from app.async_crud import create_check, create_executions, get_check_history
+from app.database import AsyncSessionLocal, Base, async_engine
+from app.models import CheckExecution
+
+
+def test_partition_naming_and_bounds():
+    assert partitions.partition_name(date(2026, 3, 7)) == "check_executions_p20260307"
+    bound = "FOR VALUES FROM ('2026-03-07 00:00:00') TO ('2026-03-08 00:00:00')"
+    assert partitions.partition_upper_bound(bound) == datetime(2026, 3, 8)
+    assert partitions.partition_upper_bound("FOR VALUES FROM (MINVALUE) TO ('2026-03-08')") == datetime(2026, 3, 8)
+    assert partitions.partition_upper_bound("DEFAULT") is None
+
+
+def test_partition_overlaps_skips_days_already_covered():
+    today, tomorrow = datetime(2026, 3, 7), datetime(2026, 3, 8)
+    legacy = "FOR VALUES FROM (MINVALUE) TO ('2026-03-08 00:00:00')"
+    assert partitions.partition_overlaps(legacy, today, tomorrow)
+    assert not partitions.partition_overlaps(legacy, tomorrow, tomorrow + timedelta(days=1))
+    daily = "FOR VALUES FROM ('2026-03-08 00:00:00') TO ('2026-03-09 00:00:00')"
+    assert partitions.partition_overlaps(daily, tomorrow, tomorrow + timedelta(days=1))
+    assert not partitions.partition_overlaps(daily, today, tomorrow)
+    assert not partitions.partition_overlaps("DEFAULT", today, tomorrow)
+
+
+def test_retention_on_sqlite_deletes_expired_rows():
+    async def scenario():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            check = await create_check(db, "retention", "http://example.com", ["a"])
+            old = now - timedelta(days=partitions.EXECUTION_RETENTION_DAYS + 1)
+            rows = [
+                {"check_id": check.id, "status": "PASS", "missing_fields": [], "executed_at": old},
+                {"check_id": check.id, "status": "PASS", "missing_fields": [], "executed_at": now},
+            ]
+            await create_executions(db, rows)
+            # expired rows are already outside every history query
+            assert len(await get_check_history(db, check.id)) == 1
+
+            assert await partitions.ensure_partitions(db) == []
+            await partitions.drop_expired_partitions(db, now=now)
+            return await db.scalar(select(func.count()).select_from(CheckExecution))
+
+    assert asyncio.run(scenario()) == 1
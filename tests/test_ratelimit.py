@@ -0,0 +1,120 @@
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+from app.checker import run_check
+from app.http_client import close_http_client, forget_check_host_limits, host_limiter, set_check_host_limits
+from app.models import APICheck
+from app.ratelimit import HostLimiter, TokenBucket, retry_after_seconds
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_spaces_out_a_burst():
+    loop = asyncio.get_running_loop()
+    bucket = TokenBucket(rate=50, burst=2)
+    started = loop.time()
+    stamps = []
+    for _ in range(6):
+        await bucket.acquire()
+        stamps.append(loop.time() - started)
+    # two banked tokens go at once, the rest arrive at 50/s
+    assert stamps[1] < 0.01
+    assert stamps[-1] >= 4 / 50 * 0.9
+
+
+@pytest.mark.asyncio
+async def test_host_limiter_caps_concurrency():
+    limiter = HostLimiter(max_concurrency=2)
+    active = peak = 0
+
+    async def request():
+        nonlocal active, peak
+        async with limiter.slot():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(request() for _ in range(6)))
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_host_limiter_resize_counts_requests_in_flight():
+    limiter = HostLimiter(max_concurrency=3)
+    release = asyncio.Event()
+    active = peak_after_resize = 0
+    resized = False
+
+    async def request():
+        nonlocal active, peak_after_resize
+        async with limiter.slot():
+            active += 1
+            if resized:
+                peak_after_resize = max(peak_after_resize, active)
+            await release.wait()
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    tasks = [asyncio.create_task(request()) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    limiter.resize(1, None)
+    resized = True
+    tasks += [asyncio.create_task(request()) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    # the three requests already running hold their slots; the new ones wait
+    assert active == 3
+    release.set()
+    await asyncio.gather(*tasks)
+    # and the queued ones only start once the running ones are down below the new cap
+    assert peak_after_resize == 1
+    assert limiter._active == 0
+
+    limiter.resize(2, 50)
+    assert (limiter.max_concurrency, limiter.rate_per_second) == (2, 50)
+
+
+@pytest.mark.asyncio
+async def test_queue_time_is_reported_apart_from_latency():
+    check = APICheck(method="GET", url="http://limited.example.com/api", required_fields=[], host_max_concurrency=1)
+    set_check_host_limits(1, check.url, check.host_max_concurrency)
+
+    async def slow(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(slow))
+    try:
+        first, second = await asyncio.gather(run_check(check, client=client), run_check(check, client=client))
+    finally:
+        forget_check_host_limits(1)
+        await close_http_client()
+    queued = max(first, second, key=lambda result: result["queue_ms"])
+    assert queued["queue_ms"] >= 40
+    assert queued["latency_ms"] < queued["queue_ms"] + 40
+
+
+@pytest.mark.asyncio
+async def test_429_retry_after_pauses_the_host():
+    check = APICheck(method="GET", url="http://busy.example.com/api", required_fields=[])
+    client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(429, headers={"Retry-After": "7"}, json={})
+    ))
+    try:
+        result = await run_check(check, client=client)
+        limiter = host_limiter(check.url)
+        remaining = limiter._paused_until - asyncio.get_running_loop().time()
+    finally:
+        await close_http_client()
+    assert result["status"] == "FAIL"
+    assert 6 < remaining <= 7
+
+
+def test_retry_after_parsing():
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert retry_after_seconds("120") == 120
+    assert retry_after_seconds("Thu, 01 Jan 2026 00:00:30 GMT", now=now) == 30
+    assert retry_after_seconds("soon") is None
+    assert retry_after_seconds(None) is None
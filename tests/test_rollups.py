@@ -0,0 +1,68 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import rollups
+from app.async_crud import create_check
+from app.database import AsyncSessionLocal, Base, async_engine
+from app.sketch import LatencySketch
+
+
+def test_sketch_quantiles_within_relative_accuracy_and_merge():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(4, 1) for _ in range(5000)]
+    left, right = LatencySketch(), LatencySketch()
+    for n, value in enumerate(values):
+        (left if n % 2 else right).add(value)
+    merged = LatencySketch.from_dict(left.to_dict())
+    merged.merge(right)
+
+    assert merged.count == len(values)
+    ordered = sorted(values)
+    for q in (0.5, 0.95, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert merged.quantile(q) == pytest.approx(exact, rel=0.03)
+
+
+def test_parse_window_and_granularity():
+    assert rollups.parse_window("90m") == timedelta(minutes=90)
+    assert rollups.parse_window("7d") == timedelta(days=7)
+    with pytest.raises(ValueError):
+        rollups.parse_window("soon")
+    assert rollups.granularity_for(timedelta(hours=1)) == "minute"
+    assert rollups.granularity_for(timedelta(hours=24)) == "hour"
+    assert rollups.granularity_for(timedelta(days=30)) == "day"
+
+
+def test_record_rollups_merges_batches_and_serves_stats():
+    now = datetime.utcnow().replace(second=30, microsecond=0)
+
+    def row(check_id, status, latency_ms, seconds_ago=0):
+        executed_at = now - timedelta(seconds=seconds_ago)
+        return {"check_id": check_id, "status": status, "latency_ms": latency_ms, "executed_at": executed_at}
+
+    async def scenario():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSessionLocal() as db:
+            check = await create_check(db, "rollups", "http://example.com", ["a"])
+            await rollups.record_rollups(db, [row(check.id, "PASS", 100), row(check.id, "FAIL", 300)])
+            await db.commit()
+            await rollups.record_rollups(db, [row(check.id, "PASS", 200, seconds_ago=1)])
+            await db.commit()
+            minute = await rollups.get_rollups(db, check.id, "minute", now - timedelta(minutes=1))
+            stats = await rollups.get_stats(db, check.id, timedelta(hours=1), now=now)
+        return minute, stats
+
+    minute, stats = asyncio.run(scenario())
+    assert len(minute) == 1
+    assert (minute[0].count, minute[0].pass_count, minute[0].fail_count) == (3, 2, 1)
+    assert stats["granularity"] == "minute"
+    assert stats["count"] == 3
+    assert stats["availability"] == pytest.approx(2 / 3)
+    assert stats["latency_avg_ms"] == pytest.approx(200)
+    assert (stats["latency_min_ms"], stats["latency_max_ms"]) == (100, 300)
+    assert stats["latency_p50_ms"] == pytest.approx(200, rel=0.03)
@@ -1,20 +1,21 @@
+import asyncio
 import os
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.jobstores.memory import MemoryJobStore
+import time
+
+import pytest
+
+from app.dispatcher import CheckDispatcher, Job, current_run, expected_load_profile, phase_offset
 
 
 def test_schedule_check_job_registers_job():
-    # Use in-memory DB and scheduler job store to avoid external services
+    # Use in-memory DB; jobs are only registered, the dispatcher is never started
     os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
     os.environ.setdefault("SCHEDULER_ENABLED", "true")
 
     from app import scheduler as sched
 
-    # Swap to a memory job store so adding jobs does not hit the database
-    sched.scheduler = BackgroundScheduler(jobstores={"default": MemoryJobStore()}, timezone="UTC")
-    sched.scheduler.remove_all_jobs()
-    sched.scheduler.start()
-
+    original = sched.scheduler
+    sched.scheduler = CheckDispatcher()
     try:
         dummy_check = type("Check", (), {"id": 123, "name": "demo", "interval_minutes": 1})
 
@@ -23,5 +24,165 @@ def test_schedule_check_job_registers_job():
         jobs = sched.scheduler.get_jobs()
         assert len(jobs) == 1
         assert jobs[0].id == sched._job_id(dummy_check.id)
+        assert jobs[0].interval_seconds == 60
+        assert jobs[0].offset_seconds == phase_offset(123, 60)
+    finally:
+        sched.scheduler = original
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_runs_jobs_under_concurrency_limit():
+    dispatcher = CheckDispatcher(concurrency=2)
+    active = 0
+    peak = 0
+    runs = []
+
+    async def job(n):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+        runs.append(n)
+
+    for n in range(5):
+        dispatcher.add_job(job, seconds=0.01, args=[n], id=f"job_{n}")
+    dispatcher.start()
+    try:
+        await asyncio.sleep(0.15)
+    finally:
+        await dispatcher.shutdown(wait=True, timeout=1)
+
+    assert set(runs) == set(range(5))
+    assert peak <= 2
+    assert not dispatcher.running
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_does_not_overlap_a_job():
+    dispatcher = CheckDispatcher()
+    started = []
+
+    async def slow():
+        started.append(1)
+        await asyncio.sleep(0.1)
+
+    dispatcher.add_job(slow, seconds=0.01, id="slow")
+    dispatcher.start()
+    try:
+        await asyncio.sleep(0.08)
+        assert len(started) == 1
+        dispatcher.remove_job("slow")
+    finally:
+        await dispatcher.shutdown(wait=True, timeout=1)
+
+
+def test_phase_offsets_spread_checks_across_the_interval():
+    jobs = [
+        Job(id=f"check_{i}", func=None, interval_seconds=300, offset_seconds=phase_offset(i, 300))
+        for i in range(1, 601)
+    ]
+    profile = expected_load_profile(jobs, 300, wall_now=1_700_000_000)
+
+    assert profile["starts"] == 600
+    assert profile["mean_per_second"] == 2
+    # without offsets all 600 would start in the same second
+    assert profile["peak_per_second"] <= 4
+    assert phase_offset(42, 300) == phase_offset(42, 300)
+
+
+def test_first_delay_aligns_to_the_epoch():
+    job = Job(id="j", func=None, interval_seconds=60, offset_seconds=15)
+    assert job.first_delay(1_200_000_000 + 10) == 5  # 1.2e9 is a multiple of 60, so +15 is the next fire
+    assert job.first_delay(1_200_000_000 + 20) == 55
+    assert Job(id="k", func=None, interval_seconds=60).first_delay(123) == 60
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_reports_run_timing_and_missed_runs():
+    dispatcher = CheckDispatcher(concurrency=1, misfire_grace_seconds=30)
+    runs = []
+    release = asyncio.Event()
+
+    async def slow():
+        runs.append(current_run())
+        await release.wait()
+
+    def fire_due(at):
+        # drive the timer by hand at loop time `at` so nothing depends on real scheduling jitter
+        for job, lateness in dispatcher._pop_due(at):
+            dispatcher._fire(job, lateness, time.time())
+
+    dispatcher.add_job(slow, seconds=60, id="slow")
+    dispatcher.start()
+    try:
+        job = dispatcher.get_job("slow")
+        now = dispatcher._loop.time()
+        with dispatcher._lock:
+            dispatcher._heap.clear()
+            dispatcher._push(job, now)
+        fire_due(now)
+        while not runs:
+            await asyncio.sleep(0)
+        # the first run is still going when the next fire time comes due
+        fire_due(now + 60)
+        release.set()
+        await asyncio.gather(*dispatcher._tasks)
+        # then the loop falls two fire times behind: one coalesced run, 1s late
+        fire_due(now + 241)
+        await asyncio.gather(*dispatcher._tasks)
     finally:
-        sched.scheduler.shutdown(wait=False)
+        await dispatcher.shutdown(wait=True, timeout=1)
+
+    assert len(runs) == 2
+    assert runs[0].missed_runs == 0
+    assert runs[0].started_at >= runs[0].scheduled_at
+    # fire times that came due while the previous run was still going are counted, then reported on the next run
+    assert (job.skipped, job.coalesced) == (1, 2)
+    assert runs[1].missed_runs == 3
+    assert runs[1].lag_seconds >= 1
+    assert (dispatcher.skipped_runs, dispatcher.coalesced_runs) == (1, 2)
+    lag = dispatcher.lag_percentiles()
+    assert lag["samples"] == len(runs)
+    assert 0 <= lag["p50"] <= lag["p99"] <= lag["max"]
+    assert current_run() is None
+
+
+def test_dispatcher_skips_misfires_beyond_grace():
+    dispatcher = CheckDispatcher(misfire_grace_seconds=1)
+    job = Job(id="late", func=None, interval_seconds=60)
+    dispatcher._fire(job, lateness=5, wall_now=0)
+    assert job.skipped == 1 and job.missed_since_run == 1
+    assert dispatcher.skipped_runs == 1
+    assert dispatcher.lag_percentiles()["samples"] == 0
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_coalesces_a_stall_into_one_run():
+    dispatcher = CheckDispatcher(misfire_grace_seconds=1)
+    runs = []
+
+    async def job():
+        runs.append(current_run())
+
+    dispatcher.add_job(job, seconds=10, id="stalled")
+    dispatcher.start()
+    try:
+        job = dispatcher.get_job("stalled")
+        now = dispatcher._loop.time()
+        with dispatcher._lock:
+            dispatcher._heap.clear()
+            # the loop stalled for 30.5s: four fire times came due, the latest only 0.5s ago
+            dispatcher._push(job, now - 30.5)
+        due = dispatcher._pop_due(now)
+        assert [(j.id, round(lateness, 6)) for j, lateness in due] == [("stalled", 0.5)]
+        for due_job, lateness in due:
+            dispatcher._fire(due_job, lateness, time.time())
+        await asyncio.gather(*dispatcher._tasks)
+    finally:
+        await dispatcher.shutdown(wait=True, timeout=1)
+
+    assert len(runs) == 1
+    assert runs[0].missed_runs == 3
+    assert (job.coalesced, job.skipped) == (3, 0)
+    assert job.next_run == pytest.approx(now + 9.5)
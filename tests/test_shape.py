@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+from app.async_crud import create_check
+from app.database import AsyncSessionLocal, Base, async_engine
+from app.drift import detect_drift, shape_cache
+from app.jsonstream import JSONEventParser
+from app.manifest import apply_manifest
+from app.schemas import CheckCreate
+from app.shape import ShapeBuilder, diff_shapes, fingerprint, shape_of
+
+
+def _result(doc):
+    shape = shape_of(doc)
+    return {"shape_fingerprint": fingerprint(shape), "shape": sorted(shape)}
+
+
+def test_shape_ignores_values_and_array_length():
+    a = {"id": 1, "tags": ["x"], "owner": {"name": "a"}}
+    b = {"id": 2, "tags": ["y", "z", "w"], "owner": {"name": "b"}}
+    assert fingerprint(shape_of(a)) == fingerprint(shape_of(b))
+    assert "tags.*:string" in shape_of(a)
+    assert fingerprint(shape_of(a)) != fingerprint(shape_of({**a, "id": "1"}))
+
+
+def test_shape_builder_matches_shape_of():
+    doc = {"items": [{"id": 1, "ok": True}, {"id": None}], "meta": {"next": "x"}, "empty": []}
+    raw = json.dumps(doc).encode()
+    parser, builder = JSONEventParser(), ShapeBuilder()
+    for i in range(0, len(raw), 5):
+        builder.feed(parser.feed(raw[i:i + 5]))
+    builder.feed(parser.close())
+    assert builder.shape() == shape_of(doc)
+
+
+def test_diff_shapes():
+    old = shape_of({"id": 1, "name": "a", "gone": True})
+    new = shape_of({"id": "1", "name": "a", "added": {"x": 1}})
+    assert diff_shapes(old, new) == {
+        "added": ["added", "added.x"],
+        "removed": ["gone"],
+        "changed": [{"path": "id", "from": ["number"], "to": ["string"]}],
+    }
+
+
+def test_detect_drift_baseline_then_change():
+    async def scenario():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        shape_cache.clear()
+        async with AsyncSessionLocal() as db:
+            check = await create_check(db, "drift", "http://example.com", ["id"])
+            first = await detect_drift(db, check.id, _result({"id": 1}))
+            same = await detect_drift(db, check.id, _result({"id": 2}))
+            # a restarted worker reloads the baseline from the checks row
+            shape_cache.clear()
+            changed = await detect_drift(db, check.id, _result({"id": 3, "extra": "x"}))
+        return first, same, changed
+
+    first, same, changed = asyncio.run(scenario())
+    assert first is None
+    assert same is None
+    assert changed["added"] == ["extra"]
+    assert changed["previous_fingerprint"] == _result({"id": 1})["shape_fingerprint"]
+
+
+def test_url_change_resets_drift_baseline():
+    async def scenario():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        shape_cache.clear()
+        async with AsyncSessionLocal() as db:
+            check = await create_check(db, "moved", "http://example.com/a", ["id"])
+            await detect_drift(db, check.id, _result({"id": 1}))
+            moved = CheckCreate(name="moved", url="http://example.com/b", required_fields=["id"])
+            _, upserted, _ = await apply_manifest(db, [moved])
+            assert upserted[0].shape is None and upserted[0].shape_fingerprint is None
+            shape_cache.forget(check.id)
+            # the new endpoint's first shape is its baseline, not drift from the old one
+            return await detect_drift(db, check.id, _result({"name": "x"}))
+
+    assert asyncio.run(scenario()) is None
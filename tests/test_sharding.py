@@ -0,0 +1,67 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.database import AsyncSessionLocal, Base, async_engine
+from app.sharding import ShardCoordinator, assign_shards
+
+
+def test_assign_shards_is_balanced_and_moves_little_on_join():
+    before = assign_shards(["a", "b", "c"], 64)
+    assert sorted(s for shards in before.values() for s in shards) == list(range(64))
+    assert all(8 <= len(shards) <= 40 for shards in before.values())
+
+    after = assign_shards(["a", "b", "c", "d"], 64)
+    moved = {s for replica in "abc" for s in before[replica] if s not in after[replica]}
+    # only shards won by the newcomer move
+    assert moved == set(after["d"])
+
+
+def test_coordinators_split_shards_and_rebalance_when_one_dies():
+    now = datetime.utcnow()
+
+    async def scenario():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        a = ShardCoordinator("replica-a", shards=16, ttl_seconds=30)
+        b = ShardCoordinator("replica-b", shards=16, ttl_seconds=30)
+        assert a.owns(5) and b.owns(5)  # not coordinating yet
+        async with AsyncSessionLocal() as db:
+            gained_a, _ = await a.heartbeat(db, now)
+            await b.heartbeat(db, now)
+            _, lost_a = await a.heartbeat(db, now)
+            split = (set(a.owned), set(b.owned))
+            # b stops heartbeating; once its row is stale a takes every shard back
+            regained, _ = await a.heartbeat(db, now + timedelta(seconds=31))
+        return gained_a, lost_a, split, regained, a
+
+    gained_a, lost_a, (owned_a, owned_b), regained, a = asyncio.run(scenario())
+    assert gained_a == set(range(16))
+    assert owned_a and owned_b and not owned_a & owned_b
+    assert owned_a | owned_b == set(range(16))
+    assert lost_a == owned_b
+    assert regained == owned_b
+    assert a.replicas == ["replica-a"]
+
+
+def test_coordinator_releases_shards_when_heartbeats_fail_past_ttl():
+    now = datetime.utcnow()
+
+    async def scenario():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        coordinator = ShardCoordinator("replica-a", shards=16, ttl_seconds=30)
+        async with AsyncSessionLocal() as db:
+            await coordinator.heartbeat(db, now)
+            assert coordinator.expire(now + timedelta(seconds=20)) == set()
+            released = coordinator.expire(now + timedelta(seconds=31))
+            owns_after_expiry = coordinator.owns(5)
+            # heartbeats resume: the shards come back as gained
+            regained, _ = await coordinator.heartbeat(db, now + timedelta(seconds=40))
+        return released, owns_after_expiry, regained
+
+    released, owns_after_expiry, regained = asyncio.run(scenario())
+    assert released == set(range(16))
+    assert not owns_after_expiry
+    assert regained == set(range(16))
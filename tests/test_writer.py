@@ -0,0 +1,166 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app import async_crud
+from app.database import AsyncSessionLocal, Base, async_engine
+from app.writer import ExecutionWriter, execution_values
+
+
+def _row(check_id=1, status="PASS"):
+    return execution_values(check_id, {"status": status, "missing_fields": [], "status_code": 200, "latency_ms": 5})
+
+
+class FakeInsert:
+    """Stands in for the bulk insert so batching can be observed without a database."""
+
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, rows, returning):
+        self.batches.append(list(rows))
+        return [dict(row, id=n) for n, row in enumerate(rows)] if returning else []
+
+
+@pytest.mark.asyncio
+async def test_writer_flushes_on_batch_size_and_on_stop():
+    fake = FakeInsert()
+    writer = ExecutionWriter(batch_size=3, flush_interval=60, max_pending=100)
+    with patch("app.writer._insert_rows", fake):
+        writer.start()
+        for _ in range(3):
+            await writer.submit(_row())
+        await asyncio.sleep(0.05)
+        assert [len(b) for b in fake.batches] == [3]
+
+        await writer.submit(_row())
+        await writer.stop()
+    assert [len(b) for b in fake.batches] == [3, 1]
+    assert writer.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_writer_flushes_on_interval():
+    fake = FakeInsert()
+    writer = ExecutionWriter(batch_size=100, flush_interval=0.02)
+    with patch("app.writer._insert_rows", fake):
+        writer.start()
+        await writer.submit(_row())
+        await asyncio.sleep(0.1)
+        assert len(fake.batches) == 1
+        await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_writer_write_returns_persisted_row():
+    fake = FakeInsert()
+    writer = ExecutionWriter(batch_size=100, flush_interval=60)
+    with patch("app.writer._insert_rows", fake):
+        writer.start()
+        await writer.submit(_row(check_id=1))
+        persisted = await writer.write(_row(check_id=2))
+        await writer.stop()
+    assert persisted["check_id"] == 2
+    # the buffered row went out in the same batch
+    assert [len(b) for b in fake.batches] == [2]
+
+
+@pytest.mark.asyncio
+async def test_writer_applies_backpressure():
+    batches = []
+
+    async def record_insert(rows, returning):
+        batches.append(len(rows))
+        return []
+
+    writer = ExecutionWriter(batch_size=2, flush_interval=60, max_pending=2)
+    with patch("app.writer._insert_rows", record_insert):
+        writer.start()
+        await writer.submit(_row())
+        await writer.submit(_row())
+        # buffer is full until the size-triggered flush drains it
+        blocked = asyncio.ensure_future(writer.submit(_row()))
+        await asyncio.sleep(0.05)
+        assert blocked.done()
+        await writer.stop()
+    assert sum(batches) == 3
+
+
+class FlakyInsert(FakeInsert):
+    """Fails the first `failures` inserts, then behaves like FakeInsert."""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+        self.attempts = 0
+
+    async def __call__(self, rows, returning):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise RuntimeError("database unavailable")
+        return await super().__call__(rows, returning)
+
+
+@pytest.mark.asyncio
+async def test_writer_retries_failed_batches_in_order():
+    flaky = FlakyInsert(failures=2)
+    writer = ExecutionWriter(batch_size=100, flush_interval=0.01, retries=3, retry_backoff=0.01)
+    with patch("app.writer._insert_rows", flaky):
+        writer.start()
+        await writer.submit(_row(check_id=1))
+        persisted = await writer.write(_row(check_id=2))
+        await writer.submit(_row(check_id=3))
+        await writer.stop()
+    assert persisted["check_id"] == 2
+    assert flaky.attempts >= 3
+    assert [row["check_id"] for batch in flaky.batches for row in batch] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_writer_drops_rows_after_retries():
+    from app.writer import EXECUTIONS_DROPPED
+
+    dropped = EXECUTIONS_DROPPED.labels().value
+    flaky = FlakyInsert(failures=100)
+    writer = ExecutionWriter(batch_size=100, flush_interval=0.01, retries=2, retry_backoff=0.01)
+    with patch("app.writer._insert_rows", flaky):
+        writer.start()
+        await writer.submit(_row())
+        with pytest.raises(RuntimeError):
+            await writer.write(_row())
+        await writer.stop()
+    assert flaky.attempts == 3
+    assert EXECUTIONS_DROPPED.labels().value - dropped == 2
+    assert writer.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_create_executions_bulk_insert():
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        check = await async_crud.create_check(db, "bulk-writer", "http://example.com", ["a"])
+        rows = [_row(check.id), _row(check.id, status="FAIL")]
+        persisted = await async_crud.create_executions(db, rows, returning=True)
+        assert [e.status for e in persisted] == ["PASS", "FAIL"]
+        assert all(e.id is not None and e.executed_at is not None for e in persisted)
+        assert len(await async_crud.get_check_history(db, check.id)) == 2
+
+
+@pytest.mark.asyncio
+async def test_writer_does_not_rewrite_committed_rows_when_a_subscriber_fails():
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        check = await async_crud.create_check(db, "failing-subscriber", "http://example.com", ["a"])
+
+    writer = ExecutionWriter(batch_size=100, flush_interval=0.01, retries=3, retry_backoff=0.01)
+    with patch("app.writer.publish_executions", side_effect=RuntimeError("subscriber failed")):
+        writer.start()
+        persisted = await writer.write(_row(check.id))
+        await writer.stop()
+
+    assert persisted.check_id == check.id
+    async with AsyncSessionLocal() as db:
+        assert len(await async_crud.get_check_history(db, check.id)) == 1